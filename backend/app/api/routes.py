@@ -1,9 +1,15 @@
 """
 API route definitions for TradingAgentsX Backend
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response
 from datetime import datetime
+from typing import Literal, Optional
+import hashlib
+import io
+import json
 import logging
+import re
 import threading
 
 from backend.app.models.schemas import (
@@ -15,14 +21,39 @@ from backend.app.models.schemas import (
     TaskCreatedResponse,
     TaskStatusResponse,
     DownloadRequest,
+    PriceHistoryResponse,
 )
 from backend.app.services.trading_service import TradingService
 from backend.app.services.task_manager import task_manager
+from backend.app.services.metrics import metrics_registry
+from backend.app.services.price_service import (
+    ARROW_STREAM_MEDIA_TYPE,
+    CHART_INTERVALS,
+    CHART_RANGES,
+    PriceService,
+)
 from backend.app.api.dependencies import get_trading_service
 from backend.app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Ticker symbols accepted by the price endpoint (letters, digits and the . - ^ = used by Yahoo symbols)
+TICKER_PATTERN = re.compile(r"^[A-Z0-9.\-^=]{1,15}$")
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header value (a list of entity tags or *) against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        # Weak comparison: W/"x" matches "x"
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
 # Create API router
 router = APIRouter(prefix="/api", tags=["TradingAgentsX"])
 
@@ -152,6 +183,20 @@ async def get_task_status(task_id: str):
     return TaskStatusResponse(**task)
 
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Expose aggregated run metrics in the Prometheus text format
+    
+    Counters cover node latency, LLM tokens per node, tool calls,
+    data vendor latency and cache hits across all completed analyses.
+    """
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 @router.get("/tickers")
 async def get_tickers():
     """Get list of popular tickers (example endpoint)"""
@@ -170,6 +215,83 @@ async def get_tickers():
     }
 
 
+@router.get(
+    "/prices/{ticker}",
+    response_model=PriceHistoryResponse,
+    responses={304: {"description": "Not modified"}},
+)
+def get_price_history(
+    ticker: str,
+    request: Request,
+    range_: str = Query("1y", alias="range", description=f"Price range, one of {list(CHART_RANGES)}"),
+    interval: Optional[str] = Query(
+        None, description=f"Bar interval, one of {list(CHART_INTERVALS)}; picked from max_points if omitted"
+    ),
+    max_points: int = Query(1000, ge=10, le=10000, description="Maximum number of bars when interval is omitted"),
+    format_: Literal["json", "columns", "arrow"] = Query("json", alias="format", description="Response layout"),
+    service: TradingService = Depends(get_trading_service),
+):
+    """
+    Get historical prices for a ticker from the shared price cache
+    
+    Responses carry an ETag derived from the cached file and the query, so
+    clients can revalidate with If-None-Match and receive 304 Not Modified.
+    
+    Args:
+        ticker: Stock ticker symbol
+        range: Price range counted back from the latest trading day
+        interval: Bar interval ("1d", "1w", "1mo")
+        max_points: Maximum number of bars when interval is omitted
+        format: "json" (rows), "columns" (one array per field) or "arrow" (Arrow IPC stream)
+        
+    Returns:
+        Price data and statistics in the requested format
+    """
+    ticker = ticker.upper()
+    # Validate before the ticker reaches the cache glob or a yfinance download
+    if not TICKER_PATTERN.match(ticker):
+        raise HTTPException(status_code=422, detail=f"Invalid ticker '{ticker}'")
+    if range_ not in CHART_RANGES:
+        raise HTTPException(status_code=422, detail=f"Unsupported range '{range_}'")
+    if interval is not None and interval not in CHART_INTERVALS:
+        raise HTTPException(status_code=422, detail=f"Unsupported interval '{interval}'")
+    
+    cached = PriceService.get_cached_entry(ticker, service.default_config["data_cache_dir"])
+    if cached is None:
+        raise HTTPException(status_code=404, detail=f"No price data found for {ticker}")
+    file_path, price_df, mtime = cached
+    
+    # The cached file and the query fully determine the response body
+    etag_source = f"{file_path.name}:{mtime}:{range_}:{interval}:{max_points}:{format_}"
+    etag = f'"{hashlib.sha1(etag_source.encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=300"}
+    
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    
+    range_df = PriceService.slice_range(price_df, range_)
+    interval = interval or PriceService.pick_interval(range_df, max_points)
+    chart_df = PriceService.select_chart_frame(range_df, limit=None, interval=interval)
+    
+    if format_ == "arrow":
+        buffer = io.BytesIO()
+        chart_df.write_ipc_stream(buffer)
+        return Response(content=buffer.getvalue(), media_type=ARROW_STREAM_MEDIA_TYPE, headers=headers)
+    
+    body = {
+        "ticker": ticker,
+        "range": range_,
+        "interval": interval,
+        "price_stats": PriceService.calculate_stats(range_df),
+    }
+    if format_ == "columns":
+        body["price_columns"] = chart_df.to_dict(as_series=False)
+    else:
+        body["price_data"] = chart_df.to_dicts()
+    
+    return Response(content=json.dumps(body), media_type="application/json", headers=headers)
+
+
 @router.post("/download/reports")
 async def download_reports(request: DownloadRequest):
     """
@@ -2,6 +2,7 @@
 FastAPI application entry point for TradingAgentsX Backend
 """
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 import logging
 import sys
@@ -10,6 +11,9 @@ from pathlib import Path
 from backend.app.core.config import settings
 from backend.app.core.cors import setup_cors
 from backend.app.api.routes import router
+from backend.app.services.pdf_generator import preload_pdf_resources
+from tradingagents.default_config import DEFAULT_CONFIG
+from tradingagents.utils.logging_utils import configure_logging
 
 # Configure logging
 logging.basicConfig(
@@ -18,6 +22,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Structured, queued logging for the tradingagents package is process-wide, so it is set
+# once here at startup rather than by each request's graph
+configure_logging(DEFAULT_CONFIG["log_level"], DEFAULT_CONFIG["log_format"])
+
 # Create FastAPI application
 app = FastAPI(
     title=settings.app_name,
@@ -30,10 +38,19 @@ app = FastAPI(
 # Setup CORS
 setup_cors(app)
 
+# Compress larger responses (price history, task results) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Include API routes
 app.include_router(router)
 
 
+@app.on_event("startup")
+async def warm_pdf_resources():
+    """Register PDF fonts and styles once so the first download is not slowed down"""
+    preload_pdf_resources()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
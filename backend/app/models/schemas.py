@@ -66,6 +66,18 @@ class PriceStats(BaseModel):
     end_price: float
 
 
+class PriceHistoryResponse(BaseModel):
+    """Response model for the price history endpoint"""
+    ticker: str = Field(..., description="Stock ticker symbol")
+    range: str = Field(..., description="Requested range (e.g., '1y', 'max')")
+    interval: str = Field(..., description="Bar interval of the returned data ('1d', '1w', '1mo')")
+    price_stats: PriceStats = Field(..., description="Price statistics over the requested range")
+    price_data: Optional[List[PriceData]] = Field(None, description="Historical price data (format=json)")
+    price_columns: Optional[Dict[str, List[Any]]] = Field(
+        None, description="Historical price data as one array per field (format=columns)"
+    )
+
+
 class AnalysisResponse(BaseModel):
     """Response model for trading analysis"""
     status: str = Field(..., description="Analysis status (success, error, processing)")
@@ -74,8 +86,7 @@ class AnalysisResponse(BaseModel):
     decision: Optional[Union[str, Dict[str, Any]]] = Field(None, description="Trading decision (string or details dict)")
     reports: Optional[Dict[str, Any]] = Field(None, description="Analysis reports from different teams")
     error: Optional[str] = Field(None, description="Error message if analysis failed")
-    price_data: Optional[List[PriceData]] = Field(None, description="Historical price data")
-    price_stats: Optional[PriceStats] = Field(None, description="Price statistics")
+    run_profile: Optional[Dict[str, Any]] = Field(None, description="Per-run node, token, tool and vendor profile")
 
 
 class ConfigResponse(BaseModel):
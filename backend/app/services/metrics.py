@@ -0,0 +1,117 @@
+"""
+Prometheus-style metrics for TradingAgentsX runs
+Aggregates the run profiles attached to each final_state into process-level counters
+"""
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# (metric name, help text) for every counter exposed at /api/metrics
+METRIC_HELP = {
+    "tradingagents_runs_total": "Completed analysis runs",
+    "tradingagents_run_seconds_total": "Wall time spent in analysis runs",
+    "tradingagents_node_calls_total": "Graph node executions",
+    "tradingagents_node_seconds_total": "Wall time spent in graph nodes",
+    "tradingagents_llm_calls_total": "LLM calls per graph node",
+    "tradingagents_llm_seconds_total": "Wall time spent waiting on LLM calls per graph node",
+    "tradingagents_llm_tokens_total": "LLM tokens per graph node and kind (prompt, completion, cached)",
+    "tradingagents_tool_calls_total": "Tool calls per tool",
+    "tradingagents_tool_errors_total": "Failed tool calls per tool",
+    "tradingagents_tool_seconds_total": "Wall time spent in tools",
+    "tradingagents_vendor_calls_total": "Data vendor calls per method and vendor",
+    "tradingagents_vendor_errors_total": "Failed data vendor calls per method and vendor",
+    "tradingagents_vendor_seconds_total": "Wall time spent in data vendor calls",
+    "tradingagents_cache_events_total": "Cache lookups per cache kind and result",
+    "tradingagents_debate_turns_total": "Debate turns actually run per debate",
+    "tradingagents_debate_rounds_saved_total": "Debate rounds skipped after convergence per debate",
+}
+
+
+class MetricsRegistry:
+    """Thread-safe counter registry rendered in the Prometheus text format"""
+
+    def __init__(self):
+        """Initialize an empty registry"""
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """
+        Increase a counter
+
+        Args:
+            name: Metric name (must be listed in METRIC_HELP)
+            value: Amount to add
+            **labels: Label values
+        """
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe_profile(self, profile: Optional[Dict[str, Any]]) -> None:
+        """
+        Add a run profile (final_state["run_profile"]) to the counters
+
+        Args:
+            profile: Run profile dict, ignored if None
+        """
+        if not profile:
+            return
+
+        self.inc("tradingagents_runs_total")
+        self.inc("tradingagents_run_seconds_total", profile.get("wall_seconds", 0.0))
+
+        for node, stats in profile.get("nodes", {}).items():
+            self.inc("tradingagents_node_calls_total", stats["calls"], node=node)
+            self.inc("tradingagents_node_seconds_total", stats["seconds"], node=node)
+            self.inc("tradingagents_llm_calls_total", stats["llm_calls"], node=node)
+            self.inc("tradingagents_llm_seconds_total", stats["llm_seconds"], node=node)
+            for kind in ("prompt", "completion", "cached"):
+                self.inc("tradingagents_llm_tokens_total", stats[f"{kind}_tokens"], node=node, kind=kind)
+
+        for tool, stats in profile.get("tools", {}).items():
+            self.inc("tradingagents_tool_calls_total", stats["calls"], tool=tool)
+            self.inc("tradingagents_tool_errors_total", stats["errors"], tool=tool)
+            self.inc("tradingagents_tool_seconds_total", stats["seconds"], tool=tool)
+
+        for stats in profile.get("vendors", {}).values():
+            labels = {"method": stats["method"], "vendor": stats["vendor"]}
+            self.inc("tradingagents_vendor_calls_total", stats["calls"], **labels)
+            self.inc("tradingagents_vendor_errors_total", stats["errors"], **labels)
+            self.inc("tradingagents_vendor_seconds_total", stats["seconds"], **labels)
+
+        for kind, stats in profile.get("cache", {}).items():
+            self.inc("tradingagents_cache_events_total", stats["hits"], kind=kind, result="hit")
+            self.inc("tradingagents_cache_events_total", stats["misses"], kind=kind, result="miss")
+
+        for debate, stats in profile.get("debates", {}).items():
+            self.inc("tradingagents_debate_turns_total", stats["turns"], debate=debate)
+            self.inc("tradingagents_debate_rounds_saved_total", stats["rounds_saved"], debate=debate)
+
+    def render(self) -> str:
+        """
+        Render all counters in the Prometheus text exposition format
+
+        Returns:
+            Metrics text
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+
+        lines: List[str] = []
+        current_name = None
+        for (name, labels), value in counters:
+            if name != current_name:
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                current_name = name
+            label_str = ",".join(
+                f'{key}="{val.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                for key, val in labels
+            )
+            lines.append(f"{name}{{{label_str}}} {value:g}" if label_str else f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+metrics_registry = MetricsRegistry()
@@ -1,17 +1,55 @@
 """
 Price data service for loading and processing stock price data
 """
+import io
+import threading
+import time
+from collections import OrderedDict
 import polars as pl
+from datetime import timedelta
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Supported chart bar intervals, finest first (polars duration strings)
+CHART_INTERVALS = ("1d", "1w", "1mo")
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Maximum number of parsed price files kept in memory (least recently used evicted first)
+FRAME_CACHE_SIZE = 64
+
+# Seconds to remember that a ticker could not be fetched, so repeated requests
+# for an unknown symbol do not each start a multi-year download
+MISSING_TICKER_TTL = 15 * 60
+
+# Supported chart ranges, counted back from the latest trading day (None = all data)
+CHART_RANGES = {
+    "1m": timedelta(days=31),
+    "3m": timedelta(days=92),
+    "6m": timedelta(days=183),
+    "1y": timedelta(days=365),
+    "2y": timedelta(days=365 * 2),
+    "5y": timedelta(days=365 * 5),
+    "10y": timedelta(days=365 * 10),
+    "max": None,
+}
+
 
 class PriceService:
     """Service for loading and processing price data from data_cache"""
     
+    # Indexed cache shared by every caller in the process:
+    # (data_cache_dir, ticker) -> newest CSV path, and CSV path -> (mtime, DataFrame)
+    # kept as an LRU of at most FRAME_CACHE_SIZE files
+    _file_index: Dict[Tuple[str, str], Path] = {}
+    _frame_cache: "OrderedDict[Path, Tuple[float, pl.DataFrame]]" = OrderedDict()
+    # (data_cache_dir, ticker) -> time of the last failed fetch
+    _missing: Dict[Tuple[str, str], float] = {}
+    _cache_lock = threading.Lock()
+    
     @staticmethod
     def load_price_data(ticker: str, data_cache_dir: str) -> Optional[pl.DataFrame]:
         """
@@ -25,43 +63,92 @@ class PriceService:
             DataFrame with price data or None if not found
         """
         try:
-            cache_path = Path(data_cache_dir)
+            cached = PriceService.get_cached_entry(ticker, data_cache_dir)
+            return cached[1] if cached else None
+        except Exception as e:
+            logger.error(f"Error loading price data for {ticker}: {e}")
+            return None
+    
+    @staticmethod
+    def get_cached_entry(ticker: str, data_cache_dir: str) -> Optional[Tuple[Path, pl.DataFrame, float]]:
+        """
+        Resolve the price data for a ticker through the indexed cache
+        
+        The data_cache directory is only globbed the first time a ticker is
+        requested; later calls stat the indexed file and reuse the parsed
+        DataFrame until the file changes or expires.
+        
+        Args:
+            ticker: Stock ticker symbol
+            data_cache_dir: Path to data cache directory
             
+        Returns:
+            Tuple of (CSV path, DataFrame, file mtime) or None if not found
+        """
+        key = (str(data_cache_dir), ticker)
+        latest_file = PriceService._file_index.get(key)
+        
+        if latest_file is None or not latest_file.exists():
             # Search for {ticker}-YFin-data-*.csv files
-            csv_files = list(cache_path.glob(f"{ticker}-YFin-data-*.csv"))
+            csv_files = list(Path(data_cache_dir).glob(f"{ticker}-YFin-data-*.csv"))
             
             if not csv_files:
+                failed_at = PriceService._missing.get(key)
+                if failed_at is not None and time.monotonic() - failed_at < MISSING_TICKER_TTL:
+                    return None
+                
                 logger.warning(f"No price data found for {ticker} in {data_cache_dir}")
                 logger.info(f"嘗試主動獲取 {ticker} 的價格數據...")
                 
                 # 主動獲取數據
-                df = PriceService._fetch_and_cache_data(ticker, data_cache_dir)
-                if df is not None:
-                    return df
-                else:
+                latest_file = PriceService._fetch_and_cache_data(ticker, data_cache_dir)
+                if latest_file is None:
+                    with PriceService._cache_lock:
+                        PriceService._missing[key] = time.monotonic()
                     return None
+            else:
+                # Use the most recent file
+                latest_file = max(csv_files, key=lambda p: p.stat().st_mtime)
             
-            # Use the most recent file and check if it's still valid (< 24 hours)
-            latest_file = max(csv_files, key=lambda p: p.stat().st_mtime)
-            
-            if not PriceService._is_cache_valid(latest_file):
-                logger.info(f"{ticker} 緩存過期，重新獲取數據...")
-                df = PriceService._fetch_and_cache_data(ticker, data_cache_dir)
-                if df is not None:
-                    return df
+            with PriceService._cache_lock:
+                PriceService._file_index[key] = latest_file
+        
+        # Check if it's still valid (< 24 hours)
+        if not PriceService._is_cache_valid(latest_file):
+            logger.info(f"{ticker} 緩存過期，重新獲取數據...")
+            fresh_file = PriceService._fetch_and_cache_data(ticker, data_cache_dir)
+            if fresh_file is not None:
+                latest_file = fresh_file
+                with PriceService._cache_lock:
+                    PriceService._file_index[key] = latest_file
+            else:
                 # 如果獲取失敗，使用舊緩存
                 logger.warning(f"使用過期緩存作為備援")
-            
-            logger.info(f"Loading price data from {latest_file}")
-            
-            df = pl.read_csv(str(latest_file))
-            df = df.with_columns(pl.col("Date").str.to_datetime())
-            
-            return df.sort("Date")
-            
-        except Exception as e:
-            logger.error(f"Error loading price data for {ticker}: {e}")
-            return None
+        
+        mtime = latest_file.stat().st_mtime
+        with PriceService._cache_lock:
+            cached = PriceService._frame_cache.get(latest_file)
+            if cached is not None and cached[0] == mtime:
+                PriceService._frame_cache.move_to_end(latest_file)
+                return latest_file, cached[1], mtime
+        
+        logger.info(f"Loading price data from {latest_file}")
+        df = PriceService._read_price_csv(latest_file)
+        
+        with PriceService._cache_lock:
+            PriceService._frame_cache[latest_file] = (mtime, df)
+            PriceService._frame_cache.move_to_end(latest_file)
+            while len(PriceService._frame_cache) > FRAME_CACHE_SIZE:
+                PriceService._frame_cache.popitem(last=False)
+        
+        return latest_file, df, mtime
+    
+    @staticmethod
+    def _read_price_csv(file_path: Path) -> pl.DataFrame:
+        """Read a cached price CSV into a Date-sorted DataFrame"""
+        df = pl.read_csv(str(file_path))
+        df = df.with_columns(pl.col("Date").str.to_datetime())
+        return df.sort("Date")
     
     @staticmethod
     def _is_cache_valid(file_path: Path, max_age_hours: int = 24) -> bool:
@@ -82,7 +169,7 @@ class PriceService:
         return cache_age_hours < max_age_hours
     
     @staticmethod
-    def _fetch_and_cache_data(ticker: str, data_cache_dir: str, max_retries: int = 3) -> Optional[pl.DataFrame]:
+    def _fetch_and_cache_data(ticker: str, data_cache_dir: str, max_retries: int = 3) -> Optional[Path]:
         """
         Fetch data from yfinance and cache it
         
@@ -92,7 +179,7 @@ class PriceService:
             max_retries: Maximum number of retry attempts
             
         Returns:
-            DataFrame with price data or None if failed
+            Path to the cached CSV file or None if failed
         """
         import yfinance as yf
         from datetime import datetime, timedelta
@@ -130,10 +217,7 @@ class PriceService:
                 
                 logger.info(f"成功獲取並緩存 {ticker} 數據到 {cache_file}")
                 
-                # Prepare and return DataFrame - convert to polars
-                df = pl.read_csv(str(cache_file))
-                df = df.with_columns(pl.col("Date").str.to_datetime())
-                return df.sort("Date")
+                return cache_file
                 
             except Exception as e:
                 logger.warning(f"第 {attempt} 次嘗試失敗: {e}")
@@ -159,45 +243,183 @@ class PriceService:
         Returns:
             Dictionary with statistics
         """
-        start_price = float(df.row(0, named=True)["Close"])
-        end_price = float(df.row(-1, named=True)["Close"])
+        # Pull the first/last values in one select instead of materializing rows
+        ends = df.select(
+            pl.col("Close").first().cast(pl.Float64).alias("start_price"),
+            pl.col("Close").last().cast(pl.Float64).alias("end_price"),
+            pl.col("Date").first().alias("start_date"),
+            pl.col("Date").last().alias("end_date"),
+        ).row(0, named=True)
+        
+        start_price = ends["start_price"]
+        end_price = ends["end_price"]
         growth_rate = ((end_price - start_price) / start_price) * 100
-        duration_days = (df.row(-1, named=True)["Date"] - df.row(0, named=True)["Date"]).days
+        duration_days = (ends["end_date"] - ends["start_date"]).days
         
         return {
             "growth_rate": round(growth_rate, 2),
             "duration_days": int(duration_days),
-            "start_date": df.row(0, named=True)["Date"].strftime('%Y-%m-%d'),
-            "end_date": df.row(-1, named=True)["Date"].strftime('%Y-%m-%d'),
+            "start_date": ends["start_date"].strftime('%Y-%m-%d'),
+            "end_date": ends["end_date"].strftime('%Y-%m-%d'),
             "start_price": round(start_price, 2),
             "end_price": round(end_price, 2),
         }
     
     @staticmethod
-    def prepare_chart_data(df: pl.DataFrame, limit: int = 365) -> List[Dict[str, Any]]:
+    def slice_range(df: pl.DataFrame, range_key: str) -> pl.DataFrame:
+        """
+        Keep only the rows within a chart range of the latest date
+        
+        Args:
+            df: DataFrame with price data sorted by Date
+            range_key: One of CHART_RANGES
+            
+        Returns:
+            Filtered DataFrame
+        """
+        if range_key not in CHART_RANGES:
+            raise ValueError(f"Unsupported range '{range_key}', expected one of {list(CHART_RANGES)}")
+        
+        span = CHART_RANGES[range_key]
+        if span is None or df.is_empty():
+            return df
+        
+        return df.filter(pl.col("Date") >= pl.col("Date").max() - span)
+    
+    @staticmethod
+    def downsample(df: pl.DataFrame, interval: str) -> pl.DataFrame:
+        """
+        Aggregate daily rows into OHLC bars of a coarser interval
+        
+        Args:
+            df: DataFrame with daily price data sorted by Date
+            interval: One of CHART_INTERVALS ("1d", "1w", "1mo")
+            
+        Returns:
+            DataFrame with one row per bar, dated at the bar's first trading day
+        """
+        if interval not in CHART_INTERVALS:
+            raise ValueError(f"Unsupported interval '{interval}', expected one of {list(CHART_INTERVALS)}")
+        
+        if interval == "1d":
+            return df
+        
+        return (
+            df.group_by_dynamic("Date", every=interval, label="datapoint")
+            .agg(
+                pl.col("Open").first(),
+                pl.col("High").max(),
+                pl.col("Low").min(),
+                pl.col("Close").last(),
+                pl.col("Volume").sum(),
+            )
+        )
+    
+    @staticmethod
+    def pick_interval(df: pl.DataFrame, max_points: Optional[int]) -> str:
+        """
+        Pick the finest bar interval whose bar count fits within max_points
+        
+        Args:
+            df: DataFrame with daily price data sorted by Date
+            max_points: Maximum number of bars (None means no limit)
+            
+        Returns:
+            One of CHART_INTERVALS (the coarsest one if none fits)
+        """
+        if not max_points or df.height <= max_points:
+            return "1d"
+        
+        # Weekly -> monthly until the bar count fits
+        for candidate in CHART_INTERVALS[1:]:
+            if PriceService.downsample(df, candidate).height <= max_points:
+                return candidate
+        return CHART_INTERVALS[-1]
+    
+    @staticmethod
+    def select_chart_frame(
+        df: pl.DataFrame,
+        limit: Optional[int] = 365,
+        interval: Optional[str] = None,
+        max_points: Optional[int] = None,
+    ) -> pl.DataFrame:
+        """
+        Select, downsample and format the rows to chart as JSON-ready columns
+        
+        Args:
+            df: DataFrame with price data
+            limit: Number of most recent daily rows to keep (None keeps all)
+            interval: Bar interval ("1d", "1w", "1mo"); None picks the finest
+                interval that fits within max_points
+            max_points: Maximum number of bars when interval is None
+            
+        Returns:
+            DataFrame with Date as 'YYYY-MM-DD' strings, prices rounded to 2
+            decimals and integer Volume
+        """
+        recent_df = df.tail(limit) if limit else df
+        
+        if interval is None:
+            interval = PriceService.pick_interval(recent_df, max_points)
+        
+        return PriceService.downsample(recent_df, interval).select(
+            pl.col("Date").dt.strftime('%Y-%m-%d'),
+            pl.col("Open", "High", "Low", "Close").cast(pl.Float64).round(2),
+            pl.col("Volume").cast(pl.Float64).cast(pl.Int64),
+        )
+    
+    @staticmethod
+    def prepare_chart_data(
+        df: pl.DataFrame,
+        limit: Optional[int] = 365,
+        interval: Optional[str] = None,
+        max_points: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Prepare price data for charting (limit to recent data)
         
         Args:
             df: DataFrame with price data
-            limit: Maximum number of data points to return
+            limit: Maximum number of daily rows to take before downsampling
+            interval: Optional bar interval, see select_chart_frame
+            max_points: Optional maximum number of bars, see select_chart_frame
             
         Returns:
             List of dictionaries with price data
         """
-        # Get recent data
-        recent_df = df.tail(limit)
-        
-        # Convert to list of dicts using polars to_dicts()
-        data = []
-        for row in recent_df.iter_rows(named=True):
-            data.append({
-                "Date": row['Date'].strftime('%Y-%m-%d'),
-                "Open": round(float(row['Open']), 2),
-                "High": round(float(row['High']), 2),
-                "Low": round(float(row['Low']), 2),
-                "Close": round(float(row['Close']), 2),
-                "Volume": int(row['Volume']),
-            })
-        
-        return data
+        return PriceService.select_chart_frame(df, limit, interval, max_points).to_dicts()
+    
+    @staticmethod
+    def prepare_chart_columns(
+        df: pl.DataFrame,
+        limit: Optional[int] = 365,
+        interval: Optional[str] = None,
+        max_points: Optional[int] = None,
+    ) -> Dict[str, List[Any]]:
+        """
+        Prepare price data for charting as column arrays
+        
+        Columnar variant of prepare_chart_data: one list per field instead of
+        one dict per row, which is much smaller to serialize for long ranges.
+        
+        Returns:
+            Dictionary mapping column name to list of values
+        """
+        return PriceService.select_chart_frame(df, limit, interval, max_points).to_dict(as_series=False)
+    
+    @staticmethod
+    def prepare_chart_arrow(
+        df: pl.DataFrame,
+        limit: Optional[int] = 365,
+        interval: Optional[str] = None,
+        max_points: Optional[int] = None,
+    ) -> bytes:
+        """
+        Prepare price data for charting as an Arrow IPC stream
+        
+        Returns:
+            Arrow IPC stream bytes (media type ARROW_STREAM_MEDIA_TYPE)
+        """
+        buffer = io.BytesIO()
+        PriceService.select_chart_frame(df, limit, interval, max_points).write_ipc_stream(buffer)
+        return buffer.getvalue()
@@ -13,6 +13,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
 from tradingagents.graph.trading_graph import TradingAgentsXGraph
 from tradingagents.default_config import DEFAULT_CONFIG
 from backend.app.core.config import settings
+from backend.app.services.metrics import metrics_registry
 
 logger = logging.getLogger(__name__)
 
@@ -80,106 +81,73 @@ class TradingService:
             if analysts is None:
                 analysts = ["market", "social", "news", "fundamentals"]
             
-            # Dynamically set environment variables for this request
-            import os
-            original_openai_key = os.environ.get("OPENAI_API_KEY")
-            original_alpha_key = os.environ.get("ALPHA_VANTAGE_API_KEY")
+            # Create configuration
+            logger.info(f"Initializing TradingAgentsX for {ticker} on {analysis_date}")
+            config = self.create_config(research_depth, deep_think_llm, quick_think_llm)
             
-            try:
-                # Set Alpha Vantage API key if provided
-                if alpha_vantage_api_key:
-                    os.environ["ALPHA_VANTAGE_API_KEY"] = alpha_vantage_api_key
-                
-                # Create configuration
-                logger.info(f"Initializing TradingAgentsX for {ticker} on {analysis_date}")
-                config = self.create_config(research_depth, deep_think_llm, quick_think_llm)
-                
-                # Normalize base URLs (ensure lowercase paths, common issue with custom endpoints)
-                def normalize_base_url(url: str) -> str:
-                    """Normalize base URL to ensure proper formatting"""
-                    if url:
-                        # Replace common case variations
-                        url = url.replace("/V1", "/v1")
-                        url = url.replace("/V2", "/v2")
-                    return url
-                
-                # Override with user-provided settings
-                config["llm_provider"] = "openai"
-                # Use specific base URLs if provided, otherwise fallback to openai_base_url
-                config["quick_think_base_url"] = normalize_base_url(
-                    quick_think_base_url if quick_think_base_url != "https://api.openai.com/v1" else openai_base_url
-                )
-                config["deep_think_base_url"] = normalize_base_url(
-                    deep_think_base_url if deep_think_base_url != "https://api.openai.com/v1" else openai_base_url
-                )
-                # Set backend_url as a fallback
-                config["backend_url"] = normalize_base_url(openai_base_url)
-                
-                # Resolve API keys: Use specific key if provided, else fallback to openai_api_key (legacy/shared)
-                # Note: For non-OpenAI providers, the user MUST provide the specific key if it differs from the shared one.
-                config["quick_think_api_key"] = quick_think_api_key if quick_think_api_key else openai_api_key
-                config["deep_think_api_key"] = deep_think_api_key if deep_think_api_key else openai_api_key
-                config["embedding_base_url"] = normalize_base_url(embedding_base_url)
-                config["embedding_api_key"] = embedding_api_key if embedding_api_key else openai_api_key
-                
-                # Initialize TradingAgentsX graph
-                graph = TradingAgentsXGraph(analysts, config=config, debug=True)
-                
-                # Run analysis
-                logger.info(f"Running analysis for {ticker}")
-                final_state, decision = graph.propagate(ticker, analysis_date)
+            # Normalize base URLs (ensure lowercase paths, common issue with custom endpoints)
+            def normalize_base_url(url: str) -> str:
+                """Normalize base URL to ensure proper formatting"""
+                if url:
+                    # Replace common case variations
+                    url = url.replace("/V1", "/v1")
+                    url = url.replace("/V2", "/v2")
+                return url
             
-                # Extract reports from final state
-                reports = {
-                    "market_report": final_state.get("market_report"),
-                    "sentiment_report": final_state.get("sentiment_report"),
-                    "news_report": final_state.get("news_report"),
-                    "fundamentals_report": final_state.get("fundamentals_report"),
-                    "investment_plan": final_state.get("investment_plan"),
-                    "trader_investment_plan": final_state.get("trader_investment_plan"),
-                    "final_trade_decision": final_state.get("final_trade_decision"),
-                    "investment_debate_state": final_state.get("investment_debate_state"),
-                    "risk_debate_state": final_state.get("risk_debate_state"),
-                }
-                
-                # Load price data
-                from backend.app.services.price_service import PriceService
-                price_data = None
-                price_stats = None
-                
-                try:
-                    price_df = PriceService.load_price_data(ticker, config.get("data_cache_dir"))
-                    if price_df is not None:
-                        price_data = PriceService.prepare_chart_data(price_df)
-                        price_stats = PriceService.calculate_stats(price_df)
-                        logger.info(f"Loaded {len(price_data)} price data points for {ticker}")
-                except Exception as e:
-                    logger.warning(f"Could not load price data for {ticker}: {e}")
-                
-                return {
-                    "status": "success",
-                    "ticker": ticker,
-                    "analysis_date": analysis_date,
-                    "decision": decision,
-                    "reports": reports,
-                    "price_data": price_data,
-                    "price_stats": price_stats,
-                }
-                
-            finally:
-                # Clean up environment variables after request
-                # Clean up environment variables after request
-                if original_openai_key is not None:
-                    os.environ["OPENAI_API_KEY"] = original_openai_key
-                elif openai_api_key and "OPENAI_API_KEY" in os.environ:
-                    # Only delete if we set it (and there was no original key)
-                    del os.environ["OPENAI_API_KEY"]
-                    
-                if original_alpha_key is not None:
-                    os.environ["ALPHA_VANTAGE_API_KEY"] = original_alpha_key
-                elif "ALPHA_VANTAGE_API_KEY" in os.environ:
-                    del os.environ["ALPHA_VANTAGE_API_KEY"]
+            # Override with user-provided settings
+            config["llm_provider"] = "openai"
+            # Use specific base URLs if provided, otherwise fallback to openai_base_url
+            config["quick_think_base_url"] = normalize_base_url(
+                quick_think_base_url if quick_think_base_url != "https://api.openai.com/v1" else openai_base_url
+            )
+            config["deep_think_base_url"] = normalize_base_url(
+                deep_think_base_url if deep_think_base_url != "https://api.openai.com/v1" else openai_base_url
+            )
+            # Set backend_url as a fallback
+            config["backend_url"] = normalize_base_url(openai_base_url)
             
+            # Resolve API keys: Use specific key if provided, else fallback to openai_api_key (legacy/shared)
+            # Note: For non-OpenAI providers, the user MUST provide the specific key if it differs from the shared one.
+            config["quick_think_api_key"] = quick_think_api_key if quick_think_api_key else openai_api_key
+            config["deep_think_api_key"] = deep_think_api_key if deep_think_api_key else openai_api_key
+            config["embedding_base_url"] = normalize_base_url(embedding_base_url)
+            config["embedding_api_key"] = embedding_api_key if embedding_api_key else openai_api_key
+            # Keys used by the data tools (OpenAI news search, Alpha Vantage) travel in this run's
+            # config snapshot rather than os.environ, so concurrent requests never see each other's keys
+            config["openai_api_key"] = openai_api_key or settings.openai_api_key
+            config["alpha_vantage_api_key"] = alpha_vantage_api_key or settings.alpha_vantage_api_key
+            
+            # Initialize TradingAgentsX graph
+            graph = TradingAgentsXGraph(analysts, config=config, debug=True)
+            
+            # Run analysis
+            logger.info(f"Running analysis for {ticker}")
+            final_state, decision = graph.propagate(ticker, analysis_date)
+            run_profile = final_state.get("run_profile")
+            metrics_registry.observe_profile(run_profile)
+        
+            # Extract reports from final state
+            reports = {
+                "market_report": final_state.get("market_report"),
+                "sentiment_report": final_state.get("sentiment_report"),
+                "news_report": final_state.get("news_report"),
+                "fundamentals_report": final_state.get("fundamentals_report"),
+                "investment_plan": final_state.get("investment_plan"),
+                "trader_investment_plan": final_state.get("trader_investment_plan"),
+                "final_trade_decision": final_state.get("final_trade_decision"),
+                "investment_debate_state": final_state.get("investment_debate_state"),
+                "risk_debate_state": final_state.get("risk_debate_state"),
+            }
+            
+            return {
+                "status": "success",
+                "ticker": ticker,
+                "analysis_date": analysis_date,
+                "decision": decision,
+                "reports": reports,
+                "run_profile": run_profile,
+            }
+
         except Exception as e:
             logger.error(f"Analysis failed for {ticker}: {str(e)}", exc_info=True)
             return {
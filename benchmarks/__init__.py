@@ -0,0 +1,4 @@
+"""
+Offline micro-benchmarks for TradingAgentsX
+Run a benchmark module with: python -m benchmarks.<name>
+"""
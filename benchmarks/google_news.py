@@ -0,0 +1,138 @@
+"""
+Offline benchmark for the Google News scraper
+
+Serves the HTML fixtures in benchmarks/fixtures/google_news/ through a fake
+make_request, checks what parse_news_page extracts from them (including the
+malformed result on page 1, which must be skipped), and compares:
+
+- parse time per fixture page
+- the original fetcher: sequential paging with a 2-6 s sleep before every request
+- the new fetcher: concurrent paging with a small jitter, then a cached repeat
+
+Sleeps and network latency are multiplied by --scale so the run stays short;
+the printed times are scaled back up. Run with:
+python -m benchmarks.google_news [--scale 0.05] [--latency 0.4]
+"""
+import argparse
+import random
+import re
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from tradingagents.dataflows import googlenews_utils
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures" / "google_news"
+
+# Number of well-formed results on each fixture page (page 1 has one malformed result)
+EXPECTED_RESULTS = [10, 9, 7]
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+
+def load_fixtures() -> List[bytes]:
+    """Load the fixture pages ordered by page number"""
+    return [path.read_bytes() for path in sorted(FIXTURE_DIR.glob("page_*.html"))]
+
+
+def check_parser(pages: List[bytes]) -> None:
+    """Assert the parser output on the fixtures"""
+    for index, html in enumerate(pages):
+        results, has_next = googlenews_utils.parse_news_page(html)
+        if len(results) != EXPECTED_RESULTS[index]:
+            raise AssertionError(f"page {index}: expected {EXPECTED_RESULTS[index]} results, got {len(results)}")
+        if has_next != (index < len(pages) - 1):
+            raise AssertionError(f"page {index}: wrong next-page detection")
+        for result in results:
+            if not all(result[key] for key in ("link", "title", "snippet", "date", "source")):
+                raise AssertionError(f"page {index}: empty field in {result}")
+
+
+def _page_from_url(url: str) -> int:
+    return int(re.search(r"start=(\d+)", url).group(1)) // 10
+
+
+def _legacy_get_news(pages: List[bytes], latency: float, scale: float) -> List[Dict[str, str]]:
+    """The original getNewsData loop: one page at a time, sleeping 2-6 s before each request"""
+    news_results = []
+    page = 0
+    while page < len(pages):
+        time.sleep(random.uniform(2, 6) * scale)
+        time.sleep(latency * scale)
+        results, has_next = googlenews_utils.parse_news_page(pages[page])
+        if not results:
+            break
+        news_results.extend(results)
+        if not has_next:
+            break
+        page += 1
+    return news_results
+
+
+def _install_fake_transport(pages: List[bytes], latency: float, scale: float) -> None:
+    """Replace make_request with a fixture server that keeps the new fetcher's jitter"""
+
+    def fake_make_request(url, headers):
+        time.sleep(random.uniform(*googlenews_utils.REQUEST_JITTER_SECONDS) * scale)
+        time.sleep(latency * scale)
+        return _FakeResponse(pages[_page_from_url(url)])
+
+    googlenews_utils.make_request = fake_make_request
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(scale: float = 0.05, latency: float = 0.4, repeat: int = 50) -> None:
+    """
+    Run the benchmark
+
+    Args:
+        scale: Multiplier applied to every sleep and to the simulated latency
+        latency: Simulated network latency per page, in seconds
+        repeat: Number of timed parse iterations per fixture page
+    """
+    random.seed(0)
+    pages = load_fixtures()
+    check_parser(pages)
+
+    print(f"{'fixture':<12} {'bytes':>8} {'results':>8} {'parse ms':>9}")
+    for index, html in enumerate(pages):
+        _, seconds = _timed(lambda: [googlenews_utils.parse_news_page(html) for _ in range(repeat)])
+        results, _ = googlenews_utils.parse_news_page(html)
+        print(f"page_{index:<7} {len(html):>8} {len(results):>8} {seconds / repeat * 1e3:>9.3f}")
+
+    legacy, legacy_s = _timed(_legacy_get_news, pages, latency, scale)
+    _install_fake_transport(pages, latency, scale)
+    fresh, new_s = _timed(googlenews_utils.getNewsData, "NVDA", "2024-05-01", "2024-05-08")
+    cached, cached_s = _timed(googlenews_utils.getNewsData, "NVDA", "2024-05-01", "2024-05-08")
+    early, early_s = _timed(googlenews_utils.getNewsData, "NVDA", "2024-04-01", "2024-05-08", max_results=10)
+
+    if [r["link"] for r in fresh] != [r["link"] for r in legacy] or cached != fresh:
+        raise AssertionError("New fetcher returned different results from the original loop")
+    if len(early) != 10:
+        raise AssertionError("max_results did not cap the result count")
+
+    print()
+    print(f"{'fetch (3 pages, scaled up)':<32} {'results':>8} {'seconds':>9}")
+    print(f"{'original sequential':<32} {len(legacy):>8} {legacy_s / scale:>9.2f}")
+    print(f"{'concurrent':<32} {len(fresh):>8} {new_s / scale:>9.2f}")
+    print(f"{'cached repeat':<32} {len(cached):>8} {cached_s / scale:>9.4f}")
+    print(f"{'early stop (max_results=10)':<32} {len(early):>8} {early_s / scale:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=float, default=0.05)
+    parser.add_argument("--latency", type=float, default=0.4)
+    parser.add_argument("--repeat", type=int, default=50)
+    cli_args = parser.parse_args()
+    main(cli_args.scale, cli_args.latency, cli_args.repeat)
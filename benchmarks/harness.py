@@ -0,0 +1,427 @@
+"""
+Offline harness for running TradingAgentsXGraph without network access
+
+Provides the pieces the graph benchmarks share:
+
+- ScriptedChatModel: a deterministic fake chat model. Analysts bound to tools
+  get one scripted round of tool calls, then a report; every other agent gets
+  a reply of realistic length derived from a hash of its prompt, so repeated
+  runs see identical text. Token usage is reported so run profiles are filled.
+- Fixture vendors: stand-ins for every dataflow method, registered in
+  VENDOR_METHODS as the "fixture" vendor and served from
+  benchmarks/fixtures/vendors/. Calls still go through route_to_vendor and the
+  tool nodes, so dataflow overhead is part of what is measured.
+- offline_graph / offline_service: build a TradingAgentsXGraph (or a backend
+  TradingService) wired to both, with results, state logs and caches in a
+  temp dir.
+
+The fixtures are synthetic recordings of one ticker (NVDA) in the output
+format of the real vendors; any other symbol is served the same data with the
+ticker substituted.
+"""
+import hashlib
+import random
+import re
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from unittest import mock
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from tradingagents.default_config import DEFAULT_CONFIG
+from tradingagents.dataflows.interface import VENDOR_METHODS
+from tradingagents.dataflows.table_encoder import encode_table
+from tradingagents.graph.prefetch import CORE_INDICATORS
+from tradingagents.graph.state_log import StateLogger
+from tradingagents.utils.client_pool import client_registry
+from tradingagents.utils.logging_utils import configure_logging
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures" / "vendors"
+FIXTURE_TICKER = "NVDA"
+FIXTURE_VENDOR = "fixture"
+DEFAULT_TRADE_DATE = "2024-05-31"
+ALL_ANALYSTS = ("market", "social", "news", "fundamentals")
+
+# ---------------------------------------------------------------------------
+# Fixture vendors
+# ---------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=None)
+def _fixture_text(name: str) -> str:
+    path = FIXTURE_DIR / name
+    if not path.exists():
+        path = FIXTURE_DIR / FIXTURE_TICKER / name
+    return path.read_text(encoding="utf-8")
+
+
+def _for_symbol(text: str, symbol: str) -> str:
+    return text.replace(FIXTURE_TICKER, symbol.upper())
+
+
+@lru_cache(maxsize=None)
+def _price_rows() -> Tuple[Tuple[str, ...], Tuple[Tuple[str, ...], ...]]:
+    lines = _fixture_text("stock_data.csv").splitlines()
+    header = tuple(lines[0].split(","))
+    return header, tuple(tuple(line.split(",")) for line in lines[1:])
+
+
+def fixture_stock_data(symbol: str, start_date: str, end_date: str) -> str:
+    """get_stock_data stand-in, formatted like the yfinance vendor"""
+    header, rows = _price_rows()
+    selected = [row for row in rows if start_date <= row[0] <= end_date]
+    if not selected:
+        return f"找不到 '{symbol}' 在 {start_date} 和 {end_date} 之間的數據"
+    csv_text = "\n".join(",".join(row) for row in (header, *selected))
+    return (
+        f"# {symbol.upper()} 從 {start_date} 到 {end_date} 的股票數據\n"
+        f"# 總記錄數：{len(selected)}\n"
+        f"# 數據檢索時間：{DEFAULT_TRADE_DATE} 16:00:00\n\n"
+        + encode_table(csv_text, "get_stock_data", time_series=True)
+    )
+
+
+@lru_cache(maxsize=None)
+def _indicator_series(indicator: str) -> Optional[Dict[str, float]]:
+    """Compute the indicators the scripted analysts ask for from the fixture closes"""
+    _, rows = _price_rows()
+    dates = [row[0] for row in rows]
+    closes = [float(row[4]) for row in rows]
+
+    def sma(window: int) -> List[Optional[float]]:
+        return [
+            sum(closes[i - window + 1:i + 1]) / window if i + 1 >= window else None
+            for i in range(len(closes))
+        ]
+
+    def ema(window: int) -> List[float]:
+        alpha, values = 2 / (window + 1), []
+        for close in closes:
+            values.append(close if not values else alpha * close + (1 - alpha) * values[-1])
+        return values
+
+    match = re.fullmatch(r"close_(\d+)_(sma|ema)", indicator)
+    if match:
+        window = int(match.group(1))
+        values = sma(window) if match.group(2) == "sma" else ema(window)
+    elif indicator == "macd":
+        values = [fast - slow for fast, slow in zip(ema(12), ema(26))]
+    elif indicator == "rsi":
+        gains = [0.0] + [max(b - a, 0.0) for a, b in zip(closes, closes[1:])]
+        losses = [0.0] + [max(a - b, 0.0) for a, b in zip(closes, closes[1:])]
+        values = []
+        for i in range(len(closes)):
+            if i < 14:
+                values.append(None)
+                continue
+            gain, loss = sum(gains[i - 13:i + 1]) / 14, sum(losses[i - 13:i + 1]) / 14
+            values.append(100.0 if loss == 0 else 100 - 100 / (1 + gain / loss))
+    else:
+        return None
+    return {date: value for date, value in zip(dates, values) if value is not None}
+
+
+def fixture_indicators(symbol: str, indicator: str, curr_date: str, look_back_days: int = 30) -> str:
+    """get_indicators stand-in, formatted like the yfinance vendor"""
+    series = _indicator_series(indicator)
+    if series is None:
+        raise ValueError(f"指標 {indicator} 不在基準測試的資料中")
+    end = datetime.strptime(curr_date, "%Y-%m-%d")
+    before = end - timedelta(days=look_back_days)
+    lines = []
+    day = end
+    while day >= before:
+        date_str = day.strftime("%Y-%m-%d")
+        value = series.get(date_str)
+        lines.append(f"{date_str}: {value:.4f}" if value is not None else f"{date_str}: N/A：非交易日 (週末或假日)")
+        day -= timedelta(days=1)
+    return f"## 從 {before.strftime('%Y-%m-%d')} 到 {curr_date} 的 {indicator} 值：\n\n" + "\n".join(lines) + "\n"
+
+
+def fixture_fundamentals(ticker: str, curr_date: str) -> str:
+    return _for_symbol(_fixture_text("fundamentals.json"), ticker)
+
+
+def _statement(name: str, title: str, ticker: str, freq: str) -> str:
+    table = encode_table(_fixture_text(f"{name}.csv"), f"get_{name}", index_label="Item")
+    return f"# {ticker.upper()} 的{title} ({freq})\n\n" + table
+
+
+def fixture_balance_sheet(ticker: str, freq: str = "quarterly", curr_date: str = None) -> str:
+    return _statement("balance_sheet", "資產負債表", ticker, freq)
+
+
+def fixture_cashflow(ticker: str, freq: str = "quarterly", curr_date: str = None) -> str:
+    return _statement("cashflow", "現金流量表", ticker, freq)
+
+
+def fixture_income_statement(ticker: str, freq: str = "quarterly", curr_date: str = None) -> str:
+    return _statement("income_statement", "損益表", ticker, freq)
+
+
+def fixture_news(ticker: str, start_date: str, end_date: str) -> str:
+    return _for_symbol(_fixture_text("news.md"), ticker)
+
+
+def fixture_global_news(curr_date: str, look_back_days: int = 7, limit: int = 5) -> str:
+    return _fixture_text("global_news.md")
+
+
+def fixture_insider_sentiment(ticker: str, curr_date: str) -> str:
+    return _for_symbol(_fixture_text("insider_sentiment.md"), ticker)
+
+
+def fixture_insider_transactions(ticker: str, curr_date: str) -> str:
+    table = encode_table(_fixture_text("insider_transactions.csv"), "get_insider_transactions")
+    return f"# {ticker.upper()} 的內部人士交易\n\n" + table
+
+
+FIXTURE_VENDOR_METHODS = {
+    "get_stock_data": "benchmarks.harness:fixture_stock_data",
+    "get_indicators": "benchmarks.harness:fixture_indicators",
+    "get_fundamentals": "benchmarks.harness:fixture_fundamentals",
+    "get_balance_sheet": "benchmarks.harness:fixture_balance_sheet",
+    "get_cashflow": "benchmarks.harness:fixture_cashflow",
+    "get_income_statement": "benchmarks.harness:fixture_income_statement",
+    "get_news": "benchmarks.harness:fixture_news",
+    "get_global_news": "benchmarks.harness:fixture_global_news",
+    "get_insider_sentiment": "benchmarks.harness:fixture_insider_sentiment",
+    "get_insider_transactions": "benchmarks.harness:fixture_insider_transactions",
+}
+
+
+def install_fixture_vendors() -> None:
+    """Register the fixture stand-ins as a vendor for every dataflow method"""
+    missing = set(VENDOR_METHODS) - set(FIXTURE_VENDOR_METHODS)
+    if missing:
+        raise RuntimeError(f"No fixture vendor for: {', '.join(sorted(missing))}")
+    for method, ref in FIXTURE_VENDOR_METHODS.items():
+        VENDOR_METHODS[method][FIXTURE_VENDOR] = ref
+
+
+# ---------------------------------------------------------------------------
+# Scripted chat model
+# ---------------------------------------------------------------------------
+
+# Tool calls an analyst makes on its first turn; {ticker}, {date}, {year_ago}
+# and {week_ago} are filled from the analyst's system prompt
+TOOL_SCRIPT: Dict[str, List[Dict[str, Any]]] = {
+    "get_stock_data": [{"symbol": "{ticker}", "start_date": "{year_ago}", "end_date": "{date}"}],
+    "get_indicators": [
+        {"symbol": "{ticker}", "indicator": indicator, "curr_date": "{date}"}
+        for indicator in CORE_INDICATORS
+    ],
+    "get_news": [{"ticker": "{ticker}", "start_date": "{week_ago}", "end_date": "{date}"}],
+    "get_global_news": [{"curr_date": "{date}"}],
+    "get_fundamentals": [{"ticker": "{ticker}", "curr_date": "{date}"}],
+    "get_balance_sheet": [{"ticker": "{ticker}", "curr_date": "{date}"}],
+    "get_cashflow": [{"ticker": "{ticker}", "curr_date": "{date}"}],
+    "get_income_statement": [{"ticker": "{ticker}", "curr_date": "{date}"}],
+}
+
+_PROMPT_CONTEXT = re.compile(r"目前日期是 (\d{4}-\d{2}-\d{2}).*?股票代碼：([^）)\s]+)", re.S)
+
+# The signal processor asks for a bare decision
+_DECISION_PROMPT_MARKER = "提取投資決策"
+
+_DECISIONS = (("買入", "BUY"), ("持有", "HOLD"), ("賣出", "SELL"))
+
+_SENTENCES = (
+    "過去一季營收年增率維持在高檔，資料中心業務仍是主要的成長來源。",
+    "毛利率受惠於產品組合改善而擴張，但管理層提醒下半年零組件成本可能上升。",
+    "50 日均線持續位於 200 日均線之上，中期趨勢維持多頭排列。",
+    "RSI 接近 70，短線存在超買風險，回檔時需留意 50 日均線的支撐。",
+    "MACD 柱狀體由正轉負的跡象尚不明顯，動能仍偏向多方。",
+    "新聞面以大型雲端業者上調資本支出為主，需求能見度延伸至明年。",
+    "出口管制的不確定性仍可能影響特定地區的銷售，是主要的政策風險。",
+    "內部人士近期以賣出為主，但多屬預先排定的交易計畫，訊號意義有限。",
+    "估值已反映相當程度的成長預期，本益比高於半導體同業平均。",
+    "自由現金流充沛，公司持續透過庫藏股回饋股東，資產負債表穩健。",
+    "競爭對手推出的加速器產品可能在明年起逐步瓜分部分市占率。",
+    "選擇權市場隱含波動度偏高，顯示市場預期財報後股價將有較大波動。",
+    "社群討論熱度維持高檔，散戶情緒偏向樂觀，需留意情緒過熱的風險。",
+    "總體環境方面，利率維持高檔使高估值成長股的折現壓力仍在。",
+    "供應鏈消息指出先進封裝產能持續擴充，有助緩解出貨瓶頸。",
+    "若營收成長放緩至市場預期以下，股價可能出現較大幅度的修正。",
+    "綜合技術面與基本面，短期風險報酬比仍屬有利，但應控制部位規模。",
+    "建議設定移動停損，並在股價跌破關鍵支撐時降低持股比例。",
+)
+
+
+def _message_text(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+
+def _fill(template: Any, values: Dict[str, str]) -> Any:
+    if isinstance(template, str):
+        return template.format(**values)
+    if isinstance(template, dict):
+        return {key: _fill(value, values) for key, value in template.items()}
+    return template
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic chat model for offline runs
+
+    The reply depends only on the prompt, so a graph run with fixed fixtures
+    always produces the same messages, tool calls and final decision.
+    """
+
+    latency: float = 0.0
+    """Seconds to sleep per call, to simulate provider latency"""
+    reply_chars: int = 2400
+    """Approximate length of every long-form reply"""
+    bound_tools: Tuple[str, ...] = ()
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-benchmark"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "ScriptedChatModel":
+        names = tuple(getattr(tool, "name", None) or tool["name"] for tool in tools)
+        return self.model_copy(update={"bound_tools": names})
+
+    def _tool_calls(self, messages: List[BaseMessage]) -> List[Dict[str, Any]]:
+        system = next((_message_text(m) for m in messages if isinstance(m, SystemMessage)), "")
+        match = _PROMPT_CONTEXT.search(system)
+        if match is None:
+            return []
+        trade_date, ticker = match.group(1), match.group(2)
+        trade_dt = datetime.strptime(trade_date, "%Y-%m-%d")
+        values = {
+            "ticker": ticker,
+            "date": trade_date,
+            "year_ago": (trade_dt - timedelta(days=365)).strftime("%Y-%m-%d"),
+            "week_ago": (trade_dt - timedelta(days=7)).strftime("%Y-%m-%d"),
+        }
+        calls = []
+        for name in self.bound_tools:
+            for args in TOOL_SCRIPT.get(name, []):
+                calls.append({"name": name, "args": _fill(args, values), "id": f"call_{len(calls)}", "type": "tool_call"})
+        return calls
+
+    def _reply(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        rng = random.Random(digest)
+        paragraphs, length = [], 0
+        while length < self.reply_chars:
+            paragraph = "".join(rng.sample(_SENTENCES, 4))
+            paragraphs.append(paragraph)
+            length += len(paragraph)
+        label = _DECISIONS[digest[0] % len(_DECISIONS)][0]
+        return "\n\n".join(paragraphs) + f"\n\n最終交易提案：**{label}**"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = "\n".join(_message_text(m) for m in messages)
+
+        tool_calls = []
+        if self.bound_tools and not any(isinstance(m, ToolMessage) for m in messages):
+            tool_calls = self._tool_calls(messages)
+        if tool_calls:
+            content = ""
+        elif _DECISION_PROMPT_MARKER in prompt[:400]:
+            content = next((code for label, code in _DECISIONS if f"**{label}**" in prompt[-200:]), "HOLD")
+        else:
+            content = self._reply(prompt)
+
+        message = AIMessage(
+            content=content,
+            tool_calls=tool_calls,
+            usage_metadata={
+                "input_tokens": len(prompt) // 2,
+                "output_tokens": max(len(content) // 2, 1),
+                "total_tokens": len(prompt) // 2 + max(len(content) // 2, 1),
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+# ---------------------------------------------------------------------------
+# Graph and service builders
+# ---------------------------------------------------------------------------
+
+
+def offline_config(work_dir: str, **overrides: Any) -> Dict[str, Any]:
+    """A DEFAULT_CONFIG copy that routes every dataflow method to the fixtures"""
+    config = DEFAULT_CONFIG.copy()
+    config.update({
+        "results_dir": str(Path(work_dir) / "results"),
+        "data_cache_dir": str(Path(work_dir) / "data_cache"),
+        "llm_cache_mode": "passthrough",
+        "data_vendors": {category: FIXTURE_VENDOR for category in DEFAULT_CONFIG["data_vendors"]},
+        "tool_vendors": {},
+        "quick_think_api_key": "offline",
+        "deep_think_api_key": "offline",
+        "embedding_api_key": "offline",
+        # The scripted replies trip the report length warnings on every node
+        "log_level": "ERROR",
+    })
+    config.update(overrides)
+    return config
+
+
+@contextmanager
+def offline_environment(latency: float = 0.0, reply_chars: int = 2400) -> Iterator[str]:
+    """
+    Install the fixture vendors and the scripted chat model for the duration of the block
+
+    Yields:
+        A temporary working directory for results, state logs and caches,
+        seeded with the fixture price history the backend charts read
+    """
+    install_fixture_vendors()
+    # Logging is process-wide and no longer set up by the graph; keep benchmark output quiet
+    configure_logging("ERROR")
+    work_dir = tempfile.mkdtemp(prefix="tradingagents-bench-")
+    cache_dir = Path(work_dir) / "data_cache"
+    cache_dir.mkdir()
+    shutil.copy(FIXTURE_DIR / FIXTURE_TICKER / "stock_data.csv", cache_dir / f"{FIXTURE_TICKER}-YFin-data-2023-01-03-2024-12-31.csv")
+
+    from tradingagents.graph import trading_graph
+
+    chat_model = ScriptedChatModel(latency=latency, reply_chars=reply_chars)
+    # Every graph built in this environment shares one state logger rooted in the work dir
+    state_logger = StateLogger(str(Path(work_dir) / "eval_results"))
+
+    try:
+        with mock.patch.object(client_registry, "get_chat_model", lambda *args, **kwargs: chat_model), \
+                mock.patch.object(trading_graph, "get_state_logger", lambda *args, **kwargs: state_logger):
+            yield work_dir
+    finally:
+        # Background state log writes must land before the work dir is removed
+        state_logger.flush()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def offline_graph(work_dir: str, analysts: Sequence[str] = ALL_ANALYSTS, **config_overrides: Any):
+    """Build a TradingAgentsXGraph; call inside offline_environment"""
+    from tradingagents.graph.trading_graph import TradingAgentsXGraph
+
+    return TradingAgentsXGraph(list(analysts), config=offline_config(work_dir, **config_overrides))
+
+
+def offline_service(work_dir: str, **config_overrides: Any):
+    """Build a backend TradingService whose graphs use the fixtures; call inside offline_environment"""
+    from backend.app.services.trading_service import TradingService
+
+    service = TradingService()
+    service.default_config = offline_config(work_dir, **config_overrides)
+    return service
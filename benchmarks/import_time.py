@@ -0,0 +1,127 @@
+"""
+Import-time benchmark for TradingAgentsX entry points
+
+Imports each entry point in a fresh interpreter with `python -X importtime`,
+reports the cumulative import time and the slowest top-level packages, and
+fails if any optional-at-import-time dependency (vendor SDKs, LLM provider
+integrations, chromadb) is loaded before it is actually used.
+
+Run with: python -m benchmarks.import_time [--repeat 3]
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# Entry points measured by default
+ENTRY_POINTS = (
+    "tradingagents.graph.trading_graph",
+    "cli.main",
+    "backend.app.main",
+)
+
+# Packages that must only be imported on first use
+DEFERRED_PACKAGES = (
+    "chromadb",
+    "yfinance",
+    "polars",
+    "stockstats",
+    "bs4",
+    "tqdm",
+    "langchain_openai",
+    "langchain_anthropic",
+    "langchain_google_genai",
+    "anthropic",
+    "openai",
+)
+
+# Deferred packages an entry point legitimately needs at import time
+ALLOWED_EAGER = {
+    # The price chart service is built on polars
+    "backend.app.main": ("polars",),
+}
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Import a module in a fresh interpreter
+
+    Returns:
+        Total cumulative import time in seconds, and cumulative seconds per
+        top-level package (only packages imported at the outermost level)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    total = 0.0
+    packages: Dict[str, float] = defaultdict(float)
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative_us, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        # Entries with a single space of indent are imported directly by the entry point's import chain root
+        if indent <= 1:
+            total += cumulative_us / 1e6
+        packages[name.split(".")[0]] = max(packages[name.split(".")[0]], cumulative_us / 1e6)
+    return total, packages
+
+
+def loaded_deferred_packages(module: str) -> List[str]:
+    """Return the deferred packages that importing the module pulls in"""
+    probe = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {DEFERRED_PACKAGES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return [name for name in result.stdout.strip().split(",") if name]
+
+
+def main(entry_points=ENTRY_POINTS, repeat: int = 3, top: int = 8) -> None:
+    """
+    Run the benchmark
+
+    Args:
+        entry_points: Modules to import
+        repeat: Fresh-interpreter imports per module; the median is reported
+        top: Number of slowest top-level packages to list per module
+    """
+    failures = []
+    for module in entry_points:
+        runs = [measure(module) for _ in range(repeat)]
+        median_total = statistics.median(total for total, _ in runs)
+        _, packages = runs[-1]
+        print(f"{module}: {median_total * 1e3:.0f} ms (median of {repeat})")
+        for name, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+            print(f"    {name:<28} {seconds * 1e3:>8.0f} ms")
+
+        eager = [
+            name for name in loaded_deferred_packages(module)
+            if name not in ALLOWED_EAGER.get(module, ())
+        ]
+        if eager:
+            failures.append(f"{module} eagerly imports: {', '.join(eager)}")
+
+    if failures:
+        raise AssertionError("\n".join(failures))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("modules", nargs="*", default=list(ENTRY_POINTS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8)
+    cli_args = parser.parse_args()
+    main(cli_args.modules, cli_args.repeat, cli_args.top)
@@ -0,0 +1,128 @@
+"""
+Micro-benchmark for the PDFGenerator markdown cleaning pipeline
+
+Compares the precompiled, trigger-gated rule pipeline in PDFGenerator against
+the original inline re.sub passes, checks that both produce identical text,
+and reports the time per report.
+
+Sample reports are read from report/ (*.md, *.txt, and *.pdf when pypdf is
+installed). Run with: python -m benchmarks.pdf_markdown [report_dir]
+"""
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+from typing import List, Tuple
+
+from backend.app.services.pdf_generator import PDFGenerator
+
+
+def _legacy_clean_markdown(text: str) -> str:
+    """The pre-optimization PDFGenerator._clean_markdown, kept as the reference"""
+    text = unicodedata.normalize('NFKC', text)
+    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
+    text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
+    text = re.sub(r'__(.+?)__', r'\1', text)
+    text = re.sub(r'(?<![\*])\*([^\*]+?)\*(?![\*])', r'\1', text)
+    text = re.sub(r'(?<![_])_([^_]+?)_(?![_])', r'\1', text)
+    text = re.sub(r'```[^`]*?```', '', text, flags=re.DOTALL)
+    text = re.sub(r'`([^`]+?)`', r'\1', text)
+    text = re.sub(r'^\s*[\*\-\+]\s+', '- ', text, flags=re.MULTILINE)
+    text = re.sub(r'^[\-\*_]{3,}\s*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*\|?\s*:?-+:?\s*\|?\s*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*\|', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\|\s*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\|', ' | ', text)
+    text = re.sub(r' {2,}', ' ', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = re.sub(r'^[\*_`~#\-\+]+\s*$', '', text, flags=re.MULTILINE)
+    return text.strip()
+
+
+# Markdown that exercises every cleaning rule; used in addition to the
+# sample reports, which are stored as already-rendered PDFs
+_SYNTHETIC_REPORT = """# 📊 市場分析報告
+
+## 技術指標 ✅
+
+| 指標 | 數值 | 訊號 |
+|:-----|-----:|:----:|
+| **RSI** | 62.4 | ⚠️ 接近超買 |
+| *MACD* | 1.25 | 📈 看漲 |
+
+- 50 日均線 `close_50_sma` 持續上升 🚀
+* 布林通道上軌 __突破__ [來源](https://example.com)
++ 成交量 <放大> & "確認" 'trend'
+
+---
+
+```python
+print("code block")
+```
+
+
+
+### 結論 ⬆️
+整體 _偏多_，目標價 $150。
+"""
+
+
+def load_sample_reports(report_dir: Path) -> List[Tuple[str, str]]:
+    """Load (name, text) pairs from the sample report directory"""
+    samples = [("synthetic", _SYNTHETIC_REPORT)]
+    for path in sorted(report_dir.rglob("*")):
+        if path.suffix in (".md", ".txt"):
+            samples.append((path.name, path.read_text(encoding="utf-8")))
+        elif path.suffix == ".pdf":
+            try:
+                from pypdf import PdfReader
+            except ImportError:
+                continue
+            text = "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+            samples.append((path.name, text))
+    return samples
+
+
+def _time(func, text: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(report_dir: str = "report", repeat: int = 200, scale: int = 20) -> None:
+    """
+    Run the benchmark
+
+    Args:
+        report_dir: Directory containing the sample reports
+        repeat: Number of timed iterations per report
+        scale: Each report is repeated this many times to mimic long debate histories
+    """
+    # Bypass __init__ so font registration is not part of the measurement
+    generator = PDFGenerator.__new__(PDFGenerator)
+
+    def optimized(text: str) -> str:
+        return generator._clean_markdown(generator._replace_emojis(text))
+
+    def legacy(text: str) -> str:
+        return _legacy_clean_markdown(generator._replace_emojis(text))
+
+    samples = load_sample_reports(Path(report_dir))
+    print(f"{'report':<50} {'chars':>9} {'legacy ms':>10} {'new ms':>8} {'speedup':>8}")
+    total_legacy = total_new = 0.0
+    for name, text in samples:
+        text = "\n\n".join([text] * scale)
+        if optimized(text) != legacy(text):
+            raise AssertionError(f"Output mismatch for {name}")
+        legacy_s = _time(legacy, text, repeat)
+        new_s = _time(optimized, text, repeat)
+        total_legacy += legacy_s
+        total_new += new_s
+        print(f"{name:<50} {len(text):>9} {legacy_s * 1e3:>10.3f} {new_s * 1e3:>8.3f} {legacy_s / new_s:>7.2f}x")
+    print(f"{'TOTAL':<50} {'':>9} {total_legacy * 1e3:>10.3f} {total_new * 1e3:>8.3f} {total_legacy / total_new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
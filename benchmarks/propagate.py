@@ -0,0 +1,266 @@
+"""
+End-to-end benchmark for TradingAgentsXGraph.propagate, fully offline
+
+Runs the real graph with the scripted chat model and fixture vendors from
+benchmarks.harness, so no network access or API keys are needed, and reports:
+
+- graph construction time
+- propagate latency (median and max over --runs sequential runs)
+- per-node overhead: node wall time minus time spent inside the chat model,
+  which is where graph, prompt building, tool routing and dataflow costs show up
+- memory high-water mark of one propagate (tracemalloc peak) and of the process
+- throughput with 1..N concurrent runs, each building its own graph like the
+  backend does per request, with --latency seconds of simulated LLM latency
+- one backend TradingService.run_analysis call
+
+With --save the numbers are written as JSON; with --compare the run fails when
+a metric regresses past --tolerance relative to a saved baseline.
+
+Run with: python -m benchmarks.propagate [--runs 3] [--workers 1 4 8]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from typing import Dict, Iterator, List, Sequence
+
+from benchmarks.harness import (
+    ALL_ANALYSTS,
+    DEFAULT_TRADE_DATE,
+    FIXTURE_TICKER,
+    offline_environment,
+    offline_graph,
+    offline_service,
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DECISIONS = {"BUY", "SELL", "HOLD"}
+REPORT_KEYS = ("market_report", "sentiment_report", "news_report", "fundamentals_report", "final_trade_decision")
+
+# Metrics compared against a baseline, and whether higher is better
+COMPARED_METRICS = {
+    "build_seconds": False,
+    "propagate_median_seconds": False,
+    "graph_overhead_seconds": False,
+    "peak_traced_mb": False,
+}
+
+
+@contextmanager
+def quiet() -> Iterator[None]:
+    """Discard the vendor routing and agent debug output while measuring"""
+    with open(os.devnull, "w", encoding="utf-8") as devnull, redirect_stdout(devnull):
+        yield
+
+
+def _check_run(final_state: Dict, decision: str) -> None:
+    empty = [key for key in REPORT_KEYS if not final_state.get(key)]
+    if empty:
+        raise AssertionError(f"propagate left these fields empty: {', '.join(empty)}")
+    if decision.strip() not in DECISIONS:
+        raise AssertionError(f"unexpected decision: {decision!r}")
+
+
+def _timed_propagate(work_dir: str, ticker: str, **config) -> Dict:
+    start = time.perf_counter()
+    graph = offline_graph(work_dir, **config)
+    built = time.perf_counter()
+    final_state, decision = graph.propagate(ticker, DEFAULT_TRADE_DATE)
+    done = time.perf_counter()
+    _check_run(final_state, decision)
+    return {
+        "build": built - start,
+        "propagate": done - built,
+        "profile": final_state["run_profile"],
+        "decision": final_state["final_trade_decision"],
+    }
+
+
+def _node_overhead(profiles: List[Dict]) -> Dict[str, Dict[str, float]]:
+    """Average per-run node time, chat model time and the difference"""
+    nodes: Dict[str, Dict[str, float]] = {}
+    for profile in profiles:
+        for name, stats in profile["nodes"].items():
+            row = nodes.setdefault(name, {"calls": 0.0, "seconds": 0.0, "llm_seconds": 0.0})
+            row["calls"] += stats["calls"] / len(profiles)
+            row["seconds"] += stats["seconds"] / len(profiles)
+            row["llm_seconds"] += stats["llm_seconds"] / len(profiles)
+    for row in nodes.values():
+        row["overhead_seconds"] = max(row["seconds"] - row["llm_seconds"], 0.0)
+    return nodes
+
+
+def _throughput(work_dir: str, workers: int, runs: int) -> Dict[str, float]:
+    tickers = [FIXTURE_TICKER, "AMD", "TSM", "AVGO"]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            lambda index: _timed_propagate(work_dir, tickers[index % len(tickers)]),
+            range(runs),
+        ))
+    elapsed = time.perf_counter() - start
+    return {
+        "workers": workers,
+        "runs": runs,
+        "runs_per_minute": runs / elapsed * 60,
+        "mean_seconds": statistics.mean(r["build"] + r["propagate"] for r in results),
+    }
+
+
+def _backend_run(work_dir: str) -> float:
+    service = offline_service(work_dir)
+    start = time.perf_counter()
+    result = asyncio.run(service.run_analysis(FIXTURE_TICKER, DEFAULT_TRADE_DATE, openai_api_key="offline"))
+    elapsed = time.perf_counter() - start
+    if result["status"] != "success":
+        raise AssertionError(f"backend run failed: {result.get('error')}")
+    if not result["price_data"]:
+        raise AssertionError("backend run did not load the fixture price history")
+    return elapsed
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return the metrics that regressed by more than tolerance against the baseline"""
+    regressions = []
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        old, new = baseline.get(metric), results.get(metric)
+        if not old or new is None:
+            continue
+        change = (old - new) / old if higher_is_better else (new - old) / old
+        if change > tolerance:
+            regressions.append(f"{metric}: {old:.3f} -> {new:.3f} ({change:+.0%})")
+    for old, new in zip(baseline.get("throughput", []), results.get("throughput", [])):
+        if old["workers"] == new["workers"] and new["runs_per_minute"] < old["runs_per_minute"] * (1 - tolerance):
+            regressions.append(
+                f"throughput x{new['workers']}: {old['runs_per_minute']:.1f} -> {new['runs_per_minute']:.1f} runs/min"
+            )
+    return regressions
+
+
+def main(
+    runs: int = 3,
+    workers: Sequence[int] = (1, 4, 8),
+    latency: float = 0.05,
+    reply_chars: int = 2400,
+    backend: bool = True,
+    save: str = None,
+    baseline: str = None,
+    tolerance: float = 0.5,
+) -> Dict:
+    """
+    Run the benchmark
+
+    Args:
+        runs: Sequential propagate runs for the latency and per-node numbers
+        workers: Concurrency levels for the throughput measurement
+        latency: Simulated seconds per chat model call in the throughput runs
+        reply_chars: Length of every long-form scripted reply
+        backend: Also time one backend TradingService.run_analysis call
+        save: Write the results as JSON to this path
+        baseline: Fail if a metric regresses past tolerance against this JSON file
+        tolerance: Allowed relative regression, e.g. 0.5 for 50%
+    """
+    results: Dict = {}
+
+    # Sequential runs without LLM latency: everything measured is harness-free overhead
+    with offline_environment(latency=0.0, reply_chars=reply_chars) as work_dir, quiet():
+        _timed_propagate(work_dir, FIXTURE_TICKER)  # warm imports and fixture caches
+        sequential = [_timed_propagate(work_dir, FIXTURE_TICKER) for _ in range(runs)]
+
+        tracemalloc.start()
+        _timed_propagate(work_dir, FIXTURE_TICKER)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    if len({run["decision"] for run in sequential}) != 1:
+        raise AssertionError("scripted runs produced different final decisions")
+
+    profiles = [run["profile"] for run in sequential]
+    nodes = _node_overhead(profiles)
+    results["build_seconds"] = statistics.median(run["build"] for run in sequential)
+    results["propagate_median_seconds"] = statistics.median(run["propagate"] for run in sequential)
+    results["propagate_max_seconds"] = max(run["propagate"] for run in sequential)
+    results["graph_overhead_seconds"] = sum(row["overhead_seconds"] for row in nodes.values())
+    results["llm_calls"] = profiles[-1]["totals"]["llm_calls"]
+    results["tool_calls"] = profiles[-1]["totals"]["tool_calls"]
+    results["vendor_calls"] = profiles[-1]["totals"]["vendor_calls"]
+    results["peak_traced_mb"] = peak / 2 ** 20
+
+    with offline_environment(latency=latency, reply_chars=reply_chars) as work_dir, quiet():
+        results["throughput"] = [_throughput(work_dir, count, max(count * 2, 2)) for count in workers]
+        if backend:
+            results["backend_seconds"] = _backend_run(work_dir)
+
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        results["max_rss_mb"] = max_rss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+    print(f"analysts: {', '.join(ALL_ANALYSTS)}   runs: {runs}   reply: {reply_chars} chars")
+    print(f"graph build            {results['build_seconds'] * 1e3:>9.1f} ms")
+    print(f"propagate (median)     {results['propagate_median_seconds'] * 1e3:>9.1f} ms")
+    print(f"propagate (max)        {results['propagate_max_seconds'] * 1e3:>9.1f} ms")
+    print(f"calls per run          {results['llm_calls']} llm, {results['tool_calls']} tool, {results['vendor_calls']} vendor")
+    print(f"peak traced memory     {results['peak_traced_mb']:>9.1f} MB")
+    if "max_rss_mb" in results:
+        print(f"process max RSS        {results['max_rss_mb']:>9.1f} MB")
+
+    print()
+    print(f"{'node':<28} {'calls':>6} {'node ms':>9} {'llm ms':>9} {'overhead ms':>12}")
+    for name, row in sorted(nodes.items(), key=lambda item: item[1]["overhead_seconds"], reverse=True):
+        print(
+            f"{name:<28} {row['calls']:>6.1f} {row['seconds'] * 1e3:>9.1f} "
+            f"{row['llm_seconds'] * 1e3:>9.1f} {row['overhead_seconds'] * 1e3:>12.1f}"
+        )
+    print(f"{'total':<28} {'':>6} {'':>9} {'':>9} {results['graph_overhead_seconds'] * 1e3:>12.1f}")
+
+    print()
+    print(f"throughput with {latency * 1e3:.0f} ms simulated LLM latency per call")
+    print(f"{'workers':>8} {'runs':>5} {'runs/min':>9} {'mean s':>8}")
+    for row in results["throughput"]:
+        print(f"{row['workers']:>8} {row['runs']:>5} {row['runs_per_minute']:>9.1f} {row['mean_seconds']:>8.2f}")
+    if backend:
+        print(f"\nbackend run_analysis   {results['backend_seconds']:>9.2f} s")
+
+    if save:
+        with open(save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if baseline:
+        with open(baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), tolerance)
+        if regressions:
+            raise AssertionError("Regressions against baseline:\n" + "\n".join(regressions))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--reply-chars", type=int, default=2400)
+    parser.add_argument("--no-backend", action="store_true")
+    parser.add_argument("--save", help="write the results as JSON to this path")
+    parser.add_argument("--compare", help="baseline JSON written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    cli_args = parser.parse_args()
+    main(
+        cli_args.runs,
+        cli_args.workers,
+        cli_args.latency,
+        cli_args.reply_chars,
+        not cli_args.no_backend,
+        cli_args.save,
+        cli_args.compare,
+        cli_args.tolerance,
+    )
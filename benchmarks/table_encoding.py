@@ -0,0 +1,93 @@
+"""
+Token savings of the table encoder for every tabular tool output, fully offline
+
+Loads the fixture tables from benchmarks/fixtures/vendors the way the vendors
+receive them (pandas DataFrames), renders them the way the tools used to
+(DataFrame.to_csv, or str() of a polars frame for the local price window), and
+compares the estimated prompt tokens against every table_encoder format.
+
+Run with: python -m benchmarks.table_encoding [--max-rows 30]
+"""
+import argparse
+import io
+from typing import Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from benchmarks.harness import _fixture_text
+from tradingagents.agents.utils.context_budget import estimate_tokens
+from tradingagents.dataflows.table_encoder import TABLE_FORMATS, encode_table
+
+
+def _prices() -> pd.DataFrame:
+    data = pd.read_csv(io.StringIO(_fixture_text("stock_data.csv")), parse_dates=["Date"], index_col="Date")
+    # yfinance returns unrounded floats; the fixture stores them rounded
+    return data * 1.0000001
+
+
+def _statement(name: str) -> pd.DataFrame:
+    data = pd.read_csv(io.StringIO(_fixture_text(f"{name}.csv")), index_col=0)
+    data.columns = pd.to_datetime(data.columns)
+    return data
+
+
+def _insider() -> pd.DataFrame:
+    return pd.read_csv(io.StringIO(_fixture_text("insider_transactions.csv")))
+
+
+def _polars_window() -> Tuple[str, object]:
+    try:
+        import polars as pl
+    except ImportError:
+        return "", None
+    frame = pl.from_pandas(_prices().reset_index().tail(30))
+    return str(frame), frame
+
+
+# tool -> (data loader, legacy rendering, encoder keyword arguments)
+TABLES: Dict[str, Tuple[Callable, Callable, Dict]] = {
+    "get_stock_data": (_prices, lambda data: data.round(2).to_csv(), {"index_label": "Date", "time_series": True}),
+    "get_balance_sheet": (lambda: _statement("balance_sheet"), lambda data: data.to_csv(), {"index_label": "Item"}),
+    "get_cashflow": (lambda: _statement("cashflow"), lambda data: data.to_csv(), {"index_label": "Item"}),
+    "get_income_statement": (lambda: _statement("income_statement"), lambda data: data.to_csv(), {"index_label": "Item"}),
+    "get_insider_transactions": (_insider, lambda data: data.to_csv(), {}),
+}
+
+
+def measure(max_rows: int = None, precision: int = 2) -> List[Dict]:
+    """Return one row per tool with the legacy token count and the count for every format"""
+    rows = []
+    for tool, (load, legacy, kwargs) in TABLES.items():
+        data = load()
+        row = {"tool": tool, "legacy": estimate_tokens(legacy(data))}
+        for fmt in TABLE_FORMATS:
+            row[fmt] = estimate_tokens(encode_table(data, tool, fmt=fmt, precision=precision, max_rows=max_rows, **kwargs))
+        rows.append(row)
+
+    legacy_window, frame = _polars_window()
+    if frame is not None:
+        row = {"tool": "get_YFin_data_window", "legacy": estimate_tokens(legacy_window)}
+        for fmt in TABLE_FORMATS:
+            row[fmt] = estimate_tokens(encode_table(frame, row["tool"], fmt=fmt, precision=precision, time_series=True))
+        rows.append(row)
+    return rows
+
+
+def main(max_rows: int = None, precision: int = 2) -> List[Dict]:
+    rows = measure(max_rows, precision)
+    print(f"estimated tokens per tool output (precision {precision}, max rows {max_rows or 'all'})")
+    print(f"{'tool':<26} {'legacy':>7}" + "".join(f" {fmt:>9} {'saved':>6}" for fmt in TABLE_FORMATS))
+    for row in rows:
+        cells = "".join(
+            f" {row[fmt]:>9} {1 - row[fmt] / row['legacy']:>6.0%}" for fmt in TABLE_FORMATS
+        )
+        print(f"{row['tool']:<26} {row['legacy']:>7}{cells}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-rows", type=int, default=None, help="downsample price tables to this many rows")
+    parser.add_argument("--precision", type=int, default=2)
+    cli_args = parser.parse_args()
+    main(cli_args.max_rows, cli_args.precision)
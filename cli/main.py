@@ -27,6 +27,12 @@ from rich.rule import Rule
 # 匯入專案內的模組
 from tradingagents.graph.trading_graph import TradingAgentsXGraph
 from tradingagents.default_config import DEFAULT_CONFIG
+from tradingagents.utils.logging_utils import configure_logging
+from tradingagents.utils.instrumentation import (
+    ProfilingCallbackHandler,
+    format_profile_rows,
+    profile_run,
+)
 from cli.models import AnalystType
 from cli.utils import *
 
@@ -771,6 +777,51 @@ def display_complete_report(final_state):
             )
 
 
+def display_run_profile(run_profile):
+    """顯示本次執行各節點的耗時與 token 用量摘要。"""
+    table = Table(
+        title=f"執行剖析（總耗時 {run_profile['wall_seconds']:.1f} 秒）",
+        box=box.SIMPLE_HEAD,
+        title_style="bold magenta",
+        header_style="bold magenta",
+    )
+    table.add_column("節點", style="cyan")
+    for column in ("次數", "耗時 (秒)", "LLM 呼叫", "輸入 token", "輸出 token", "快取 token"):
+        table.add_column(column, justify="right")
+
+    for row in format_profile_rows(run_profile):
+        table.add_row(*row)
+
+    totals = run_profile["totals"]
+    table.add_section()
+    table.add_row(
+        "總計",
+        "",
+        f"{run_profile['wall_seconds']:.2f}",
+        str(totals["llm_calls"]),
+        str(totals["prompt_tokens"]),
+        str(totals["completion_tokens"]),
+        str(totals["cached_tokens"]),
+        style="bold",
+    )
+    console.print(table)
+    console.print(
+        f"[dim]工具呼叫 {totals['tool_calls']} 次，資料供應商呼叫 {totals['vendor_calls']} 次[/dim]"
+    )
+    debate_labels = {"investment": "投資辯論", "risk": "風險討論"}
+    for debate, stats in run_profile.get("debates", {}).items():
+        if stats["rounds_saved"]:
+            console.print(
+                f"[dim]{debate_labels.get(debate, debate)}已收斂，提前結束並節省 {stats['rounds_saved']} 回合[/dim]"
+            )
+    for tool, stats in run_profile.get("tables", {}).items():
+        if stats["baseline_tokens"]:
+            saved = 1 - stats["encoded_tokens"] / stats["baseline_tokens"]
+            console.print(
+                f"[dim]{tool} 表格編碼：{stats['baseline_tokens']} → {stats['encoded_tokens']} token（節省 {saved:.0%}）[/dim]"
+            )
+
+
 def update_research_team_status(status):
     """更新所有研究團隊成員和交易員的狀態。"""
     research_team = ["Bull Researcher", "Bear Researcher", "Research Manager", "Trader"]
@@ -815,11 +866,9 @@ def run_analysis():
     config["deep_think_api_key"] = selections["deep_think_api_key"]
     config["embedding_api_key"] = selections["embedding_api_key"]
     config["embedding_base_url"] = selections["embedding_url"]
-    
-    # 設置環境變數（某些工具可能需要）
-    import os
-    os.environ["OPENAI_API_KEY"] = selections["quick_think_api_key"]
-    os.environ["ALPHA_VANTAGE_API_KEY"] = selections["alpha_vantage_api_key"]
+    # 資料工具（OpenAI 新聞搜索、Alpha Vantage）使用的金鑰，隨本次執行的設定傳遞
+    config["openai_api_key"] = selections["quick_think_api_key"]
+    config["alpha_vantage_api_key"] = selections["alpha_vantage_api_key"]
 
     # 初始化圖
     graph = TradingAgentsXGraph(
@@ -916,246 +965,252 @@ def run_analysis():
         )
         update_display(layout, spinner_text)
 
-        # 初始化狀態並獲取圖參數
-        init_agent_state = graph.propagator.create_initial_state(
+        # 初始化狀態並獲取圖參數；整個串流過程都在圖的設定與剖析範圍內
+        with graph.config_scope(), profile_run() as profile, graph.prefetch_run(
             selections["ticker"], selections["analysis_date"]
-        )
-        args = graph.propagator.get_graph_args()
-
-        # 串流分析
-        trace = []
-        for chunk in graph.graph.stream(init_agent_state, **args):
-            if len(chunk["messages"]) > 0:
-                # 獲取區塊中的最後一條訊息
-                last_message = chunk["messages"][-1]
-
-                # 提取訊息內容和類型
-                if hasattr(last_message, "content"):
-                    content = extract_content_string(last_message.content)  # 使用輔助函式
-                    msg_type = "推理"
-                else:
-                    content = str(last_message)
-                    msg_type = "系統"
-
-                # 將訊息新增到緩衝區
-                message_buffer.add_message(msg_type, content)                
-
-                # 如果是工具呼叫，則將其新增到工具呼叫中
-                if hasattr(last_message, "tool_calls"):
-                    for tool_call in last_message.tool_calls:
-                        # 處理字典和物件兩種工具呼叫格式
-                        if isinstance(tool_call, dict):
-                            message_buffer.add_tool_call(
-                                tool_call["name"], tool_call["args"]
-                            )
-                        else:
-                            message_buffer.add_tool_call(tool_call.name, tool_call.args)
-
-                # 根據區塊內容更新報告和代理狀態
-                # 分析師團隊報告
-                if "market_report" in chunk and chunk["market_report"]:
-                    message_buffer.update_report_section(
-                        "market_report", chunk["market_report"]
-                    )
-                    message_buffer.update_agent_status("Market Analyst", "completed")
-                    # 將下一個分析師設定為進行中
-                    if "social" in selections["analysts"]:
-                        message_buffer.update_agent_status(
-                            "Social Analyst", "in_progress"
-                        )
+        ):
+            init_agent_state = graph.propagator.create_initial_state(
+                selections["ticker"], selections["analysis_date"]
+            )
+            args = graph.propagator.get_graph_args(
+                callbacks=[ProfilingCallbackHandler(profile)]
+            )
 
-                if "sentiment_report" in chunk and chunk["sentiment_report"]:
-                    message_buffer.update_report_section(
-                        "sentiment_report", chunk["sentiment_report"]
-                    )
-                    message_buffer.update_agent_status("Social Analyst", "completed")
-                    # 將下一個分析師設定為進行中
-                    if "news" in selections["analysts"]:
-                        message_buffer.update_agent_status(
-                            "News Analyst", "in_progress"
+            # 串流分析
+            trace = []
+            for chunk in graph.graph.stream(init_agent_state, **args):
+                if len(chunk["messages"]) > 0:
+                    # 獲取區塊中的最後一條訊息
+                    last_message = chunk["messages"][-1]
+
+                    # 提取訊息內容和類型
+                    if hasattr(last_message, "content"):
+                        content = extract_content_string(last_message.content)  # 使用輔助函式
+                        msg_type = "推理"
+                    else:
+                        content = str(last_message)
+                        msg_type = "系統"
+
+                    # 將訊息新增到緩衝區
+                    message_buffer.add_message(msg_type, content)                
+
+                    # 如果是工具呼叫，則將其新增到工具呼叫中
+                    if hasattr(last_message, "tool_calls"):
+                        for tool_call in last_message.tool_calls:
+                            # 處理字典和物件兩種工具呼叫格式
+                            if isinstance(tool_call, dict):
+                                message_buffer.add_tool_call(
+                                    tool_call["name"], tool_call["args"]
+                                )
+                            else:
+                                message_buffer.add_tool_call(tool_call.name, tool_call.args)
+
+                    # 根據區塊內容更新報告和代理狀態
+                    # 分析師團隊報告
+                    if "market_report" in chunk and chunk["market_report"]:
+                        message_buffer.update_report_section(
+                            "market_report", chunk["market_report"]
                         )
+                        message_buffer.update_agent_status("Market Analyst", "completed")
+                        # 將下一個分析師設定為進行中
+                        if "social" in selections["analysts"]:
+                            message_buffer.update_agent_status(
+                                "Social Analyst", "in_progress"
+                            )
 
-                if "news_report" in chunk and chunk["news_report"]:
-                    message_buffer.update_report_section(
-                        "news_report", chunk["news_report"]
-                    )
-                    message_buffer.update_agent_status("News Analyst", "completed")
-                    # 將下一個分析師設定為進行中
-                    if "fundamentals" in selections["analysts"]:
-                        message_buffer.update_agent_status(
-                            "Fundamentals Analyst", "in_progress"
+                    if "sentiment_report" in chunk and chunk["sentiment_report"]:
+                        message_buffer.update_report_section(
+                            "sentiment_report", chunk["sentiment_report"]
                         )
-
-                if "fundamentals_report" in chunk and chunk["fundamentals_report"]:
-                    message_buffer.update_report_section(
-                        "fundamentals_report", chunk["fundamentals_report"]
-                    )
-                    message_buffer.update_agent_status(
-                        "Fundamentals Analyst", "completed"
-                    )
-                    # 將所有研究團隊成員設定為進行中
-                    update_research_team_status("in_progress")
-
-                # 研究團隊 - 處理投資辯論狀態
-                if (
-                    "investment_debate_state" in chunk
-                    and chunk["investment_debate_state"]
-                ):
-                    debate_state = chunk["investment_debate_state"]
-
-                    # 更新看漲研究員狀態和報告
-                    if "bull_history" in debate_state and debate_state["bull_history"]:
-                        # 保持所有研究團隊成員為進行中
-                        update_research_team_status("in_progress")
-                        # 提取最新的看漲回應
-                        bull_responses = debate_state["bull_history"].split("\n")
-                        latest_bull = bull_responses[-1] if bull_responses else ""
-                        if latest_bull:
-                            message_buffer.add_message("推理", latest_bull)
-                            # 使用看漲研究員的最新分析更新研究報告
-                            message_buffer.update_report_section(
-                                "investment_plan",
-                                f"### 看漲研究員分析\n{latest_bull}",
+                        message_buffer.update_agent_status("Social Analyst", "completed")
+                        # 將下一個分析師設定為進行中
+                        if "news" in selections["analysts"]:
+                            message_buffer.update_agent_status(
+                                "News Analyst", "in_progress"
                             )
 
-                    # 更新看跌研究員狀態和報告
-                    if "bear_history" in debate_state and debate_state["bear_history"]:
-                        # 保持所有研究團隊成員為進行中
-                        update_research_team_status("in_progress")
-                        # 提取最新的看跌回應
-                        bear_responses = debate_state["bear_history"].split("\n")
-                        latest_bear = bear_responses[-1] if bear_responses else ""
-                        if latest_bear:
-                            message_buffer.add_message("推理", latest_bear)
-                            # 使用看跌研究員的最新分析更新研究報告
-                            message_buffer.update_report_section(
-                                "investment_plan",
-                                f"{message_buffer.report_sections['investment_plan']}\n\n### 看跌研究員分析\n{latest_bear}",
+                    if "news_report" in chunk and chunk["news_report"]:
+                        message_buffer.update_report_section(
+                            "news_report", chunk["news_report"]
+                        )
+                        message_buffer.update_agent_status("News Analyst", "completed")
+                        # 將下一個分析師設定為進行中
+                        if "fundamentals" in selections["analysts"]:
+                            message_buffer.update_agent_status(
+                                "Fundamentals Analyst", "in_progress"
                             )
 
-                    # 更新研究經理狀態和最終決策
-                    if (
-                        "judge_decision" in debate_state
-                        and debate_state["judge_decision"]
-                    ):
-                        # 在最終決策前保持所有研究團隊成員為進行中
-                        update_research_team_status("in_progress")
-                        message_buffer.add_message(
-                            "推理",
-                            f"研究經理: {debate_state['judge_decision']}",
-                        )
-                        # 使用最終決策更新研究報告
+                    if "fundamentals_report" in chunk and chunk["fundamentals_report"]:
                         message_buffer.update_report_section(
-                            "investment_plan",
-                            f"{message_buffer.report_sections['investment_plan']}\n\n### 研究經理決策\n{debate_state['judge_decision']}",
+                            "fundamentals_report", chunk["fundamentals_report"]
                         )
-                        # 將所有研究團隊成員標記為已完成
-                        update_research_team_status("completed")
-                        # 將第一個風險分析師設定為進行中
                         message_buffer.update_agent_status(
-                            "Risky Analyst", "in_progress"
+                            "Fundamentals Analyst", "completed"
                         )
+                        # 將所有研究團隊成員設定為進行中
+                        update_research_team_status("in_progress")
 
-                # 交易團隊
-                if (
-                    "trader_investment_plan" in chunk
-                    and chunk["trader_investment_plan"]
-                ):
-                    message_buffer.update_report_section(
-                        "trader_investment_plan", chunk["trader_investment_plan"]
-                    )
-                    # 將第一個風險分析師設定為進行中
-                    message_buffer.update_agent_status("Risky Analyst", "in_progress")
-
-                # 風險管理團隊 - 處理風險辯論狀態
-                if "risk_debate_state" in chunk and chunk["risk_debate_state"]:
-                    risk_state = chunk["risk_debate_state"]
-
-                    # 更新風險分析師狀態和報告
+                    # 研究團隊 - 處理投資辯論狀態
                     if (
-                        "current_risky_response" in risk_state
-                        and risk_state["current_risky_response"]
+                        "investment_debate_state" in chunk
+                        and chunk["investment_debate_state"]
                     ):
-                        message_buffer.update_agent_status(
-                            "Risky Analyst", "in_progress"
-                        )
-                        message_buffer.add_message(
-                            "推理",
-                            f"風險分析師: {risk_state['current_risky_response']}",
-                        )
-                        # 僅使用風險分析師的最新分析更新風險報告
-                        message_buffer.update_report_section(
-                            "final_trade_decision",
-                            f"### 風險分析師分析\n{risk_state['current_risky_response']}",
-                        )
+                        debate_state = chunk["investment_debate_state"]
+
+                        # 更新看漲研究員狀態和報告
+                        if "bull_history" in debate_state and debate_state["bull_history"]:
+                            # 保持所有研究團隊成員為進行中
+                            update_research_team_status("in_progress")
+                            # 提取最新的看漲回應
+                            bull_responses = debate_state["bull_history"].split("\n")
+                            latest_bull = bull_responses[-1] if bull_responses else ""
+                            if latest_bull:
+                                message_buffer.add_message("推理", latest_bull)
+                                # 使用看漲研究員的最新分析更新研究報告
+                                message_buffer.update_report_section(
+                                    "investment_plan",
+                                    f"### 看漲研究員分析\n{latest_bull}",
+                                )
+
+                        # 更新看跌研究員狀態和報告
+                        if "bear_history" in debate_state and debate_state["bear_history"]:
+                            # 保持所有研究團隊成員為進行中
+                            update_research_team_status("in_progress")
+                            # 提取最新的看跌回應
+                            bear_responses = debate_state["bear_history"].split("\n")
+                            latest_bear = bear_responses[-1] if bear_responses else ""
+                            if latest_bear:
+                                message_buffer.add_message("推理", latest_bear)
+                                # 使用看跌研究員的最新分析更新研究報告
+                                message_buffer.update_report_section(
+                                    "investment_plan",
+                                    f"{message_buffer.report_sections['investment_plan']}\n\n### 看跌研究員分析\n{latest_bear}",
+                                )
+
+                        # 更新研究經理狀態和最終決策
+                        if (
+                            "judge_decision" in debate_state
+                            and debate_state["judge_decision"]
+                        ):
+                            # 在最終決策前保持所有研究團隊成員為進行中
+                            update_research_team_status("in_progress")
+                            message_buffer.add_message(
+                                "推理",
+                                f"研究經理: {debate_state['judge_decision']}",
+                            )
+                            # 使用最終決策更新研究報告
+                            message_buffer.update_report_section(
+                                "investment_plan",
+                                f"{message_buffer.report_sections['investment_plan']}\n\n### 研究經理決策\n{debate_state['judge_decision']}",
+                            )
+                            # 將所有研究團隊成員標記為已完成
+                            update_research_team_status("completed")
+                            # 將第一個風險分析師設定為進行中
+                            message_buffer.update_agent_status(
+                                "Risky Analyst", "in_progress"
+                            )
 
-                    # 更新安全分析師狀態和報告
+                    # 交易團隊
                     if (
-                        "current_safe_response" in risk_state
-                        and risk_state["current_safe_response"]
+                        "trader_investment_plan" in chunk
+                        and chunk["trader_investment_plan"]
                     ):
-                        message_buffer.update_agent_status(
-                            "Safe Analyst", "in_progress"
-                        )
-                        message_buffer.add_message(
-                            "推理",
-                            f"安全分析師: {risk_state['current_safe_response']}",
-                        )
-                        # 僅使用安全分析師的最新分析更新風險報告
                         message_buffer.update_report_section(
-                            "final_trade_decision",
-                            f"### 安全分析師分析\n{risk_state['current_safe_response']}",
+                            "trader_investment_plan", chunk["trader_investment_plan"]
                         )
+                        # 將第一個風險分析師設定為進行中
+                        message_buffer.update_agent_status("Risky Analyst", "in_progress")
+
+                    # 風險管理團隊 - 處理風險辯論狀態
+                    if "risk_debate_state" in chunk and chunk["risk_debate_state"]:
+                        risk_state = chunk["risk_debate_state"]
+
+                        # 更新風險分析師狀態和報告
+                        if (
+                            "current_risky_response" in risk_state
+                            and risk_state["current_risky_response"]
+                        ):
+                            message_buffer.update_agent_status(
+                                "Risky Analyst", "in_progress"
+                            )
+                            message_buffer.add_message(
+                                "推理",
+                                f"風險分析師: {risk_state['current_risky_response']}",
+                            )
+                            # 僅使用風險分析師的最新分析更新風險報告
+                            message_buffer.update_report_section(
+                                "final_trade_decision",
+                                f"### 風險分析師分析\n{risk_state['current_risky_response']}",
+                            )
 
-                    # 更新中立分析師狀態和報告
-                    if (
-                        "current_neutral_response" in risk_state
-                        and risk_state["current_neutral_response"]
-                    ):
-                        message_buffer.update_agent_status(
-                            "Neutral Analyst", "in_progress"
-                        )
-                        message_buffer.add_message(
-                            "推理",
-                            f"中立分析師: {risk_state['current_neutral_response']}",
-                        )
-                        # 僅使用中立分析師的最新分析更新風險報告
-                        message_buffer.update_report_section(
-                            "final_trade_decision",
-                            f"### 中立分析師分析\n{risk_state['current_neutral_response']}",
-                        )
+                        # 更新安全分析師狀態和報告
+                        if (
+                            "current_safe_response" in risk_state
+                            and risk_state["current_safe_response"]
+                        ):
+                            message_buffer.update_agent_status(
+                                "Safe Analyst", "in_progress"
+                            )
+                            message_buffer.add_message(
+                                "推理",
+                                f"安全分析師: {risk_state['current_safe_response']}",
+                            )
+                            # 僅使用安全分析師的最新分析更新風險報告
+                            message_buffer.update_report_section(
+                                "final_trade_decision",
+                                f"### 安全分析師分析\n{risk_state['current_safe_response']}",
+                            )
 
-                    # 更新投資組合經理狀態和最終決策
-                    if "judge_decision" in risk_state and risk_state["judge_decision"]:
-                        message_buffer.update_agent_status(
-                            "Portfolio Manager", "in_progress"
-                        )
-                        message_buffer.add_message(
-                            "推理",
-                            f"投資組合經理: {risk_state['judge_decision']}",
-                        )
-                        # 僅使用最終決策更新風險報告
-                        message_buffer.update_report_section(
-                            "final_trade_decision",
-                            f"### 投資組合經理決策\n{risk_state['judge_decision']}",
-                        )
-                        # 將風險分析師標記為已完成
-                        message_buffer.update_agent_status("Risky Analyst", "completed")
-                        message_buffer.update_agent_status("Safe Analyst", "completed")
-                        message_buffer.update_agent_status(
-                            "Neutral Analyst", "completed"
-                        )
-                        message_buffer.update_agent_status(
-                            "Portfolio Manager", "completed"
-                        )
+                        # 更新中立分析師狀態和報告
+                        if (
+                            "current_neutral_response" in risk_state
+                            and risk_state["current_neutral_response"]
+                        ):
+                            message_buffer.update_agent_status(
+                                "Neutral Analyst", "in_progress"
+                            )
+                            message_buffer.add_message(
+                                "推理",
+                                f"中立分析師: {risk_state['current_neutral_response']}",
+                            )
+                            # 僅使用中立分析師的最新分析更新風險報告
+                            message_buffer.update_report_section(
+                                "final_trade_decision",
+                                f"### 中立分析師分析\n{risk_state['current_neutral_response']}",
+                            )
 
-                # 更新顯示
-                update_display(layout)
+                        # 更新投資組合經理狀態和最終決策
+                        if "judge_decision" in risk_state and risk_state["judge_decision"]:
+                            message_buffer.update_agent_status(
+                                "Portfolio Manager", "in_progress"
+                            )
+                            message_buffer.add_message(
+                                "推理",
+                                f"投資組合經理: {risk_state['judge_decision']}",
+                            )
+                            # 僅使用最終決策更新風險報告
+                            message_buffer.update_report_section(
+                                "final_trade_decision",
+                                f"### 投資組合經理決策\n{risk_state['judge_decision']}",
+                            )
+                            # 將風險分析師標記為已完成
+                            message_buffer.update_agent_status("Risky Analyst", "completed")
+                            message_buffer.update_agent_status("Safe Analyst", "completed")
+                            message_buffer.update_agent_status(
+                                "Neutral Analyst", "completed"
+                            )
+                            message_buffer.update_agent_status(
+                                "Portfolio Manager", "completed"
+                            )
+
+                    # 更新顯示
+                    update_display(layout)
 
-            trace.append(chunk)
+                trace.append(chunk)
 
         # 獲取最終狀態和決策
         final_state = trace[-1]
+        final_state["run_profile"] = profile.to_dict()
         decision = graph.process_signal(final_state["final_trade_decision"])
 
         # 將所有代理狀態更新為已完成
@@ -1173,6 +1228,7 @@ def run_analysis():
 
         # 顯示完整的最終報告
         display_complete_report(final_state)
+        display_run_profile(final_state["run_profile"])
 
         update_display(layout)
 
@@ -1182,8 +1238,94 @@ def analyze():
     """
     執行分析。
     """
+    configure_logging(DEFAULT_CONFIG["log_level"], DEFAULT_CONFIG["log_format"])
     run_analysis()
 
 
+def _batch_dates(start_date: str, end_date: str):
+    """返回起訖日期之間（含）的所有平日。"""
+    start = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
+    days = (end - start).days
+    dates = [start + datetime.timedelta(days=offset) for offset in range(days + 1)]
+    return [day.strftime("%Y-%m-%d") for day in dates if day.weekday() < 5]
+
+
+@app.command()
+def batch(
+    tickers: str = typer.Argument(..., help="以逗號分隔的股票代碼，例如 NVDA,AAPL,TSM"),
+    start_date: str = typer.Option(..., "--start", help="開始日期 YYYY-MM-DD"),
+    end_date: Optional[str] = typer.Option(None, "--end", help="結束日期 YYYY-MM-DD（預設與開始日期相同）"),
+    workers: Optional[int] = typer.Option(None, "--workers", "-w", help="工作行程數（預設為 CPU 核心數，不超過股票代碼數）"),
+    output: Path = typer.Option(Path("results/batch.jsonl"), "--output", "-o", help="JSONL 結果檔；重新執行時跳過已成功的項目"),
+    analysts: str = typer.Option("market,social,news,fundamentals", "--analysts", help="以逗號分隔的分析師類型"),
+    research_depth: int = typer.Option(1, "--depth", help="辯論與風險討論回合數"),
+    asof: bool = typer.Option(False, "--asof", help="股價、指標、財報與內部人士交易改用時間點（asof）快照"),
+):
+    """
+    以多個工作行程批次分析觀察清單或回測區間。
+
+    API 金鑰與模型設定從環境變數與預設設定讀取。
+    """
+    from tradingagents.graph.sharded_runner import ShardedRunner
+
+    configure_logging(DEFAULT_CONFIG["log_level"], DEFAULT_CONFIG["log_format"])
+    selected_analysts = [AnalystType(name.strip().lower()).value for name in analysts.split(",") if name.strip()]
+    dates = _batch_dates(start_date, end_date or start_date)
+    items = [
+        (ticker.strip().upper(), trade_date)
+        for ticker in tickers.split(",") if ticker.strip()
+        for trade_date in dates
+    ]
+
+    config = DEFAULT_CONFIG.copy()
+    config["max_debate_rounds"] = research_depth
+    config["max_risk_discuss_rounds"] = research_depth
+    if asof:
+        config["data_vendors"] = {**config["data_vendors"], "core_stock_apis": "asof", "technical_indicators": "asof"}
+        config["tool_vendors"] = {
+            **config["tool_vendors"],
+            "get_balance_sheet": "asof",
+            "get_cashflow": "asof",
+            "get_income_statement": "asof",
+            "get_insider_transactions": "asof",
+        }
+
+    def on_progress(record, progress):
+        stats = progress[record["shard"]]
+        done = sum(shard["done"] for shard in progress.values())
+        total = sum(shard["total"] for shard in progress.values())
+        outcome = (
+            f"[green]{record['decision']}[/green]" if record["status"] == "ok"
+            else f"[red]錯誤[/red] {record['error']}"
+        )
+        console.print(
+            f"[{done}/{total}] 分片 {record['shard']} ({stats['done']}/{stats['total']}) "
+            f"{record['ticker']} {record['trade_date']}: {outcome} ({record.get('seconds', '-')} 秒)"
+        )
+
+    runner = ShardedRunner(
+        str(output),
+        selected_analysts=selected_analysts,
+        config=config,
+        num_workers=workers,
+        on_progress=on_progress,
+    )
+    skipped = len(runner.completed_items() & set(items))
+    # 同一股票的日期只在一個工作行程中執行，行程數不超過股票代碼數
+    num_workers = min(runner.num_workers, len({ticker for ticker, _ in items}))
+    console.print(
+        f"共 {len(items)} 個項目，已完成 {skipped} 個，以 {num_workers} 個工作行程執行；結果寫入 {output}"
+    )
+    progress = runner.run(items)
+
+    table = Table(title="分片進度", box=box.SIMPLE)
+    for column in ("分片", "完成", "錯誤", "重新啟動"):
+        table.add_column(column, justify="right")
+    for shard_id, stats in sorted(progress.items()):
+        table.add_row(str(shard_id), f"{stats['done']}/{stats['total']}", str(stats["errors"]), str(stats["restarts"]))
+    console.print(table)
+
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
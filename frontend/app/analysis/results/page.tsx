@@ -5,6 +5,8 @@ import { useRouter } from "next/navigation";
 import ReactMarkdown from "react-markdown";
 import remarkGfm from "remark-gfm";
 import { useAnalysisContext } from "@/context/AnalysisContext";
+import { api } from "@/lib/api";
+import type { PriceHistoryResponse } from "@/lib/types";
 import { PriceChart } from "@/components/analysis/PriceChart";
 import { DownloadReports } from "@/components/analysis/DownloadReports";
 import { Button } from "@/components/ui/button";
@@ -103,6 +105,7 @@ export default function AnalysisResultsPage() {
   const router = useRouter();
   const { analysisResult, taskId } = useAnalysisContext();
   const [selectedAnalyst, setSelectedAnalyst] = useState("market");
+  const [priceHistory, setPriceHistory] = useState<PriceHistoryResponse | null>(null);
 
   // 如果沒有結果，重定向到分析頁面
   useEffect(() => {
@@ -111,6 +114,24 @@ export default function AnalysisResultsPage() {
     }
   }, [analysisResult, router]);
 
+  // 價格數據不隨分析結果傳送，另外從後端價格快取取得（可被瀏覽器以 ETag 重新驗證）
+  const ticker = analysisResult?.ticker;
+  useEffect(() => {
+    if (!ticker) return;
+    let cancelled = false;
+    api
+      .getPriceHistory(ticker, { range: "1y", interval: "1d" })
+      .then(history => {
+        if (!cancelled) setPriceHistory(history);
+      })
+      .catch(() => {
+        if (!cancelled) setPriceHistory(null);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [ticker]);
+
   if (!analysisResult) {
     return (
       <div className="container mx-auto px-4 py-12">
@@ -171,10 +192,10 @@ export default function AnalysisResultsPage() {
             <TabsContent key={analyst.key} value={analyst.key} className="mt-6">
               <div className="space-y-6">
                 {/* 價格圖表 - 每個分析師都有 */}
-                {analysisResult.price_data && analysisResult.price_stats && (
+                {priceHistory?.price_data && (
                   <PriceChart
-                    priceData={analysisResult.price_data}
-                    priceStats={analysisResult.price_stats}
+                    priceData={priceHistory.price_data}
+                    priceStats={priceHistory.price_stats}
                     ticker={analysisResult.ticker}
                   />
                 )}
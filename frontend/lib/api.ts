@@ -7,6 +7,7 @@ import type {
   AnalysisResponse,
   ConfigResponse,
   HealthResponse,
+  PriceHistoryResponse,
   Ticker,
   TaskCreatedResponse,
   TaskStatusResponse,
@@ -56,6 +57,25 @@ export const api = {
     return response.data;
   },
 
+  /**
+   * Get historical prices for a ticker (served from the backend price cache)
+   */
+  async getPriceHistory(
+    ticker: string,
+    params: {
+      range?: string;
+      interval?: string;
+      max_points?: number;
+      format?: "json" | "columns";
+    } = {}
+  ): Promise<PriceHistoryResponse> {
+    const response = await apiClient.get<PriceHistoryResponse>(
+      `/api/prices/${encodeURIComponent(ticker)}`,
+      { params }
+    );
+    return response.data;
+  },
+
   /**
    * Get list of popular tickers
    */
@@ -40,6 +40,15 @@ export interface PriceStats {
   end_price: number;
 }
 
+export interface PriceHistoryResponse {
+  ticker: string;
+  range: string;
+  interval: string;
+  price_stats: PriceStats;
+  price_data?: PriceData[];
+  price_columns?: Record<keyof PriceData, Array<string | number>>;
+}
+
 export interface AnalysisResponse {
   status: string;
   ticker: string;
@@ -47,8 +56,6 @@ export interface AnalysisResponse {
   decision?: any;
   reports?: any;
   error?: string;
-  price_data?: PriceData[];
-  price_stats?: PriceStats;
 }
 
 export interface Decision {
@@ -1,5 +1,6 @@
 from tradingagents.graph.trading_graph import TradingAgentsXGraph
 from tradingagents.default_config import DEFAULT_CONFIG
+from tradingagents.utils.logging_utils import configure_logging
 
 from dotenv import load_dotenv
 
@@ -20,6 +21,9 @@ config["data_vendors"] = {
     "news_data": "alpha_vantage",            # 選項: openai, alpha_vantage, google, local
 }
 
+# 結構化日誌（行程層級，只需設定一次）
+configure_logging(config["log_level"], config["log_format"])
+
 # 使用自訂設定進行初始化
 ta = TradingAgentsXGraph(debug=True, config=config)
 
@@ -3,21 +3,71 @@ import time
 import json
 import logging
 import random
+import sys
 from tenacity import (
     retry,
     stop_after_attempt,
     wait_exponential,
-    retry_if_exception_type,
+    retry_if_exception,
     before_sleep_log
 )
-from anthropic._exceptions import OverloadedError
 from tradingagents.agents.utils.output_filter import fix_common_llm_errors, validate_and_warn
+from tradingagents.agents.utils.context_budget import ContextBudget
+from tradingagents.agents.utils.prompt_layout import build_prompt_messages
 
 # 設置日誌記錄器
 logger = logging.getLogger(__name__)
 
 
-def create_research_manager(llm, memory):
+def _is_overloaded_error(exc: BaseException) -> bool:
+    """
+    是否為 Anthropic 的 529 過載錯誤。
+    只有使用 Claude 模型時才會載入 anthropic，因此不在模組層級匯入它。
+    """
+    anthropic_exceptions = sys.modules.get("anthropic._exceptions")
+    return anthropic_exceptions is not None and isinstance(exc, anthropic_exceptions.OverloadedError)
+
+
+# 角色指示不含任何執行期資料，作為所有呼叫共用的系統提示前綴
+RESEARCH_MANAGER_INSTRUCTIONS = """**重要：您必須使用繁體中文（Traditional Chinese）回覆所有內容。**
+**嚴格禁止：請勿在回覆中使用任何 emoji 表情符號（如 ✅ ❌ 📊 📈 🚀 等）。**
+**請只使用純文字、數字、標點符號和必要的 Unicode 符號（如 ↑ ↓ ★ ●等）。**
+
+【專業身份】
+您是投資決策經理，負責評估多空辯論並做出最終投資決策。**您必須保持嚴格中立觀點，公正評估看漲與看跌雙方論據，基於證據做出獨立決策。**
+
+【職責】
+1. **評估論證**：客觀權衡看漲與看跌方的論據強度，不偏袒任何一方
+2. **做出決策**：基於證據明確判斷買入/賣出/持有，展現獨立判斷
+3. **制定計畫**：提供交易員可執行的詳細操作指引
+4. **中立裁判**：**作為中立裁判，綜合雙方論點後做出獨立決策，不受任何一方影響**
+
+【輸出要求】
+**字數要求**：**800-1500字**
+**嚴格遵守字數限制，少於800字或超過1500字的報告將被退回**
+**內容結構**：
+1. 決策摘要（150字以上）：明確的買入/賣出/持有決策與核心理由
+2. 論證評估（200字以上）：公正評估雙方最強論點與分歧點，不偏袒任何一方
+3. 決策依據（300字以上）：選擇此立場的關鍵證據與邏輯推理
+4. 操作指引（100字以上）：部位規模、目標價位、停損設定等具體參數
+5. 風險提示（50字以上）：主要風險與監控重點
+
+**撰寫原則**：
+- **嚴格中立**：作為中立裁判，不偏向看漲或看跌任何一方
+- **獨立決策**：基於證據與邏輯做出獨立判斷，展現決策自主性
+- 決策明確，避免模稜兩可，必須給出清晰立場
+- 提供具體量化的操作參數，確保可執行性
+- 邏輯清晰，證據充分，說服力強
+
+**結尾提示**：
+請在報告最後加上以下結尾：
+「---
+👔 **本報告為研究經理的投資決策，綜合看漲與看跌雙方論據後做出。建議交易團隊執行前再次確認市場狀況。投資決策需獨立判斷，請謹慎評估。**」
+
+請提供專業且可執行的投資決策報告。"""
+
+
+def create_research_manager(llm, memory, context_budget=None):
     """
     建立一個研究管理員（裁判）節點。
 
@@ -29,11 +79,14 @@ def create_research_manager(llm, memory):
     Args:
         llm: 用於生成決策和計畫的語言模型。
         memory: 儲存過去情況和反思的記憶體物件。
+        context_budget (ContextBudget, optional): 上下文預算，None 表示一律使用完整報告與歷史。
 
     Returns:
         function: 一個代表研究管理員節點的函式，可在 langgraph 中使用。
     """
 
+    budget = context_budget or ContextBudget()
+
     def research_manager_node(state) -> dict:
         """
         研究管理員節點的執行函式。
@@ -67,50 +120,24 @@ def create_research_manager(llm, memory):
         for i, rec in enumerate(past_memories, 1):
             recommendation = rec["recommendation"]
             past_memory_str += recommendation + "\n\n"
+
+        # 依模型的上下文預算決定放入提示的辯論歷史（狀態中仍保留完整歷史）
+        _, prompt_history = budget.fit(
+            state,
+            history,
+            reserved=past_memory_str,
+            include_reports=False,
+        )
         
         # 截斷辯論歷史 - 這是最容易超過限制的部分 - 移除截斷以保留完整內容
 
-        # 建立提示 (prompt)
-        prompt = f"""**重要：您必須使用繁體中文（Traditional Chinese）回覆所有內容。**
-**嚴格禁止：請勿在回覆中使用任何 emoji 表情符號（如 ✅ ❌ 📊 📈 🚀 等）。**
-**請只使用純文字、數字、標點符號和必要的 Unicode 符號（如 ↑ ↓ ★ ●等）。**
-
-【專業身份】
-您是投資決策經理，負責評估多空辯論並做出最終投資決策。**您必須保持嚴格中立觀點，公正評估看漲與看跌雙方論據，基於證據做出獨立決策。**
-
-【職責】
-1. **評估論證**：客觀權衡看漲與看跌方的論據強度，不偏袒任何一方
-2. **做出決策**：基於證據明確判斷買入/賣出/持有，展現獨立判斷
-3. **制定計畫**：提供交易員可執行的詳細操作指引
-4. **中立裁判**：**作為中立裁判，綜合雙方論點後做出獨立決策，不受任何一方影響**
-
-【可用資訊】
-- 過去反思："{past_memory_str}"
-- 辯論歷史：{history}
-
-【輸出要求】
-**字數要求**：**800-1500字**
-**嚴格遵守字數限制，少於800字或超過1500字的報告將被退回**
-**內容結構**：
-1. 決策摘要（150字以上）：明確的買入/賣出/持有決策與核心理由
-2. 論證評估（200字以上）：公正評估雙方最強論點與分歧點，不偏袒任何一方
-3. 決策依據（300字以上）：選擇此立場的關鍵證據與邏輯推理
-4. 操作指引（100字以上）：部位規模、目標價位、停損設定等具體參數
-5. 風險提示（50字以上）：主要風險與監控重點
-
-**撰寫原則**：
-- **嚴格中立**：作為中立裁判，不偏向看漲或看跌任何一方
-- **獨立決策**：基於證據與邏輯做出獨立判斷，展現決策自主性
-- 決策明確，避免模稜兩可，必須給出清晰立場
-- 提供具體量化的操作參數，確保可執行性
-- 邏輯清晰，證據充分，說服力強
-
-**結尾提示**：
-請在報告最後加上以下結尾：
-「---
-👔 **本報告為研究經理的投資決策，綜合看漲與看跌雙方論據後做出。建議交易團隊執行前再次確認市場狀況。投資決策需獨立判斷，請謹慎評估。**」
-
-請提供專業且可執行的投資決策報告。"""
+        # 建立提示：系統指示 → 共用上下文 → 本回合內容，讓供應商的提示快取可重複使用相同前綴
+        messages = build_prompt_messages(
+            llm,
+            RESEARCH_MANAGER_INSTRUCTIONS,
+            shared_context=f'【可用資訊】\n- 過去反思："{past_memory_str}"',
+            turn_context=f"- 辯論歷史：{prompt_history}",
+        )
         
         # 定義帶重試機制的 LLM 調用函數
         # 基於 Cursor IDE 博客建議的最佳實踐：
@@ -120,7 +147,7 @@ def create_research_manager(llm, memory):
         import random
         
         @retry(
-            retry=retry_if_exception_type(OverloadedError),
+            retry=retry_if_exception(_is_overloaded_error),
             wait=wait_exponential(multiplier=1, min=2, max=60),  # 增加最大延遲到 60 秒
             stop=stop_after_attempt(5),  # 增加重試次數到 5 次
             before_sleep=before_sleep_log(logger, logging.WARNING)
@@ -155,7 +182,7 @@ def create_research_manager(llm, memory):
             return llm_instance.invoke(prompt_text)
         
         # 使用帶重試機制的函數調用 LLM
-        response = invoke_llm_with_retry(llm, prompt)
+        response = invoke_llm_with_retry(llm, messages)
         
         # CRITICAL FIX: Apply output filtering
         response.content = fix_common_llm_errors(response.content)
@@ -2,9 +2,51 @@
 import time
 import json
 from tradingagents.agents.utils.output_filter import fix_common_llm_errors, validate_and_warn
+from tradingagents.agents.utils.context_budget import ContextBudget
+from tradingagents.agents.utils.prompt_layout import build_prompt_messages
 
 
-def create_risk_manager(llm, memory):
+# 角色指示不含任何執行期資料，作為所有呼叫共用的系統提示前綴
+RISK_MANAGER_INSTRUCTIONS = """**重要：您必須使用繁體中文（Traditional Chinese）回覆所有內容。**
+**嚴格禁止：請勿在回覆中使用任何 emoji 表情符號（如 ✅ ❌ 📊 📈 🚀 等）。**
+**請只使用純文字、數字、標點符號和必要的 Unicode 符號（如 ↑ ↓ ★ ●等）。**
+
+【專業身份】
+您是風險管理經理，負責評估投資計畫的風險並做出最終風控決策。**您必須保持嚴格中立觀點，綜合評估積極、中立、保守三方風險觀點，基於風險調整做出最終決策。**
+
+【職責】
+1. **評估辯論**：綜合積極、中立、保守三方的風險觀點，不偏袒任何一方
+2. **識別風險**：系統性評估市場、財務、營運等多維度風險
+3. **最終決策**：基於風險調整後的買入/賣出/持有決策，展現獨立判斷
+4. **風控設定**：建立明確的風險管理框架與具體參數
+5. **中立裁判**：**作為風險中立裁判，綜合三方觀點後做出獨立決策**
+
+【輸出要求】
+**字數要求**：**800-1500字**
+**嚴格遵守字數限制，少於800字或超過1500字的報告將被退回**
+**內容結構**：
+1. 風控結論（150字以上）：風險評級與最終決策的明確陳述
+2. 論證評估（200字以上）：三方風險觀點的綜合評估，公正分析
+3. 風險分析（300字以上）：主要風險因素與量化評估，多維度分析
+4. 最終決策（100字以上）：經風險調整的操作建議與部位規模
+5. 風控措施（50字以上）：停損、監控指標、應急預案等具體措施
+
+**撰寫原則**：
+- **嚴格中立**：綜合評估積極、保守、中立三方觀點，不偏袒任何一方
+- **獨立決策**：基於風險評估做出獨立判斷，展現決策自主性
+- 決策明確，風控參數具體，確保可執行性
+- 保守謹慎，但避免過度保守影響報酬
+- 提供完整的風險管理框架與具體措施
+
+**結尾提示**：
+請在報告最後加上以下結尾：
+「---
+※ 本報告為風險管理經理的最終決策，綜合三方風險觀點（積極、保守、平衡）後做出。風控框架需嚴格執行。投資有風險，請謹慎評估。」
+
+請提供專業且全面的風險管理決策報告。"""
+
+
+def create_risk_manager(llm, memory, context_budget=None):
     """
     建立一個風險管理員（裁判）節點。
 
@@ -16,11 +58,14 @@ def create_risk_manager(llm, memory):
     Args:
         llm: 用於生成決策的語言模型。
         memory: 儲存過去情況和反思的記憶體物件。
+        context_budget (ContextBudget, optional): 上下文預算，None 表示一律使用完整報告與歷史。
 
     Returns:
         function: 一個代表風險管理員節點的函式，可在 langgraph 中使用。
     """
 
+    budget = context_budget or ContextBudget()
+
     def risk_manager_node(state) -> dict:
         """
         風險管理員節點的執行函式。
@@ -58,56 +103,26 @@ def create_risk_manager(llm, memory):
         
         # 截斷辯論歷史 - 這是最容易超過限制的部分
         # 增加限制以容納更長的辯論內容（風險辯論通常有3方，比投資辯論更長）
-        history = history # 移除截斷，保留完整歷史
+        # 依模型的上下文預算決定放入提示的辯論歷史（狀態中仍保留完整歷史）
+        _, prompt_history = budget.fit(
+            state,
+            history,
+            reserved=past_memory_str + trader_plan,
+            include_reports=False,
+        )
 
         
-        # 建立提示 (prompt)
-        prompt = f"""**重要：您必須使用繁體中文（Traditional Chinese）回覆所有內容。**
-**嚴格禁止：請勿在回覆中使用任何 emoji 表情符號（如 ✅ ❌ 📊 📈 🚀 等）。**
-**請只使用純文字、數字、標點符號和必要的 Unicode 符號（如 ↑ ↓ ★ ●等）。**
-
-【專業身份】
-您是風險管理經理，負責評估投資計畫的風險並做出最終風控決策。**您必須保持嚴格中立觀點，綜合評估積極、中立、保守三方風險觀點，基於風險調整做出最終決策。**
-
-【職責】
-1. **評估辯論**：綜合積極、中立、保守三方的風險觀點，不偏袒任何一方
-2. **識別風險**：系統性評估市場、財務、營運等多維度風險
-3. **最終決策**：基於風險調整後的買入/賣出/持有決策，展現獨立判斷
-4. **風控設定**：建立明確的風險管理框架與具體參數
-5. **中立裁判**：**作為風險中立裁判，綜合三方觀點後做出獨立決策**
-
-【可用資訊】
-- 過去反思："{past_memory_str}"
-- 交易員計畫：{trader_plan}
-- 辯論歷史：{history}
-
-【輸出要求】
-**字數要求**：**800-1500字**
-**嚴格遵守字數限制，少於800字或超過1500字的報告將被退回**
-**內容結構**：
-1. 風控結論（150字以上）：風險評級與最終決策的明確陳述
-2. 論證評估（200字以上）：三方風險觀點的綜合評估，公正分析
-3. 風險分析（300字以上）：主要風險因素與量化評估，多維度分析
-4. 最終決策（100字以上）：經風險調整的操作建議與部位規模
-5. 風控措施（50字以上）：停損、監控指標、應急預案等具體措施
-
-**撰寫原則**：
-- **嚴格中立**：綜合評估積極、保守、中立三方觀點，不偏袒任何一方
-- **獨立決策**：基於風險評估做出獨立判斷，展現決策自主性
-- 決策明確，風控參數具體，確保可執行性
-- 保守謹慎，但避免過度保守影響報酬
-- 提供完整的風險管理框架與具體措施
-
-**結尾提示**：
-請在報告最後加上以下結尾：
-「---
-※ 本報告為風險管理經理的最終決策，綜合三方風險觀點（積極、保守、平衡）後做出。風控框架需嚴格執行。投資有風險，請謹慎評估。」
-
-請提供專業且全面的風險管理決策報告。"""
+        # 建立提示：系統指示 → 共用上下文 → 本回合內容，讓供應商的提示快取可重複使用相同前綴
+        messages = build_prompt_messages(
+            llm,
+            RISK_MANAGER_INSTRUCTIONS,
+            shared_context=f'【可用資訊】\n- 過去反思："{past_memory_str}"\n- 交易員計畫：{trader_plan}',
+            turn_context=f"- 辯論歷史：{prompt_history}",
+        )
         
 
         # 呼叫 LLM 生成決策
-        response = llm.invoke(prompt)
+        response = llm.invoke(messages)
         
         # CRITICAL FIX: Apply output filtering to fix common LLM errors
         response.content = fix_common_llm_errors(response.content)
@@ -3,9 +3,51 @@ from langchain_core.messages import AIMessage
 import time
 import json
 from tradingagents.agents.utils.output_filter import fix_common_llm_errors, validate_and_warn
+from tradingagents.agents.utils.context_budget import ContextBudget
+from tradingagents.agents.utils.prompt_layout import build_prompt_messages, format_report_block
 
 
-def create_bear_researcher(llm, memory):
+# 角色指示不含任何執行期資料，作為所有呼叫共用的系統提示前綴
+BEAR_RESEARCHER_INSTRUCTIONS = """**重要：您必須使用繁體中文（Traditional Chinese）回覆所有內容。**
+**嚴格禁止：請勿在回覆中使用任何 emoji 表情符號（如 ✅ ❌ 📊 📈 🚀 等）。**
+**請只使用純文字、數字、標點符號和必要的 Unicode 符號（如 ↑ ↓ ★ ●等）。**
+
+【專業身份】
+您是看跌方研究員，負責提出賣出論據，強調投資風險與下跌壓力。**您必須採取激進做空立場，不惜一切代價找出所有看跌風險因子，並強力反駁看漲論點。**
+
+【分析重點】
+1. **成長疑慮**：檢視營收成長減速、市場飽和或競爭加劇跡象，放大成長隱憂
+2. **競爭劣勢**：評估護城河侵蝕、市佔率流失或定價能力弱化，強調競爭威脅
+3. **財務問題**：識別現金流惡化、債務風險或獲利品質下降，揭露財務危機
+4. **負面催化**：指出可能觸發股價下跌的事件或結構性問題，放大利空影響
+5. **反駁看漲**：**強力反駁看漲方論點，直指其盲目樂觀，揭露其論據的致命缺陷**
+
+【輸出要求】
+**字數要求**：**800-1500字**
+**嚴格遵守字數限制，少於800字或超過1500字的報告將被退回**
+**內容結構**：
+1. 核心警示（150字以上）：清晰且強勢地陳述看跌理由，展現堅定立場
+2. 風險論證（450-500字）：用詳實數據支撐風險分析，層層揭露隱患
+3. 反駁看漲（100字以上）：**激進地反駁看漲觀點，直指對方論據的盲目樂觀與邏輯漏洞**
+4. 投資建議（100字以上）：明確且謹慎的操作建議，建議減倉或觀望
+
+**撰寫原則**：
+- **激進做空**：採取極度謹慎立場，強調所有風險因素
+- **強力反駁**：對看漲論點窮追猛打，揭露其盲目樂觀與忽略的風險
+- 論據扎實，以數據與事實為基礎，但解讀偏向悲觀
+- 直接指出對方論點的漏洞，不留情面
+- 強調風險遠大於機會
+
+**結尾提示**：
+請在報告最後加上以下結尾：
+「---
+🐻 **本報告為看跌方研究分析，立場偏向謹慎保守。建議搭配看漲方觀點與市場情緒綜合研判。投資有風險，請謹慎評估。**」
+
+請提供有說服力且激進的看跌分析報告。
+"""
+
+
+def create_bear_researcher(llm, memory, context_budget=None):
     """
     建立一個看跌研究員節點。
 
@@ -16,11 +58,14 @@ def create_bear_researcher(llm, memory):
     Args:
         llm: 用於生成回應的語言模型。
         memory: 儲存過去情況和反思的記憶體物件。
+        context_budget (ContextBudget, optional): 上下文預算，None 表示一律使用完整報告與歷史。
 
     Returns:
         function: 一個代表看跌研究員節點的函式，可在 langgraph 中使用。
     """
 
+    budget = context_budget or ContextBudget()
+
     def bear_node(state) -> dict:
         """
         看跌研究員節點的執行函式。
@@ -55,57 +100,23 @@ def create_bear_researcher(llm, memory):
             recommendation = rec["recommendation"]
             past_memory_str += recommendation + "\n\n"
 
-        # 建立提示 (prompt) - 保留完整歷史以確保context完整性
-        
-        prompt = f"""**重要：您必須使用繁體中文（Traditional Chinese）回覆所有內容。**
-**嚴格禁止：請勿在回覆中使用任何 emoji 表情符號（如 ✅ ❌ 📊 📈 🚀 等）。**
-**請只使用純文字、數字、標點符號和必要的 Unicode 符號（如 ↑ ↓ ★ ●等）。**
-
-【專業身份】
-您是看跌方研究員，負責提出賣出論據，強調投資風險與下跌壓力。**您必須採取激進做空立場，不惜一切代價找出所有看跌風險因子，並強力反駁看漲論點。**
-
-【分析重點】
-1. **成長疑慮**：檢視營收成長減速、市場飽和或競爭加劇跡象，放大成長隱憂
-2. **競爭劣勢**：評估護城河侵蝕、市佔率流失或定價能力弱化，強調競爭威脅
-3. **財務問題**：識別現金流惡化、債務風險或獲利品質下降，揭露財務危機
-4. **負面催化**：指出可能觸發股價下跌的事件或結構性問題，放大利空影響
-5. **反駁看漲**：**強力反駁看漲方論點，直指其盲目樂觀，揭露其論據的致命缺陷**
-
-【可用資源】
-- 市場分析：{market_research_report}
-- 社群情緒：{sentiment_report}
-- 新聞：{news_report}
-- 基本面：{fundamentals_report}
-- 辯論歷史：{history}
-- 看漲論點：{current_response}
-- 過往經驗：{past_memory_str}
-
-【輸出要求】
-**字數要求**：**800-1500字**
-**嚴格遵守字數限制，少於800字或超過1500字的報告將被退回**
-**內容結構**：
-1. 核心警示（150字以上）：清晰且強勢地陳述看跌理由，展現堅定立場
-2. 風險論證（450-500字）：用詳實數據支撐風險分析，層層揭露隱患
-3. 反駁看漲（100字以上）：**激進地反駁看漲觀點，直指對方論據的盲目樂觀與邏輯漏洞**
-4. 投資建議（100字以上）：明確且謹慎的操作建議，建議減倉或觀望
-
-**撰寫原則**：
-- **激進做空**：採取極度謹慎立場，強調所有風險因素
-- **強力反駁**：對看漲論點窮追猛打，揭露其盲目樂觀與忽略的風險
-- 論據扎實，以數據與事實為基礎，但解讀偏向悲觀
-- 直接指出對方論點的漏洞，不留情面
-- 強調風險遠大於機會
-
-**結尾提示**：
-請在報告最後加上以下結尾：
-「---
-🐻 **本報告為看跌方研究分析，立場偏向謹慎保守。建議搭配看漲方觀點與市場情緒綜合研判。投資有風險，請謹慎評估。**」
-
-請提供有說服力且激進的看跌分析報告。
-"""
+        # 依模型的上下文預算選擇完整報告或摘要（狀態中仍保留完整歷史）
+        reports, prompt_history = budget.fit(
+            state,
+            history,
+            reserved=past_memory_str + current_response,
+        )
+
+        # 建立提示：系統指示 → 共用上下文 → 本回合內容，讓供應商的提示快取可重複使用相同前綴
+        messages = build_prompt_messages(
+            llm,
+            BEAR_RESEARCHER_INSTRUCTIONS,
+            shared_context=f"【可用資源】\n{format_report_block(reports)}\n- 過往經驗：{past_memory_str}",
+            turn_context=f"- 辯論歷史：{prompt_history}\n- 看漲論點：{current_response}",
+        )
 
         # 呼叫 LLM 生成回應
-        response = llm.invoke(prompt)
+        response = llm.invoke(messages)
         
         # CRITICAL FIX: Apply output filtering to fix common LLM errors
         response.content = fix_common_llm_errors(response.content)
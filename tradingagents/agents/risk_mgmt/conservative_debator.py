@@ -3,9 +3,50 @@ from langchain_core.messages import AIMessage
 import time
 import json
 from tradingagents.agents.utils.output_filter import fix_common_llm_errors, validate_and_warn
+from tradingagents.agents.utils.context_budget import ContextBudget
+from tradingagents.agents.utils.prompt_layout import build_prompt_messages, format_report_block
 
 
-def create_safe_debator(llm):
+# 角色指示不含任何執行期資料，作為所有呼叫共用的系統提示前綴
+SAFE_DEBATOR_INSTRUCTIONS = """**重要：您必須使用繁體中文（Traditional Chinese）回覆所有內容。**
+**嚴格禁止：請勿在回覆中使用任何 emoji 表情符號（如 ✅ ❌ 📊 📈 🚀 等）。**
+**請只使用純文字、數字、標點符號和必要的 Unicode 符號（如 ↑ ↓ ★ ●等）。**
+
+【專業身份】
+您是保守型風險策略師，優先考量資本保全，評估下檔風險。**您必須採取極度保守立場，全力維護資本安全，並強力反駁激進派的盲目樂觀。**
+
+【論證重點】
+1. **下檔風險**：量化分析最壞情境下的潛在損失，放大風險威脅
+2. **隱藏風險**：識別市場尚未充分反應的威脅因素，揭露潛在地雷
+3. **估值疑慮**：評估股價相對基本面的偏離程度，強調高估風險
+4. **激進盲點**：**強力反駁激進派觀點，指出其盲目樂觀忽略的重大風險因子**
+5. **資本保全**：主張穩健策略優先於激進追逐報酬
+
+【輸出要求】
+**字數要求**：**800-1500字**
+**嚴格遵守字數限制，少於800字或超過1500字的報告將被退回**
+**內容結構**：
+1. 核心警示（150字以上）：清晰且強勢地陳述保守建議的理由，展現堅定立場
+2. 風險盤點（450-500字）：詳細分析下檔風險，層層揭露隱患
+3. 反駁激進（100字以上）：**激進地反駁激進派的論點，指出其盲目樂觀與被忽略的風險**
+4. 操作建議（100字以上）：明確的保守風控建議，建議謹慎或減倉
+
+**撰寫原則**：
+- **極度保守**：採取最謹慎立場，優先資本保全
+- **強力反駁**：對激進派論點窮追猛打，揭露其盲目樂觀與被忽視的風險
+- 量化評估，避免過度悲觀，但解讀偏向謹慎
+- 直接回應機會論述，但強調風險管理的重要性
+- 強調穩健增長優於激進追逐
+
+**結尾提示**：
+請在報告最後加上以下結尾：
+「---
+※ 本報告為保守型風險策略分析，立場優先資本保全。建議搭配積極與平衡觀點綜合研判。風險控制為投資首要，請謹慎評估。」
+
+請提供專業且具說服力的保守策略分析。"""
+
+
+def create_safe_debator(llm, context_budget=None):
     """
     建立一個安全/保守的風險辯論員節點。
 
@@ -15,11 +56,14 @@ def create_safe_debator(llm):
 
     Args:
         llm: 用於生成回應的語言模型。
+        context_budget (ContextBudget, optional): 上下文預算，None 表示一律使用完整報告與歷史。
 
     Returns:
         function: 一個代表保守辯論員節點的函式，可在 langgraph 中使用。
     """
 
+    budget = context_budget or ContextBudget()
+
     def safe_node(state) -> dict:
         """
         保守辯論員節點的執行函式。
@@ -39,63 +83,28 @@ def create_safe_debator(llm):
         current_risky_response = risk_debate_state.get("current_risky_response", "")
         current_neutral_response = risk_debate_state.get("current_neutral_response", "")
 
-        # 從狀態中獲取各類分析報告
-        market_research_report = state["market_report"]
-        sentiment_report = state["sentiment_report"]
-        news_report = state["news_report"]
-        fundamentals_report = state["fundamentals_report"]
-
         # 獲取交易員的決策
         trader_decision = state["trader_investment_plan"]
 
+        # 依模型的上下文預算選擇完整報告或摘要（狀態中仍保留完整歷史）
+        reports, prompt_history = budget.fit(
+            state,
+            history,
+            reserved=trader_decision + current_risky_response + current_neutral_response,
+        )
+
         # 移除截斷邏輯以保留完整報告內容
         
-        # 建立提示 (prompt)
-        prompt = f"""**重要：您必須使用繁體中文（Traditional Chinese）回覆所有內容。**
-**嚴格禁止：請勿在回覆中使用任何 emoji 表情符號（如 ✅ ❌ 📊 📈 🚀 等）。**
-**請只使用純文字、數字、標點符號和必要的 Unicode 符號（如 ↑ ↓ ★ ●等）。**
-
-【專業身份】
-您是保守型風險策略師，優先考量資本保全，評估下檔風險。**您必須採取極度保守立場，全力維護資本安全，並強力反駁激進派的盲目樂觀。**
-
-【論證重點】
-1. **下檔風險**：量化分析最壞情境下的潛在損失，放大風險威脅
-2. **隱藏風險**：識別市場尚未充分反應的威脅因素，揭露潛在地雷
-3. **估值疑慮**：評估股價相對基本面的偏離程度，強調高估風險
-4. **激進盲點**：**強力反駁激進派觀點，指出其盲目樂觀忽略的重大風險因子**
-5. **資本保全**：主張穩健策略優先於激進追逐報酬
-
-【可用資訊】
-- 交易員計畫：{trader_decision}
-- 各類報告：{market_research_report}, {sentiment_report}, {news_report}, {fundamentals_report}
-- 辯論歷史：{history}
-- 對手觀點：{current_risky_response}, {current_neutral_response}
-
-【輸出要求】
-**字數要求**：**800-1500字**
-**嚴格遵守字數限制，少於800字或超過1500字的報告將被退回**
-**內容結構**：
-1. 核心警示（150字以上）：清晰且強勢地陳述保守建議的理由，展現堅定立場
-2. 風險盤點（450-500字）：詳細分析下檔風險，層層揭露隱患
-3. 反駁激進（100字以上）：**激進地反駁激進派的論點，指出其盲目樂觀與被忽略的風險**
-4. 操作建議（100字以上）：明確的保守風控建議，建議謹慎或減倉
-
-**撰寫原則**：
-- **極度保守**：採取最謹慎立場，優先資本保全
-- **強力反駁**：對激進派論點窮追猛打，揭露其盲目樂觀與被忽視的風險
-- 量化評估，避免過度悲觀，但解讀偏向謹慎
-- 直接回應機會論述，但強調風險管理的重要性
-- 強調穩健增長優於激進追逐
-
-**結尾提示**：
-請在報告最後加上以下結尾：
-「---
-※ 本報告為保守型風險策略分析，立場優先資本保全。建議搭配積極與平衡觀點綜合研判。風險控制為投資首要，請謹慎評估。」
-
-請提供專業且具說服力的保守策略分析。"""
+        # 建立提示：系統指示 → 共用上下文 → 本回合內容，讓供應商的提示快取可重複使用相同前綴
+        messages = build_prompt_messages(
+            llm,
+            SAFE_DEBATOR_INSTRUCTIONS,
+            shared_context=f"【可用資訊】\n- 交易員計畫：{trader_decision}\n{format_report_block(reports)}",
+            turn_context=f"- 辯論歷史：{prompt_history}\n- 對手觀點：{current_risky_response}, {current_neutral_response}",
+        )
 
         # 呼叫 LLM 生成回應
-        response = llm.invoke(prompt)
+        response = llm.invoke(messages)
         
         # CRITICAL FIX: Apply output filtering
         response.content = fix_common_llm_errors(response.content)
@@ -2,9 +2,50 @@
 import time
 import json
 from tradingagents.agents.utils.output_filter import fix_common_llm_errors, validate_and_warn
+from tradingagents.agents.utils.context_budget import ContextBudget
+from tradingagents.agents.utils.prompt_layout import build_prompt_messages, format_report_block
 
 
-def create_neutral_debator(llm):
+# 角色指示不含任何執行期資料，作為所有呼叫共用的系統提示前綴
+NEUTRAL_DEBATOR_INSTRUCTIONS = """**重要：您必須使用繁體中文（Traditional Chinese）回覆所有內容。**
+**嚴格禁止：請勿在回覆中使用任何 emoji 表情符號（如 ✅ ❌ 📊 📈 🚀 等）。**
+**請只使用純文字、數字、標點符號和必要的 Unicode 符號（如 ↑ ↓ ★ ●等）。**
+
+【專業身份】
+您是平衡型風險策略師，客觀評估風險與報酬，提供折衷方案。**您必須保持嚴格中立觀點，公正評估積極與保守雙方論點，找出雙方的合理性與盲點。**
+
+【論證重點】
+1. **平衡視角**：客觀權衡上檔機會與下檔風險，不偏不倚
+2. **情境分析**：評估不同市場情境下的策略適用性，提供多種可能
+3. **風險調整**：建議部位規模與風險對沖措施，平衡風險與報酬
+4. **整合觀點**：**公正評估積極與保守派的論點，綜合雙方合理之處，指出雙方盲點**
+5. **折衷方案**：提供兼顧機會與風控的平衡策略
+
+【輸出要求】
+**字數要求**：**800-1500字**
+**嚴格遵守字數限制，少於800字或超過1500字的報告將被退回**
+**內容結構**：
+1. 核心觀點（150字以上）：清晰陳述平衡策略的理由與價值
+2. 風險報酬評估（450-500字）：客觀分析損益比，綜合評估雙方論點
+3. 評論雙方（100字以上）：**公正指出積極與保守派的合理與盲點，不偏袒任何一方**
+4. 操作建議（100字以上）：具體的折衷方案，兼顧機會與風控
+
+**撰寫原則**：
+- **嚴格中立**：不偏向任何一方，客觀分析雙方論點
+- **公正評估**：找出積極派的合理性與盲點、保守派的合理性與盲點
+- 客觀中立，避免偏頗，但不迴避指出雙方問題
+- 提供可執行的平衡策略，兼顧風險與報酬
+- 強調風險管理與機會把握的平衡
+
+**結尾提示**：
+請在報告最後加上以下結尾：
+「---
+※ 本報告為平衡型風險策略分析，立場客觀中立。建議綜合三方觀點（積極、保守、平衡）後做出決策。投資需平衡風險與報酬，請謹慎評估。」
+
+請提供專業且客觀的平衡策略分析。"""
+
+
+def create_neutral_debator(llm, context_budget=None):
     """
     建立一個中立的風險辯論員節點。
 
@@ -14,11 +55,14 @@ def create_neutral_debator(llm):
 
     Args:
         llm: 用於生成回應的語言模型。
+        context_budget (ContextBudget, optional): 上下文預算，None 表示一律使用完整報告與歷史。
 
     Returns:
         function: 一個代表中立辯論員節點的函式，可在 langgraph 中使用。
     """
 
+    budget = context_budget or ContextBudget()
+
     def neutral_node(state) -> dict:
         """
         中立辯論員節點的執行函式。
@@ -38,63 +82,28 @@ def create_neutral_debator(llm):
         current_risky_response = risk_debate_state.get("current_risky_response", "")
         current_safe_response = risk_debate_state.get("current_safe_response", "")
 
-        # 從狀態中獲取各類分析報告
-        market_research_report = state["market_report"]
-        sentiment_report = state["sentiment_report"]
-        news_report = state["news_report"]
-        fundamentals_report = state["fundamentals_report"]
-
         # 獲取交易員的決策
         trader_decision = state["trader_investment_plan"]
 
-        # 移除截斷邏輯以保留完整報告內容
-
-        # 建立提示 (prompt)
-        prompt = f"""**重要：您必須使用繁體中文（Traditional Chinese）回覆所有內容。**
-**嚴格禁止：請勿在回覆中使用任何 emoji 表情符號（如 ✅ ❌ 📊 📈 🚀 等）。**
-**請只使用純文字、數字、標點符號和必要的 Unicode 符號（如 ↑ ↓ ★ ●等）。**
-
-【專業身份】
-您是平衡型風險策略師，客觀評估風險與報酬，提供折衷方案。**您必須保持嚴格中立觀點，公正評估積極與保守雙方論點，找出雙方的合理性與盲點。**
-
-【論證重點】
-1. **平衡視角**：客觀權衡上檔機會與下檔風險，不偏不倚
-2. **情境分析**：評估不同市場情境下的策略適用性，提供多種可能
-3. **風險調整**：建議部位規模與風險對沖措施，平衡風險與報酬
-4. **整合觀點**：**公正評估積極與保守派的論點，綜合雙方合理之處，指出雙方盲點**
-5. **折衷方案**：提供兼顧機會與風控的平衡策略
-
-【可用資訊】
-- 交易員計畫：{trader_decision}
-- 各類報告：{market_research_report}, {sentiment_report}, {news_report}, {fundamentals_report}
-- 辯論歷史：{history}
-- 對手觀點：{current_risky_response}, {current_safe_response}
-
-【輸出要求】
-**字數要求**：**800-1500字**
-**嚴格遵守字數限制，少於800字或超過1500字的報告將被退回**
-**內容結構**：
-1. 核心觀點（150字以上）：清晰陳述平衡策略的理由與價值
-2. 風險報酬評估（450-500字）：客觀分析損益比，綜合評估雙方論點
-3. 評論雙方（100字以上）：**公正指出積極與保守派的合理與盲點，不偏袒任何一方**
-4. 操作建議（100字以上）：具體的折衷方案，兼顧機會與風控
-
-**撰寫原則**：
-- **嚴格中立**：不偏向任何一方，客觀分析雙方論點
-- **公正評估**：找出積極派的合理性與盲點、保守派的合理性與盲點
-- 客觀中立，避免偏頗，但不迴避指出雙方問題
-- 提供可執行的平衡策略，兼顧風險與報酬
-- 強調風險管理與機會把握的平衡
+        # 依模型的上下文預算選擇完整報告或摘要（狀態中仍保留完整歷史）
+        reports, prompt_history = budget.fit(
+            state,
+            history,
+            reserved=trader_decision + current_risky_response + current_safe_response,
+        )
 
-**結尾提示**：
-請在報告最後加上以下結尾：
-「---
-※ 本報告為平衡型風險策略分析，立場客觀中立。建議綜合三方觀點（積極、保守、平衡）後做出決策。投資需平衡風險與報酬，請謹慎評估。」
+        # 移除截斷邏輯以保留完整報告內容
 
-請提供專業且客觀的平衡策略分析。"""
+        # 建立提示：系統指示 → 共用上下文 → 本回合內容，讓供應商的提示快取可重複使用相同前綴
+        messages = build_prompt_messages(
+            llm,
+            NEUTRAL_DEBATOR_INSTRUCTIONS,
+            shared_context=f"【可用資訊】\n- 交易員計畫：{trader_decision}\n{format_report_block(reports)}",
+            turn_context=f"- 辯論歷史：{prompt_history}\n- 對手觀點：{current_risky_response}, {current_safe_response}",
+        )
 
         # 呼叫 LLM 生成回應
-        response = llm.invoke(prompt)
+        response = llm.invoke(messages)
         
         # CRITICAL FIX: Apply output filtering
         response.content = fix_common_llm_errors(response.content)
@@ -1,10 +1,26 @@
-from typing import Annotated, Sequence
+from typing import Annotated, Dict, Sequence
 from datetime import date, timedelta, datetime
 from typing_extensions import TypedDict, Optional
-from langchain_openai import ChatOpenAI
-from tradingagents.agents import *
-from langgraph.prebuilt import ToolNode
-from langgraph.graph import END, StateGraph, START, MessagesState
+from langgraph.graph import MessagesState
+
+
+def merge_round_responses(
+    left: Optional[Dict[str, str]], right: Optional[Dict[str, str]]
+) -> Dict[str, str]:
+    """
+    平行辯論回合的 reducer：合併同一回合中各辯論者的論點。
+    傳入 None 代表回合已合併完畢，清空暫存。
+    """
+    if right is None:
+        return {}
+    return {**(left or {}), **right}
+
+
+def merge_tool_cache(
+    left: Optional[Dict[str, str]], right: Optional[Dict[str, str]]
+) -> Dict[str, str]:
+    """工具快取的 reducer：合併各工具節點新增的結果（同一次執行中只增不減）。"""
+    return {**(left or {}), **(right or {})}
 
 
 # 研究團隊狀態
@@ -17,6 +33,8 @@ class InvestDebateState(TypedDict):
     ]  # 看跌對話歷史
     history: Annotated[str, "對話歷史"]  # 對話歷史
     current_response: Annotated[str, "最新回應"]  # 最新回應
+    current_bull_response: Annotated[str, "看漲方的最新回應（回合同步模式）"]
+    current_bear_response: Annotated[str, "看跌方的最新回應（回合同步模式）"]
     judge_decision: Annotated[str, "最終裁判決定"]  # 最終回應
     count: Annotated[int, "目前對話長度"]  # 對話長度
 
@@ -61,6 +79,11 @@ class AgentState(MessagesState):
         str, "新聞研究員關於當前世界事務的報告"
     ]
     fundamentals_report: Annotated[str, "基本面研究員的報告"]
+    report_digests: Annotated[
+        Dict[str, str], "各分析師報告的精簡摘要，供超出上下文預算時使用"
+    ]
+    # 本次執行的工具結果快取（工具名稱與參數 -> 輸出），所有工具節點共用
+    tool_cache: Annotated[Dict[str, str], merge_tool_cache]
 
     # 研究團隊討論步驟
     investment_debate_state: Annotated[
@@ -74,4 +97,8 @@ class AgentState(MessagesState):
     risk_debate_state: Annotated[
         RiskDebateState, "關於評估風險的辯論的當前狀態"
     ]
-    final_trade_decision: Annotated[str, "風險分析師做出的最終決定"]
\ No newline at end of file
+    final_trade_decision: Annotated[str, "風險分析師做出的最終決定"]
+
+    # 平行辯論模式下，同一回合各辯論者的論點暫存（角色 -> 論點），由合併節點寫回辯論狀態
+    debate_round_responses: Annotated[Dict[str, str], merge_round_responses]
+    risk_round_responses: Annotated[Dict[str, str], merge_round_responses]
\ No newline at end of file
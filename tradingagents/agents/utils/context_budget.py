@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+上下文預算工具
+
+分析師報告在辯論階段會被多個節點反覆內嵌到提示中，辯論歷史也會隨回合數增長。
+這裡在分析師階段結束後為每份報告建立一次精簡摘要並存入狀態，
+下游節點再依所用模型的 token 預算決定使用完整報告或摘要，必要時只保留最近的辯論歷史。
+"""
+import re
+from typing import Dict, Optional, Tuple
+
+# 會被內嵌到辯論提示中的分析師報告
+REPORT_KEYS = ("market_report", "sentiment_report", "news_report", "fundamentals_report")
+
+# 提示模板本身（角色說明、輸出要求等）大約佔用的 token 數
+PROMPT_OVERHEAD_TOKENS = 1500
+
+# 歷史被截斷時加在開頭的說明
+HISTORY_TRIMMED_NOTE = "（較早的辯論內容已省略，以下為最近的發言）\n"
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+_HEADING_PATTERN = re.compile(r"^#{1,6}\s+")
+_TABLE_SEPARATOR_PATTERN = re.compile(r"^\|?[\s:\-|]+\|?$")
+# 英文句點需後接空白，避免把 8.5% 之類的小數切開
+_SENTENCE_END_PATTERN = re.compile(r"(?<=[。！？])|(?<=[.!?])(?=\s)")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗估文字的 token 數：中日韓字元約一字一個 token，其餘字元約四個一個 token。
+    只用於預算判斷，不需要精確。
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _first_sentence(line: str, limit: int) -> str:
+    """取出一行中的第一句話，並限制長度。"""
+    sentence = _SENTENCE_END_PATTERN.split(line, maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit] + "…"
+
+
+def build_report_digest(report: str, max_chars: int = 600) -> str:
+    """
+    以抽取方式建立報告的結構化摘要，不需要呼叫 LLM。
+
+    保留所有標題、每個段落的第一句話，以及含有數字的重點行與表格列，
+    直到達到字元上限為止，讓摘要保有原報告的結構與關鍵數據。
+
+    Args:
+        report (str): 完整的分析師報告。
+        max_chars (int): 摘要的最大字元數。
+
+    Returns:
+        str: 摘要；若報告本身已在上限內則原樣返回。
+    """
+    if not report or len(report) <= max_chars:
+        return report or ""
+
+    lines = []
+    used = 0
+    section_started = False
+    for raw_line in report.splitlines():
+        line = raw_line.strip()
+        if not line or _TABLE_SEPARATOR_PATTERN.match(line):
+            continue
+
+        if _HEADING_PATTERN.match(line):
+            section_started = False
+            candidate = line
+        elif line.startswith("|"):
+            # 表格只保留含數字的資料列
+            if not any(ch.isdigit() for ch in line):
+                continue
+            candidate = line
+        elif not section_started:
+            # 每個段落的第一句通常是結論
+            section_started = True
+            candidate = _first_sentence(line, 160)
+        elif any(ch.isdigit() for ch in line):
+            candidate = _first_sentence(line, 120)
+        else:
+            continue
+
+        if used + len(candidate) > max_chars:
+            break
+        lines.append(candidate)
+        used += len(candidate) + 1
+
+    return "\n".join(lines)
+
+
+def create_context_budgeter(max_digest_chars: int = 600):
+    """
+    建立一個在分析師階段之後執行一次的節點，為每份報告建立摘要並存入狀態。
+
+    Args:
+        max_digest_chars (int): 每份摘要的最大字元數。
+
+    Returns:
+        function: 可在 langgraph 中使用的節點函式。
+    """
+
+    def context_budgeter_node(state) -> dict:
+        digests = {
+            key: build_report_digest(state.get(key, ""), max_digest_chars)
+            for key in REPORT_KEYS
+        }
+        return {"report_digests": digests}
+
+    return context_budgeter_node
+
+
+class ContextBudget:
+    """
+    依模型的提示 token 預算，決定下游節點使用完整報告或摘要。
+
+    優先順序：
+    1. 完整報告 + 完整歷史在預算內時，維持原本的完整內容
+    2. 否則改用摘要（狀態中沒有摘要時即時建立）
+    3. 仍超出預算時，只保留最近的辯論歷史
+    """
+
+    def __init__(self, max_prompt_tokens: Optional[int] = None, max_digest_chars: int = 600):
+        """
+        Args:
+            max_prompt_tokens (Optional[int]): 提示 token 上限；None 表示不限制。
+            max_digest_chars (int): 狀態中沒有摘要時即時建立摘要的字元上限。
+        """
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_digest_chars = max_digest_chars
+
+    def fit(
+        self,
+        state,
+        history: str = "",
+        reserved: str = "",
+        include_reports: bool = True,
+    ) -> Tuple[Dict[str, str], str]:
+        """
+        在預算內選擇要放進提示的報告與歷史。
+
+        Args:
+            state (dict): 當前的圖狀態。
+            history (str): 辯論歷史。
+            reserved (str): 其他一定會放進提示的內容（如過往經驗、交易員計畫），只用來計算預算。
+            include_reports (bool): 提示中是否會內嵌分析師報告。
+
+        Returns:
+            Tuple[Dict[str, str], str]: (報告鍵 -> 要使用的內容, 要使用的歷史)。
+        """
+        reports = {key: state.get(key, "") for key in REPORT_KEYS} if include_reports else {}
+        if self.max_prompt_tokens is None:
+            return reports, history
+
+        fixed_tokens = PROMPT_OVERHEAD_TOKENS + estimate_tokens(reserved)
+        history_tokens = estimate_tokens(history)
+        report_tokens = sum(estimate_tokens(text) for text in reports.values())
+        if fixed_tokens + report_tokens + history_tokens <= self.max_prompt_tokens:
+            return reports, history
+
+        if reports:
+            digests = state.get("report_digests") or {}
+            reports = {
+                key: digests.get(key) or build_report_digest(text, self.max_digest_chars)
+                for key, text in reports.items()
+            }
+            report_tokens = sum(estimate_tokens(text) for text in reports.values())
+
+        history_budget = self.max_prompt_tokens - fixed_tokens - report_tokens
+        return reports, self.trim_history(history, history_budget)
+
+    @staticmethod
+    def trim_history(history: str, max_tokens: int) -> str:
+        """
+        只保留最近、且在 token 上限內的辯論歷史（以行為單位，從最後往前取）。
+
+        Args:
+            history (str): 完整的辯論歷史。
+            max_tokens (int): 歷史可使用的 token 數。
+
+        Returns:
+            str: 截斷後的歷史；未超出上限時原樣返回。
+        """
+        if estimate_tokens(history) <= max_tokens:
+            return history
+
+        budget = max_tokens - estimate_tokens(HISTORY_TRIMMED_NOTE)
+        kept = []
+        for line in reversed(history.splitlines()):
+            cost = estimate_tokens(line) + 1
+            if cost > budget:
+                break
+            kept.append(line)
+            budget -= cost
+        return HISTORY_TRIMMED_NOTE + "\n".join(reversed(kept))
@@ -1,7 +1,12 @@
+import logging
 import os
-import chromadb
-from chromadb.config import Settings
-from openai import OpenAI
+import sys
+
+from tradingagents.default_config import DEFAULT_CONFIG
+from tradingagents.utils.client_pool import client_registry
+from tradingagents.utils.llm_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
 
 
 class FinancialSituationMemory:
@@ -20,13 +25,37 @@ class FinancialSituationMemory:
                 # Fall back to LLM keys as last resort
                 embedding_api_key = config.get("quick_think_api_key") or config.get("deep_think_api_key")
                 if embedding_api_key:
-                    import logging
-                    logging.warning("Using LLM API key for embeddings. Consider setting embedding_api_key or OPENAI_API_KEY.")
+                    logger.warning("Using LLM API key for embeddings. Consider setting embedding_api_key or OPENAI_API_KEY.")
+        
+        # Embeddings share the LLM record/replay cache; replay needs no client
+        self.cache = ResponseCache(
+            config.get("llm_cache_dir", DEFAULT_CONFIG["llm_cache_dir"]),
+            config.get("llm_cache_mode", "passthrough"),
+            kind="embedding",
+        )
         
-        # Use configured endpoint for embeddings
-        self.client = OpenAI(base_url=embedding_base_url, api_key=embedding_api_key)
-        self.chroma_client = chromadb.Client(Settings(allow_reset=True))
-        self.situation_collection = self.chroma_client.get_or_create_collection(name=name)
+        # The embedding client and the chromadb collection are created on first use,
+        # so building the graph does not import chromadb or the OpenAI SDK
+        self.name = name
+        self.embedding_base_url = embedding_base_url
+        self.embedding_api_key = embedding_api_key
+        self._collection = None
+
+    @property
+    def client(self):
+        """Pooled OpenAI client for the configured embedding endpoint"""
+        return client_registry.get_openai_client(self.embedding_base_url, self.embedding_api_key)
+
+    @property
+    def situation_collection(self):
+        """The chromadb collection, created on first access"""
+        if self._collection is None:
+            import chromadb
+            from chromadb.config import Settings
+
+            chroma_client = chromadb.Client(Settings(allow_reset=True))
+            self._collection = chroma_client.get_or_create_collection(name=self.name)
+        return self._collection
 
     def get_embedding(self, text):
         """Get OpenAI embedding for a text"""
@@ -38,10 +67,13 @@ class FinancialSituationMemory:
         if len(text) > max_chars:
             text = text[:max_chars]
         
-        response = self.client.embeddings.create(
-            model=self.embedding, input=text
-        )
-        return response.data[0].embedding
+        def compute():
+            response = self.client.embeddings.create(
+                model=self.embedding, input=text
+            )
+            return response.data[0].embedding
+        
+        return self.cache.fetch({"embedding_model": self.embedding, "input": text}, compute)
 
     def add_situations(self, situations_and_advice):
         """Add financial situations and their corresponding advice. Parameter is a list of tuples (situation, rec)"""
@@ -68,6 +100,11 @@ class FinancialSituationMemory:
 
     def get_memories(self, current_situation, n_matches=1):
         """Find matching recommendations using OpenAI embeddings"""
+        # Nothing has been stored yet: skip the embedding call (and the chromadb
+        # import when no memory in this process has used chromadb at all)
+        if "chromadb" not in sys.modules or self.situation_collection.count() == 0:
+            return []
+
         query_embedding = self.get_embedding(current_situation)
 
         results = self.situation_collection.query(
@@ -3,8 +3,11 @@
 LLM Output Post-Processing Filter
 Fixes common LLM output errors including character corruption and format issues
 """
+import logging
 import re
 
+logger = logging.getLogger(__name__)
+
 
 def count_chinese_words(text: str) -> int:
     """
@@ -93,10 +96,8 @@ def validate_and_warn(content: str, agent_name: str) -> list:
         if marker in content:
             warnings.append(f"Found truncation marker: '{marker}'")
     
-    if warnings:
-        print(f"\n⚠️  {agent_name} Report Warnings:")
-        for warning in warnings:
-            print(f"   - {warning}")
+    for warning in warnings:
+        logger.warning("%s report warning: %s", agent_name, warning)
     
     return warnings
 
@@ -122,7 +123,7 @@ def post_process_agent_output(content: str, agent_name: str, retry_callback=None
     # Step 3: Critical validation - retry if needed
     word_count = count_chinese_words(content)
     if (word_count < 800 or word_count > 1500) and retry_callback:
-        print(f"\n🔄 {agent_name}: Word count {word_count} out of range, triggering retry...")
+        logger.info("%s: word count %d out of range, triggering retry", agent_name, word_count)
         # Callback should regenerate the content
         # This is optional and should be implemented in the calling code
     
@@ -144,12 +145,12 @@ def ensure_min_length(content: str, min_words: int = 800, agent_name: str = "Age
     word_count = count_chinese_words(content)
     
     if word_count < min_words:
-        print(f"⚠️  [{agent_name}] 報告字數不足: {word_count}字 < {min_words}字最低要求")
+        logger.warning("[%s] 報告字數不足: %d字 < %d字最低要求", agent_name, word_count, min_words)
         return content, False
     elif word_count > 1500:
-        print(f"⚠️  [{agent_name}] 報告字數過多: {word_count}字 > 1500字上限")
+        logger.warning("[%s] 報告字數過多: %d字 > 1500字上限", agent_name, word_count)
         return content, False
     else:
-        print(f"✅ [{agent_name}] 報告字數符合要求: {word_count}字")
+        logger.debug("[%s] 報告字數符合要求: %d字", agent_name, word_count)
         return content, True
 
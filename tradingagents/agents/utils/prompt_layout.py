@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+前綴穩定的提示版面
+
+供應商的提示快取只對「完全相同的前綴」生效，因此研究員、風險辯論員與經理的提示
+統一拆成三段，並依變動頻率由低到高排列：
+
+1. 系統指示：角色與輸出要求，整個程式生命週期內不變
+2. 共用上下文：分析師報告（以及交易員計畫、過往經驗），同一次執行中不變
+3. 本回合內容：辯論歷史與對手最新論點，每回合都不同
+
+Anthropic 模型會在前兩段結尾加上 cache_control 斷點；
+OpenAI 相容的模型則維持純文字內容，依賴其自動前綴快取。
+"""
+from typing import Dict, List
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from tradingagents.agents.utils.context_budget import REPORT_KEYS
+
+# 報告在共用區塊中的標籤，順序與 REPORT_KEYS 一致
+REPORT_LABELS = {
+    "market_report": "市場分析",
+    "sentiment_report": "社群情緒",
+    "news_report": "新聞",
+    "fundamentals_report": "基本面",
+}
+
+_EPHEMERAL_CACHE = {"type": "ephemeral"}
+
+
+def format_report_block(reports: Dict[str, str]) -> str:
+    """
+    將分析師報告排成固定格式的條列區塊。
+    所有節點都透過這個函式產生報告區塊，確保同一次執行中的內容逐字相同。
+    """
+    return "\n".join(f"- {REPORT_LABELS[key]}：{reports.get(key, '')}" for key in REPORT_KEYS)
+
+
+def uses_cache_control(llm) -> bool:
+    """判斷模型是否需要明確的 cache_control 斷點（目前只有 Anthropic）。"""
+    provider = getattr(llm, "provider", None) or getattr(llm, "_llm_type", "")
+    return "anthropic" in str(provider)
+
+
+def build_prompt_messages(
+    llm,
+    instructions: str,
+    shared_context: str,
+    turn_context: str = "",
+) -> List[BaseMessage]:
+    """
+    依「系統指示 → 共用上下文 → 本回合內容」的順序建立訊息列表。
+
+    Args:
+        llm: 要呼叫的模型，用於決定是否加上 cache_control 斷點。
+        instructions (str): 不含任何執行期資料的角色指示。
+        shared_context (str): 同一次執行中不變的內容（報告、計畫、過往經驗）。
+        turn_context (str): 每回合變動的內容（辯論歷史、對手論點）。
+
+    Returns:
+        List[BaseMessage]: 系統訊息與使用者訊息。
+    """
+    if not uses_cache_control(llm):
+        user_content = f"{shared_context}\n\n{turn_context}" if turn_context else shared_context
+        return [SystemMessage(content=instructions), HumanMessage(content=user_content)]
+
+    user_blocks = [{"type": "text", "text": shared_context, "cache_control": _EPHEMERAL_CACHE}]
+    if turn_context:
+        user_blocks.append({"type": "text", "text": turn_context})
+    return [
+        SystemMessage(content=[{"type": "text", "text": instructions, "cache_control": _EPHEMERAL_CACHE}]),
+        HumanMessage(content=user_blocks),
+    ]
@@ -1,17 +1,32 @@
+import logging
 import os
-import requests
-import polars as pl
+import hashlib
+import threading
 import json
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from io import StringIO
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows：沒有 flock，額度計數只在行程內同步
+    fcntl = None
+
+from tradingagents.utils.client_pool import client_registry, key_fingerprint
+from tradingagents.utils.instrumentation import get_current_profile
+from .config import get_config, get_credential
+
+logger = logging.getLogger(__name__)
 
 API_BASE_URL = "https://www.alphavantage.co/query"
 
 def get_api_key() -> str:
-    """從環境變數中檢索 Alpha Vantage 的 API 金鑰。"""
-    api_key = os.getenv("ALPHA_VANTAGE_API_KEY")
+    """檢索 Alpha Vantage 的 API 金鑰：目前執行設定中的 alpha_vantage_api_key 優先，否則讀取環境變數。"""
+    api_key = get_credential("alpha_vantage_api_key", "ALPHA_VANTAGE_API_KEY")
     if not api_key:
-        raise ValueError("未設定 ALPHA_VANTAGE_API_KEY 環境變數。")
+        raise ValueError("未設定 alpha_vantage_api_key 設定或 ALPHA_VANTAGE_API_KEY 環境變數。")
     return api_key
 
 def format_datetime_for_api(date_input) -> str:
@@ -39,6 +54,279 @@ class AlphaVantageRateLimitError(Exception):
     """當超過 Alpha Vantage API 速率限制時引發的例外。"""
     pass
 
+def _is_rate_limit_response(response_text: str) -> Optional[str]:
+    """若回應是速率限制/額度用盡訊息則返回訊息內容，否則返回 None。"""
+    try:
+        response_json = json.loads(response_text)
+    except json.JSONDecodeError:
+        # 回應不是 JSON (可能是 CSV 數據)，這是正常的
+        return None
+    if isinstance(response_json, dict) and "Information" in response_json:
+        info_message = response_json["Information"]
+        if "rate limit" in info_message.lower() or "api key" in info_message.lower():
+            return info_message
+    return None
+
+
+def _is_daily_quota_message(info_message: str) -> bool:
+    """
+    伺服器訊息是否表示當日額度已用盡（例如 "... rate limit is 25 requests per day"）。
+    每秒突發或每分鐘速率的訊息（"spreading out ... 1 request per second"）只是暫時性的，不算在內。
+    """
+    message = info_message.lower()
+    if any(marker in message for marker in ("per second", "per minute", "spreading out")):
+        return False
+    return "per day" in message or "daily" in message
+
+
+def _is_error_response(response_text: str) -> bool:
+    """錯誤回應（JSON 格式的 Error Message / Information / Note）不應被快取。"""
+    stripped = response_text.lstrip()
+    if not stripped.startswith("{"):
+        return False
+    try:
+        response_json = json.loads(stripped)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(response_json, dict) and any(
+        key in response_json for key in ("Error Message", "Information", "Note")
+    )
+
+
+class AlphaVantageClient:
+    """
+    Alpha Vantage 請求排程器。
+
+    - 以 (function, params) 去重：同一天內相同請求只會真正送出一次，
+      例如 macd/macds/macdh 共用同一個 MACD 回應，布林帶三條線共用同一個 BBANDS 回應
+    - 完整回應依 UTC 日期快取在 data_cache_dir 下，跨執行（CLI 多次執行）也能重用；
+      回應與金鑰無關，所有金鑰共用同一份快取
+    - 同時進行中的相同請求只送出一次，其他呼叫者等待同一個結果
+    - 每日額度依 API 金鑰（雜湊）分別追蹤，用盡時在送出前直接引發 AlphaVantageRateLimitError，
+      讓上層立即備援至下一個供應商；計數檔以檔案鎖讀取-修改-寫入，共用快取目錄的多個行程不會互相覆寫
+    - 每分鐘的速率交給行程內共用的限速器排隊（不跨行程；多行程時由呼叫端分配速率，見 ShardedRunner）
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Args:
+            cache_dir (Optional[str]): 回應快取與額度紀錄的目錄；None 表示只使用記憶體。
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._lock = threading.Lock()
+        self._memory: Dict[str, str] = {}
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._day = ""
+        # 金鑰雜湊 -> 當日已使用的請求數（只使用記憶體時的計數；有快取目錄時以磁碟檔案為準）
+        self._used: Dict[str, int] = {}
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    @staticmethod
+    def make_key(api_params: dict) -> str:
+        """以不含金鑰的請求參數建立穩定的快取鍵。"""
+        payload = {k: v for k, v in api_params.items() if k not in ("apikey", "source")}
+        raw = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _day_dir(self, day: str) -> Optional[Path]:
+        return self.cache_dir / day if self.cache_dir else None
+
+    def _roll_day(self) -> str:
+        """跨日時清空記憶體中的回應快取與額度計數。呼叫端需持有鎖。"""
+        day = self._today()
+        if day != self._day:
+            self._day = day
+            self._memory.clear()
+            self._used.clear()
+        return day
+
+    def _quota_path(self, day: str, fingerprint: str) -> Optional[Path]:
+        day_dir = self._day_dir(day)
+        return day_dir / f"quota-{fingerprint}.json" if day_dir is not None else None
+
+    @contextmanager
+    def _quota_file_lock(self, path: Optional[Path]) -> Iterator[None]:
+        """
+        跨行程的額度檔案鎖（POSIX flock），讓共用快取目錄的多個行程（例如分片工作行程）
+        以讀取-修改-寫入的方式更新同一份計數。無快取目錄或平台不支援時只依賴行程內的鎖。
+        """
+        if path is None or fcntl is None:
+            yield
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handle = open(path.with_suffix(".lock"), "a")
+        except OSError:
+            yield
+            return
+        with handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def _read_used(self, path: Optional[Path], fingerprint: str) -> int:
+        """讀取金鑰當日已使用的額度；有快取目錄時以磁碟為準。呼叫端需持有鎖。"""
+        if path is None:
+            return self._used.get(fingerprint, 0)
+        try:
+            return json.loads(path.read_text())["used"]
+        except (OSError, ValueError, KeyError):
+            return self._used.get(fingerprint, 0)
+
+    def _write_used(self, path: Optional[Path], fingerprint: str, used: int) -> None:
+        """寫入金鑰當日已使用的額度。呼叫端需持有鎖。"""
+        self._used[fingerprint] = used
+        if path is None:
+            return
+        try:
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps({"used": used}))
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _reserve_quota(self, day: str, fingerprint: str, daily_quota: int) -> bool:
+        """在額度內時登記一次請求並返回 True；已用盡時返回 False。呼叫端需持有行程內的鎖。"""
+        path = self._quota_path(day, fingerprint)
+        with self._quota_file_lock(path):
+            used = self._read_used(path, fingerprint)
+            if used >= daily_quota:
+                return False
+            self._write_used(path, fingerprint, used + 1)
+            return True
+
+    def _exhaust_quota(self, day: str, fingerprint: str, daily_quota: int) -> None:
+        """將金鑰當日的計數補滿。呼叫端需持有行程內的鎖。"""
+        path = self._quota_path(day, fingerprint)
+        with self._quota_file_lock(path):
+            self._write_used(path, fingerprint, max(self._read_used(path, fingerprint), daily_quota))
+
+    def _load_cached(self, day: str, key: str) -> Optional[str]:
+        """讀取記憶體或磁碟中的當日回應。呼叫端需持有鎖。"""
+        if key in self._memory:
+            return self._memory[key]
+        day_dir = self._day_dir(day)
+        if day_dir is not None:
+            try:
+                text = (day_dir / f"{key}.txt").read_text(encoding="utf-8")
+            except OSError:
+                return None
+            self._memory[key] = text
+            return text
+        return None
+
+    def _store(self, day: str, key: str, text: str) -> None:
+        """寫入當日回應快取。呼叫端需持有鎖。"""
+        self._memory[key] = text
+        day_dir = self._day_dir(day)
+        if day_dir is None:
+            return
+        try:
+            day_dir.mkdir(parents=True, exist_ok=True)
+            tmp = day_dir / f"{key}.{threading.get_ident()}.tmp"
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, day_dir / f"{key}.txt")
+        except OSError:
+            pass
+
+    def remaining_quota(self, api_key: str, daily_quota: Optional[int]) -> Optional[int]:
+        """金鑰當日剩餘的請求額度；不限制時返回 None。"""
+        if daily_quota is None:
+            return None
+        with self._lock:
+            day = self._roll_day()
+            fingerprint = key_fingerprint(api_key)
+            path = self._quota_path(day, fingerprint)
+            with self._quota_file_lock(path):
+                return max(daily_quota - self._read_used(path, fingerprint), 0)
+
+    def request(self, api_params: dict, daily_quota: Optional[int] = None) -> str:
+        """
+        依排程送出請求（或直接返回快取/進行中的結果）。
+
+        Args:
+            api_params (dict): 請求參數，包含 apikey。
+            daily_quota (Optional[int]): 此金鑰的每日請求額度；None 表示不限制（付費方案）。
+
+        Raises:
+            AlphaVantageRateLimitError: 當日額度已用盡，或伺服器回報超過速率限制時
+        """
+        key = self.make_key(api_params)
+        fingerprint = key_fingerprint(api_params["apikey"])
+        profile = get_current_profile()
+
+        while True:
+            with self._lock:
+                day = self._roll_day()
+                cached = self._load_cached(day, key)
+                if cached is not None:
+                    if profile is not None:
+                        profile.record_cache("alpha_vantage", hit=True)
+                    return cached
+                waiting = self._in_flight.get(key)
+                if waiting is None:
+                    if daily_quota is not None and not self._reserve_quota(day, fingerprint, daily_quota):
+                        raise AlphaVantageRateLimitError(
+                            f"已用盡本地追蹤的 Alpha Vantage 每日額度（{daily_quota} 次）"
+                        )
+                    done = self._in_flight[key] = threading.Event()
+                    break
+            # 相同請求正在進行中：等待其完成後重新查詢快取（失敗時由本執行緒接手重送）
+            waiting.wait()
+
+        if profile is not None:
+            profile.record_cache("alpha_vantage", hit=False)
+        try:
+            response_text = self._send(api_params, day, daily_quota)
+            with self._lock:
+                if not _is_error_response(response_text):
+                    self._store(day, key, response_text)
+            return response_text
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            done.set()
+
+    def _send(self, api_params: dict, day: str, daily_quota: Optional[int]) -> str:
+        """實際送出 HTTP 請求並檢查速率限制訊息。"""
+        # 同一金鑰的所有呼叫共用連線池與速率限制，超出每分鐘額度時在本地排隊
+        client_registry.get_limiter(API_BASE_URL, api_params["apikey"], get_config().get("rate_limits")).acquire()
+        response = client_registry.get_session(API_BASE_URL).get(API_BASE_URL, params=api_params)
+        response.raise_for_status()
+
+        response_text = response.text
+        info_message = _is_rate_limit_response(response_text)
+        if info_message:
+            if daily_quota is not None and _is_daily_quota_message(info_message):
+                # 伺服器端已用盡當日額度：同步本地計數，避免當日再送出注定失敗的請求
+                # 突發或每分鐘速率的訊息只引發例外讓上層備援，不影響當日額度
+                fingerprint = key_fingerprint(api_params["apikey"])
+                with self._lock:
+                    self._exhaust_quota(day, fingerprint, daily_quota)
+            raise AlphaVantageRateLimitError(f"超過 Alpha Vantage 速率限制：{info_message}")
+        return response_text
+
+
+# 以快取目錄為鍵共用排程器（回應快取與各金鑰的額度計數）；額度上限隨每次請求的設定傳入
+_clients: Dict[str, AlphaVantageClient] = {}
+_client_lock = threading.Lock()
+
+
+def get_alpha_vantage_client() -> AlphaVantageClient:
+    """取得目前設定的快取目錄對應的排程器；同一目錄共用一個實例（與其快取、額度狀態）。"""
+    cache_dir = str(Path(get_config()["data_cache_dir"]) / "alpha_vantage")
+    with _client_lock:
+        client = _clients.get(cache_dir)
+        if client is None:
+            client = _clients[cache_dir] = AlphaVantageClient(cache_dir)
+        return client
+
+
 def _make_api_request(function_name: str, params: dict) -> dict | str:
     """
     發送 API 請求並處理回應的輔助函式。
@@ -64,24 +352,7 @@ def _make_api_request(function_name: str, params: dict) -> dict | str:
         # 如果 entitlement 為 None 或空，則移除
         api_params.pop("entitlement", None)
     
-    response = requests.get(API_BASE_URL, params=api_params)
-    response.raise_for_status()
-
-    response_text = response.text
-    
-    # 檢查回應是否為 JSON (錯誤回應通常是 JSON)
-    try:
-        response_json = json.loads(response_text)
-        # 檢查速率限制錯誤
-        if "Information" in response_json:
-            info_message = response_json["Information"]
-            if "rate limit" in info_message.lower() or "api key" in info_message.lower():
-                raise AlphaVantageRateLimitError(f"超過 Alpha Vantage 速率限制：{info_message}")
-    except json.JSONDecodeError:
-        # 回應不是 JSON (可能是 CSV 數據)，這是正常的
-        pass
-
-    return response_text
+    return get_alpha_vantage_client().request(api_params, get_config().get("alpha_vantage_daily_quota"))
 
 
 
@@ -100,6 +371,9 @@ def _filter_csv_by_date_range(csv_data: str, start_date: str, end_date: str) ->
     if not csv_data or csv_data.strip() == "":
         return csv_data
 
+    # 延遲匯入：只有 Alpha Vantage 股價需要 polars
+    import polars as pl
+
     try:
         # 解析 CSV 數據
         df = pl.read_csv(StringIO(csv_data))
@@ -121,5 +395,5 @@ def _filter_csv_by_date_range(csv_data: str, start_date: str, end_date: str) ->
 
     except Exception as e:
         # 如果過濾失敗，返回原始數據並附帶警告
-        print(f"警告：按日期範圍過濾 CSV 數據失敗：{e}")
+        logger.warning("按日期範圍過濾 CSV 數據失敗：%s", e)
         return csv_data
\ No newline at end of file
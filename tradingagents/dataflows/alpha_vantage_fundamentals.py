@@ -1,7 +1,10 @@
+import logging
 from .alpha_vantage_common import _make_api_request
 import json
 import os
 
+logger = logging.getLogger(__name__)
+
 
 def get_fundamentals(ticker: str, curr_date: str = None, use_toon: bool = None) -> str:
     """
@@ -76,7 +79,7 @@ def get_fundamentals(ticker: str, curr_date: str = None, use_toon: bool = None)
                     toon_data = convert_json_to_toon(summarized_data)
                     return toon_data
                 except Exception as e:
-                    print(f"警告：toon轉換失敗：{e}，使用JSON格式")
+                    logger.warning("toon轉換失敗：%s，使用JSON格式", e)
                     return json.dumps(summarized_data, ensure_ascii=False, indent=2)
             else:
                 return json.dumps(summarized_data, ensure_ascii=False, indent=2)
@@ -84,7 +87,7 @@ def get_fundamentals(ticker: str, curr_date: str = None, use_toon: bool = None)
         return response
         
     except (json.JSONDecodeError, Exception) as e:
-        print(f"警告：無法總結基本面數據：{e}")
+        logger.warning("無法總結基本面數據：%s", e)
         return response
 
 
@@ -129,7 +132,7 @@ def get_balance_sheet(ticker: str, freq: str = "quarterly", curr_date: str = Non
                     toon_data = convert_json_to_toon(data)
                     return toon_data
                 except Exception as e:
-                    print(f"警告：toon轉換失敗：{e}，使用JSON格式")
+                    logger.warning("toon轉換失敗：%s，使用JSON格式", e)
                     return json.dumps(data, ensure_ascii=False, indent=2)
             else:
                 return json.dumps(data, ensure_ascii=False, indent=2)
@@ -137,7 +140,7 @@ def get_balance_sheet(ticker: str, freq: str = "quarterly", curr_date: str = Non
         return response
         
     except (json.JSONDecodeError, Exception) as e:
-        print(f"警告：無法處理資產負債表數據：{e}")
+        logger.warning("無法處理資產負債表數據：%s", e)
         return response
 
 
@@ -182,7 +185,7 @@ def get_cashflow(ticker: str, freq: str = "quarterly", curr_date: str = None, us
                     toon_data = convert_json_to_toon(data)
                     return toon_data
                 except Exception as e:
-                    print(f"警告：toon轉換失敗：{e}，使用JSON格式")
+                    logger.warning("toon轉換失敗：%s，使用JSON格式", e)
                     return json.dumps(data, ensure_ascii=False, indent=2)
             else:
                 return json.dumps(data, ensure_ascii=False, indent=2)
@@ -190,7 +193,7 @@ def get_cashflow(ticker: str, freq: str = "quarterly", curr_date: str = None, us
         return response
         
     except (json.JSONDecodeError, Exception) as e:
-        print(f"警告：無法處理現金流量表數據：{e}")
+        logger.warning("無法處理現金流量表數據：%s", e)
         return response
 
 
@@ -235,7 +238,7 @@ def get_income_statement(ticker: str, freq: str = "quarterly", curr_date: str =
                     toon_data = convert_json_to_toon(data)
                     return toon_data
                 except Exception as e:
-                    print(f"警告：toon轉換失敗：{e}，使用JSON格式")
+                    logger.warning("toon轉換失敗：%s，使用JSON格式", e)
                     return json.dumps(data, ensure_ascii=False, indent=2)
             else:
                 return json.dumps(data, ensure_ascii=False, indent=2)
@@ -243,5 +246,5 @@ def get_income_statement(ticker: str, freq: str = "quarterly", curr_date: str =
         return response
         
     except (json.JSONDecodeError, Exception) as e:
-        print(f"警告：無法處理損益表數據：{e}")
+        logger.warning("無法處理損益表數據：%s", e)
         return response
\ No newline at end of file
@@ -1,4 +1,32 @@
-from .alpha_vantage_common import _make_api_request
+import logging
+from .alpha_vantage_common import AlphaVantageRateLimitError, _make_api_request
+
+logger = logging.getLogger(__name__)
+
+
+def _indicator_request(indicator: str, interval: str, time_period: int, series_type: str):
+    """
+    返回指標對應的 Alpha Vantage function 與請求參數；不需要 API 請求的指標返回 None。
+
+    共用同一回應的指標（macd/macds/macdh、boll/boll_ub/boll_lb）產生完全相同的請求，
+    由 Alpha Vantage 排程器的去重快取確保每天只送出一次。
+    """
+    base = {"interval": interval, "series_type": series_type, "datatype": "csv"}
+    requests_by_indicator = {
+        "close_50_sma": ("SMA", {**base, "time_period": "50"}),
+        "close_200_sma": ("SMA", {**base, "time_period": "200"}),
+        "close_10_ema": ("EMA", {**base, "time_period": "10"}),
+        "macd": ("MACD", base),
+        "macds": ("MACD", base),
+        "macdh": ("MACD", base),
+        "rsi": ("RSI", {**base, "time_period": str(time_period)}),
+        "boll": ("BBANDS", {**base, "time_period": "20"}),
+        "boll_ub": ("BBANDS", {**base, "time_period": "20"}),
+        "boll_lb": ("BBANDS", {**base, "time_period": "20"}),
+        "atr": ("ATR", {"interval": interval, "time_period": str(time_period), "datatype": "csv"}),
+    }
+    return requests_by_indicator.get(indicator)
+
 
 def get_indicator(
     symbol: str,
@@ -74,74 +102,10 @@ def get_indicator(
 
     try:
         # 獲取期間的指標數據
-        if indicator == "close_50_sma":
-            data = _make_api_request("SMA", {
-                "symbol": symbol,
-                "interval": interval,
-                "time_period": "50",
-                "series_type": series_type,
-                "datatype": "csv"
-            })
-        elif indicator == "close_200_sma":
-            data = _make_api_request("SMA", {
-                "symbol": symbol,
-                "interval": interval,
-                "time_period": "200",
-                "series_type": series_type,
-                "datatype": "csv"
-            })
-        elif indicator == "close_10_ema":
-            data = _make_api_request("EMA", {
-                "symbol": symbol,
-                "interval": interval,
-                "time_period": "10",
-                "series_type": series_type,
-                "datatype": "csv"
-            })
-        elif indicator == "macd":
-            data = _make_api_request("MACD", {
-                "symbol": symbol,
-                "interval": interval,
-                "series_type": series_type,
-                "datatype": "csv"
-            })
-        elif indicator == "macds":
-            data = _make_api_request("MACD", {
-                "symbol": symbol,
-                "interval": interval,
-                "series_type": series_type,
-                "datatype": "csv"
-            })
-        elif indicator == "macdh":
-            data = _make_api_request("MACD", {
-                "symbol": symbol,
-                "interval": interval,
-                "series_type": series_type,
-                "datatype": "csv"
-            })
-        elif indicator == "rsi":
-            data = _make_api_request("RSI", {
-                "symbol": symbol,
-                "interval": interval,
-                "time_period": str(time_period),
-                "series_type": series_type,
-                "datatype": "csv"
-            })
-        elif indicator in ["boll", "boll_ub", "boll_lb"]:
-            data = _make_api_request("BBANDS", {
-                "symbol": symbol,
-                "interval": interval,
-                "time_period": "20",
-                "series_type": series_type,
-                "datatype": "csv"
-            })
-        elif indicator == "atr":
-            data = _make_api_request("ATR", {
-                "symbol": symbol,
-                "interval": interval,
-                "time_period": str(time_period),
-                "datatype": "csv"
-            })
+        request = _indicator_request(indicator, interval, time_period, series_type)
+        if request is not None:
+            function_name, params = request
+            data = _make_api_request(function_name, {"symbol": symbol, **params})
         elif indicator == "vwma":
             # Alpha Vantage 沒有直接的 VWMA，因此我們將返回一條資訊性訊息
             # 在實際實現中，這需要從 OHLCV 數據中計算
@@ -217,6 +181,9 @@ def get_indicator(
 
         return result_str
 
+    except AlphaVantageRateLimitError:
+        # 交由上層備援至下一個供應商
+        raise
     except Exception as e:
-        print(f"獲取 {indicator} 的 Alpha Vantage 指標數據時出錯：{e}")
+        logger.warning("獲取 %s 的 Alpha Vantage 指標數據時出錯：%s", indicator, e)
         return f"檢索 {indicator} 數據時出錯：{str(e)}"
\ No newline at end of file
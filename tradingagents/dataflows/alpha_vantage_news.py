@@ -1,8 +1,11 @@
+import logging
 from .alpha_vantage_common import _make_api_request, format_datetime_for_api
 import json
 
 import os
 
+logger = logging.getLogger(__name__)
+
 
 def get_news(ticker, start_date, end_date, use_toon: bool = None) -> dict[str, str] | str:
     """
@@ -84,7 +87,7 @@ def get_news(ticker, start_date, end_date, use_toon: bool = None) -> dict[str, s
                     toon_data = convert_json_to_toon(summarized_data)
                     return toon_data
                 except Exception as e:
-                    print(f"警告：toon轉換失敗：{e}，使用JSON格式")
+                    logger.warning("toon轉換失敗：%s，使用JSON格式", e)
                     return json.dumps(summarized_data, ensure_ascii=False, indent=2)
             else:
                 return json.dumps(summarized_data, ensure_ascii=False, indent=2)
@@ -94,7 +97,7 @@ def get_news(ticker, start_date, end_date, use_toon: bool = None) -> dict[str, s
         
     except (json.JSONDecodeError, Exception) as e:
         # 如果處理失敗，返回原始回應
-        print(f"警告：無法總結新聞數據：{e}")
+        logger.warning("無法總結新聞數據：%s", e)
         return response
 
 def get_insider_transactions(symbol: str) -> dict[str, str] | str:
@@ -130,5 +133,5 @@ def get_insider_transactions(symbol: str) -> dict[str, str] | str:
         return response
         
     except (json.JSONDecodeError, Exception) as e:
-        print(f"警告：無法處理內部交易數據：{e}")
+        logger.warning("無法處理內部交易數據：%s", e)
         return response
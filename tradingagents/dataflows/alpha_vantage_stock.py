@@ -1,5 +1,6 @@
 from datetime import datetime
 from .alpha_vantage_common import _make_api_request, _filter_csv_by_date_range
+from .table_encoder import encode_table
 
 def get_stock(
     symbol: str,
@@ -16,7 +17,7 @@ def get_stock(
         end_date: 結束日期，格式為 yyyy-mm-dd
 
     Returns:
-        包含過濾到指定日期範圍的每日調整後時間序列數據的 CSV 字串。
+        包含過濾到指定日期範圍的每日調整後時間序列數據的精簡表格字串（格式見 table_encoder）。
     """
     # 解析日期以確定範圍
     start_dt = datetime.strptime(start_date, "%Y-%m-%d")
@@ -35,4 +36,7 @@ def get_stock(
 
     response = _make_api_request("TIME_SERIES_DAILY_ADJUSTED", params)
 
-    return _filter_csv_by_date_range(response, start_date, end_date)
+    filtered = _filter_csv_by_date_range(response, start_date, end_date)
+
+    # 編碼為精簡表格，與其他股價供應商一致
+    return encode_table(filtered, "get_stock_data", time_series=True) if filtered.strip() else filtered
@@ -0,0 +1,365 @@
+"""
+時間點（as-of）資料層
+
+回測時每個交易日都只應看到當時已公開的資料。線上供應商的路徑以今天為基準抓取資料
+（例如股價下載到今天、財報返回最新的各期），回測 500 個交易日會重複抓取與計算 500 次，
+也可能把未來的資料洩漏給代理。
+
+AsOfStore 對每個資料來源只抓取一次快照，依觀測日期（抓取當天）版本化存放在本地：
+
+    {root}/{資料種類}/{股票代碼}/{觀測日期}.csv
+
+查詢時選擇觀測日期不早於交易日的最早版本（盡量減少之後才發生的財報重編與股價調整），
+再依各筆資料的公開時間過濾，只返回交易日當天已可見的部分：
+
+- 股價：日期不晚於交易日的 K 線
+- 技術指標：在整份快照上計算一次後快取；stockstats 的指標只依賴過去的價格，
+  因此依日期切片的結果與只用交易日之前的資料計算相同
+- 財報：期末日加上申報延遲（季報 45 天、年報 90 天，可於設定調整）不晚於交易日的各期
+- 內部人士交易：交易日期加上申報延遲（2 天）不晚於交易日的紀錄
+
+第一次回測之後的所有工具呼叫都由本地快照回答，不需要網路。
+注意：yfinance 的調整後股價會依之後的分割與配息回溯調整，快照保留的是抓取當時的調整結果。
+"""
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Annotated, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from .config import get_config
+from .table_encoder import encode_table
+
+# 預設的申報延遲（天）：季報與年報的法定申報期限，以及 Form 4 的申報期限
+DEFAULT_REPORT_LAG_DAYS = {"quarterly": 45, "annual": 90, "insider": 2}
+
+# 財報種類 -> (yfinance 季度屬性, 年度屬性, 輸出標題)
+_STATEMENTS = {
+    "balance_sheet": ("quarterly_balance_sheet", "balance_sheet", "資產負債表數據"),
+    "cashflow": ("quarterly_cashflow", "cashflow", "現金流量數據"),
+    "income_statement": ("quarterly_income_stmt", "income_stmt", "損益表數據"),
+}
+
+
+def _today() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def _shift(date_str: str, days: int) -> str:
+    return (datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def published_statement_columns(data: pd.DataFrame, freq: str, trade_date: str, lag_days: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+    """
+    只保留交易日當天已公開的財報期別。
+
+    Args:
+        data (pd.DataFrame): 以期末日為欄的財報（yfinance 格式）。
+        freq (str): "quarterly" 或 "annual"，決定申報延遲。
+        trade_date (str): 交易日期，格式為 yyyy-mm-dd。
+        lag_days (Optional[Dict[str, int]]): 申報延遲設定，None 時使用預設值。
+
+    Returns:
+        pd.DataFrame: 過濾後的財報。
+    """
+    lag = (lag_days or DEFAULT_REPORT_LAG_DAYS)["quarterly" if freq.lower() == "quarterly" else "annual"]
+    cutoff = pd.Timestamp(trade_date) - pd.Timedelta(days=lag)
+    visible = [column for column in data.columns if pd.Timestamp(column) <= cutoff]
+    return data[visible]
+
+
+class AsOfStore:
+    """以觀測日期版本化的本地快照，依交易日返回當時可見的資料（執行緒安全）。"""
+
+    def __init__(self, root_dir: str, report_lag_days: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            root_dir (str): 快照根目錄。
+            report_lag_days (Optional[Dict[str, int]]): 申報延遲（quarterly、annual、insider），未指定的項目使用預設值。
+        """
+        self.root_dir = Path(root_dir)
+        self.report_lag_days = {**DEFAULT_REPORT_LAG_DAYS, **(report_lag_days or {})}
+        self._lock = threading.Lock()
+        self._fetch_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        # 已載入的快照與已計算的指標序列（以快照路徑為鍵）
+        self._frames: Dict[Path, pd.DataFrame] = {}
+        self._indicators: Dict[Tuple[Path, str], Dict[str, str]] = {}
+
+    # ------------------------------------------------------------------
+    # 快照版本
+    # ------------------------------------------------------------------
+
+    def _snapshot_dir(self, kind: str, symbol: str) -> Path:
+        return self.root_dir / kind / symbol.upper()
+
+    def _find_version(self, kind: str, symbol: str, trade_date: str) -> Optional[Path]:
+        """返回觀測日期不早於交易日的最早版本；交易日在今天之後時以今天為準。"""
+        directory = self._snapshot_dir(kind, symbol)
+        if not directory.exists():
+            return None
+        needed = min(trade_date, _today())
+        versions = sorted(path for path in directory.glob("*.csv") if path.stem >= needed)
+        return versions[0] if versions else None
+
+    def _write_version(self, kind: str, symbol: str, data: pd.DataFrame, index: bool) -> Path:
+        """以今天為觀測日期原子性地寫入新版本。"""
+        directory = self._snapshot_dir(kind, symbol)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{_today()}.csv"
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            data.to_csv(f, index=index)
+        os.replace(tmp_path, path)
+        return path
+
+    def _fetch_lock(self, kind: str, symbol: str) -> threading.Lock:
+        with self._lock:
+            return self._fetch_locks.setdefault((kind, symbol.upper()), threading.Lock())
+
+    def snapshot(
+        self,
+        kind: str,
+        symbol: str,
+        trade_date: str,
+        fetch: Callable[[str], pd.DataFrame],
+        index_col: Optional[int] = 0,
+    ) -> Tuple[Path, pd.DataFrame]:
+        """
+        返回可回答此交易日的快照，沒有時呼叫 fetch 抓取並存為新版本。
+
+        同一資料來源同時只會抓取一次；空的抓取結果不會被存下。
+
+        Args:
+            kind (str): 資料種類，例如 "prices"、"balance_sheet_quarterly"。
+            symbol (str): 股票代碼。
+            trade_date (str): 交易日期，格式為 yyyy-mm-dd。
+            fetch (Callable[[str], pd.DataFrame]): 以股票代碼抓取完整資料的函式。
+            index_col (Optional[int]): 讀回 CSV 時作為索引的欄位。
+
+        Returns:
+            Tuple[Path, pd.DataFrame]: 快照路徑與內容（請勿修改）。
+        """
+        path = self._find_version(kind, symbol, trade_date)
+        if path is None:
+            with self._fetch_lock(kind, symbol):
+                path = self._find_version(kind, symbol, trade_date)
+                if path is None:
+                    data = fetch(symbol.upper())
+                    if data is None or data.empty:
+                        raise ValueError(f"找不到 '{symbol}' 的 {kind} 數據")
+                    path = self._write_version(kind, symbol, data, index=index_col is not None)
+
+        with self._lock:
+            frame = self._frames.get(path)
+        if frame is None:
+            frame = pd.read_csv(path, index_col=index_col)
+            with self._lock:
+                frame = self._frames.setdefault(path, frame)
+        return path, frame
+
+    # ------------------------------------------------------------------
+    # 各資料來源
+    # ------------------------------------------------------------------
+
+    def prices(self, symbol: str, trade_date: str) -> Tuple[Path, pd.DataFrame]:
+        """返回日期不晚於交易日的日 K 線（Date 欄為 yyyy-mm-dd 字串）。"""
+        path, data = self.snapshot("prices", symbol, trade_date, _fetch_prices, index_col=None)
+        return path, data[data["Date"] <= trade_date]
+
+    def indicator_series(self, symbol: str, indicator: str, trade_date: str) -> Dict[str, str]:
+        """
+        返回日期不晚於交易日的指標值（日期 -> 值）。
+        每份快照的每個指標只計算一次。
+        """
+        path, data = self.snapshot("prices", symbol, trade_date, _fetch_prices, index_col=None)
+        key = (path, indicator)
+        with self._lock:
+            series = self._indicators.get(key)
+        if series is None:
+            from stockstats import wrap
+
+            df = wrap(data[["Date", "Open", "High", "Low", "Close", "Volume"]].copy())
+            values = df[indicator]
+            series = {
+                date_str: ("N/A" if pd.isna(value) else str(value))
+                for date_str, value in zip(data["Date"], values)
+            }
+            with self._lock:
+                series = self._indicators.setdefault(key, series)
+        return {date_str: value for date_str, value in series.items() if date_str <= trade_date}
+
+    def statement(self, symbol: str, statement: str, freq: str, trade_date: str) -> pd.DataFrame:
+        """返回交易日當天已公開的財報期別。"""
+        quarterly_attr, annual_attr, _ = _STATEMENTS[statement]
+        quarterly = freq.lower() == "quarterly"
+        attr = quarterly_attr if quarterly else annual_attr
+        _, data = self.snapshot(
+            f"{statement}_{'quarterly' if quarterly else 'annual'}",
+            symbol,
+            trade_date,
+            lambda ticker: getattr(_yf_ticker(ticker), attr),
+        )
+        return published_statement_columns(data, freq, trade_date, self.report_lag_days)
+
+    def insider_transactions(self, symbol: str, trade_date: str) -> pd.DataFrame:
+        """返回交易日當天已申報的內部人士交易。"""
+        _, data = self.snapshot(
+            "insider_transactions",
+            symbol,
+            trade_date,
+            lambda ticker: _yf_ticker(ticker).insider_transactions,
+            index_col=None,
+        )
+        cutoff = _shift(trade_date, -self.report_lag_days["insider"])
+        return data[data["Start Date"].astype(str).str[:10] <= cutoff]
+
+
+def _yf_ticker(symbol: str):
+    import yfinance as yf
+
+    return yf.Ticker(symbol)
+
+
+def _fetch_prices(symbol: str) -> pd.DataFrame:
+    """抓取完整的日 K 線歷史，日期轉為不含時區的 yyyy-mm-dd 字串。"""
+    data = _yf_ticker(symbol).history(period="max", auto_adjust=True, timeout=30)
+    if data.empty:
+        return data
+    if data.index.tz is not None:
+        data.index = data.index.tz_localize(None)
+    data = data.reset_index()
+    data["Date"] = data["Date"].dt.strftime("%Y-%m-%d")
+    return data.round(4)
+
+
+def report_lag_days() -> Dict[str, int]:
+    """返回設定的申報延遲，未設定的項目使用預設值。"""
+    return {**DEFAULT_REPORT_LAG_DAYS, **(get_config().get("asof_report_lag_days") or {})}
+
+
+# 以（快照目錄, 申報延遲）為鍵共用快照庫；設定不同的並行執行各用各的，不會互相重建
+_stores: Dict[Tuple[str, Tuple[Tuple[str, int], ...]], AsOfStore] = {}
+_store_lock = threading.Lock()
+
+
+def get_asof_store() -> AsOfStore:
+    """取得目前設定對應的快照庫；同一組快照目錄與申報延遲設定共用一個實例。"""
+    config = get_config()
+    root_dir = config.get("asof_data_dir") or os.path.join(config["data_cache_dir"], "asof")
+    lag_days = report_lag_days()
+    key = (str(Path(root_dir)), tuple(sorted(lag_days.items())))
+    with _store_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = AsOfStore(root_dir, lag_days)
+        return store
+
+
+# ----------------------------------------------------------------------
+# 供應商實現（與 y_finance 的輸出格式相同）
+# ----------------------------------------------------------------------
+
+
+def get_asof_stock_data(
+    symbol: Annotated[str, "公司的股票代碼"],
+    start_date: Annotated[str, "開始日期，格式為 yyyy-mm-dd"],
+    end_date: Annotated[str, "結束日期，格式為 yyyy-mm-dd"],
+) -> str:
+    """從本地快照返回日期範圍內的股價；end_date 之後的資料不可見。"""
+    _, data = get_asof_store().prices(symbol, end_date)
+    data = data[data["Date"] >= start_date]
+    if data.empty:
+        return f"找不到 '{symbol}' 在 {start_date} 和 {end_date} 之間的數據"
+
+    table_string = encode_table(data, "get_stock_data", time_series=True)
+    header = f"# {symbol.upper()} 從 {start_date} 到 {end_date} 的股票數據\n"
+    header += f"# 總記錄數：{len(data)}\n"
+    header += f"# 數據時間點：{end_date}（本地快照）\n\n"
+    return header + table_string
+
+
+def get_asof_indicators_window(
+    symbol: Annotated[str, "公司的股票代碼"],
+    indicator: Annotated[str, "要獲取分析和報告的技術指標"],
+    curr_date: Annotated[str, "您正在交易的當前交易日期，格式為 YYYY-mm-dd"],
+    look_back_days: Annotated[int, "回溯天數"],
+) -> str:
+    """從本地快照返回 curr_date 之前一段時間內的技術指標。"""
+    from .y_finance import INDICATOR_DESCRIPTIONS
+
+    if indicator not in INDICATOR_DESCRIPTIONS:
+        raise ValueError(
+            f"不支持指標 {indicator}。請從以下選項中選擇：{list(INDICATOR_DESCRIPTIONS.keys())}"
+        )
+
+    series = get_asof_store().indicator_series(symbol, indicator, curr_date)
+    before = _shift(curr_date, -look_back_days)
+    lines = []
+    current = curr_date
+    while current >= before:
+        lines.append(f"{current}: {series.get(current, 'N/A：非交易日 (週末或假日)')}")
+        current = _shift(current, -1)
+
+    return (
+        f"## 從 {before} 到 {curr_date} 的 {indicator} 值：\n\n"
+        + "\n".join(lines)
+        + "\n\n\n"
+        + INDICATOR_DESCRIPTIONS[indicator]
+    )
+
+
+def _statement_report(statement: str, ticker: str, freq: str, curr_date: Optional[str]) -> str:
+    title = _STATEMENTS[statement][2]
+    trade_date = curr_date or _today()
+    data = get_asof_store().statement(ticker, statement, freq, trade_date)
+    if data.empty:
+        return f"找不到 '{ticker}' 在 {trade_date} 之前已公開的{title}"
+
+    header = f"# {ticker.upper()} 的{title} ({freq})\n"
+    header += f"# 數據時間點：{trade_date}（僅含當時已公開的期別）\n\n"
+    return header + encode_table(data, f"get_{statement}", index_label="Item")
+
+
+def get_asof_balance_sheet(
+    ticker: Annotated[str, "公司的股票代碼"],
+    freq: Annotated[str, "數據頻率：'annual' 或 'quarterly'"] = "quarterly",
+    curr_date: Annotated[str, "當前日期，只返回當時已公開的期別"] = None,
+) -> str:
+    """從本地快照返回 curr_date 當天已公開的資產負債表。"""
+    return _statement_report("balance_sheet", ticker, freq, curr_date)
+
+
+def get_asof_cashflow(
+    ticker: Annotated[str, "公司的股票代碼"],
+    freq: Annotated[str, "數據頻率：'annual' 或 'quarterly'"] = "quarterly",
+    curr_date: Annotated[str, "當前日期，只返回當時已公開的期別"] = None,
+) -> str:
+    """從本地快照返回 curr_date 當天已公開的現金流量表。"""
+    return _statement_report("cashflow", ticker, freq, curr_date)
+
+
+def get_asof_income_statement(
+    ticker: Annotated[str, "公司的股票代碼"],
+    freq: Annotated[str, "數據頻率：'annual' 或 'quarterly'"] = "quarterly",
+    curr_date: Annotated[str, "當前日期，只返回當時已公開的期別"] = None,
+) -> str:
+    """從本地快照返回 curr_date 當天已公開的損益表。"""
+    return _statement_report("income_statement", ticker, freq, curr_date)
+
+
+def get_asof_insider_transactions(
+    ticker: Annotated[str, "公司的股票代碼"],
+    curr_date: Annotated[str, "當前日期，只返回當時已申報的交易"] = None,
+) -> str:
+    """從本地快照返回 curr_date 當天已申報的內部人士交易。"""
+    trade_date = curr_date or _today()
+    data = get_asof_store().insider_transactions(ticker, trade_date)
+    if data.empty:
+        return f"找不到 '{ticker}' 在 {trade_date} 之前的內部人士交易數據"
+
+    header = f"# {ticker.upper()} 的內部人士交易數據\n"
+    header += f"# 數據時間點：{trade_date}（本地快照）\n\n"
+    return header + encode_table(data, "get_insider_transactions")
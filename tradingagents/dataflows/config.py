@@ -1,34 +1,131 @@
+import itertools
+import os
+from collections.abc import Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Optional
+
 import tradingagents.default_config as default_config
-from typing import Dict, Optional
 
-# 使用預設設定，但允許被覆寫
-_config: Optional[Dict] = None
 DATA_DIR: Optional[str] = None
 
+# 快照版本號，每建立一個快照遞增
+_versions = itertools.count(1)
+
+
+def _freeze(value: Any) -> Any:
+    """遞迴地把 dict 轉為唯讀映射、list 轉為 tuple。"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """_freeze 的反向操作，返回可修改的深層複本。"""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+class ConfigSnapshot(Mapping):
+    """
+    不可變、帶版本號的設定快照。
+
+    讀取不需要複製；巢狀設定（例如 data_vendors）同樣是唯讀映射。
+    需要修改時以 copy() 取得可修改的 dict，再用 make_snapshot 建立新快照。
+    """
+
+    __slots__ = ("_data", "version")
+
+    def __init__(self, config: Mapping, version: int):
+        self._data = _freeze(config)
+        self.version = version
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def copy(self) -> Dict[str, Any]:
+        """返回可修改的深層複本。"""
+        return _thaw(self._data)
+
+    def __repr__(self) -> str:
+        return f"ConfigSnapshot(version={self.version}, keys={len(self._data)})"
+
+
+# 行程層級的預設快照：不在任何執行中時（例如直接呼叫資料工具）使用
+_global_config: Optional[ConfigSnapshot] = None
+
+# 目前執行的快照；由 use_config 設定，並隨上下文傳遞到 LangGraph 節點與預先抓取的執行緒
+_run_config: ContextVar[Optional[ConfigSnapshot]] = ContextVar("tradingagents_config", default=None)
+
+
+def make_snapshot(config: Mapping) -> ConfigSnapshot:
+    """以預設設定為基礎建立新的快照，config 中的鍵覆寫預設值。"""
+    return ConfigSnapshot({**default_config.DEFAULT_CONFIG, **config}, next(_versions))
+
 
 def initialize_config():
     """使用預設值初始化設定。"""
-    global _config, DATA_DIR
-    if _config is None:
-        _config = default_config.DEFAULT_CONFIG.copy()
-        DATA_DIR = _config["data_dir"]
+    global _global_config, DATA_DIR
+    if _global_config is None:
+        _global_config = make_snapshot({})
+        DATA_DIR = _global_config["data_dir"]
 
 
 def set_config(config: Dict):
-    """使用自訂值更新設定。"""
-    global _config, DATA_DIR
-    if _config is None:
-        _config = default_config.DEFAULT_CONFIG.copy()
-    _config.update(config)
-    DATA_DIR = _config["data_dir"]
+    """
+    使用自訂值更新行程層級的預設設定。
 
+    已在 use_config 區塊中執行的分析使用自己的快照，不受影響。
+    """
+    global _global_config, DATA_DIR
+    initialize_config()
+    _global_config = make_snapshot({**_global_config, **config})
+    DATA_DIR = _global_config["data_dir"]
 
-def get_config() -> Dict:
-    """獲取當前設定。"""
-    if _config is None:
+
+def get_config() -> ConfigSnapshot:
+    """獲取當前設定：執行中的快照優先，否則為行程層級的預設快照。不會複製。"""
+    snapshot = _run_config.get()
+    if snapshot is not None:
+        return snapshot
+    if _global_config is None:
         initialize_config()
-    return _config.copy()
+    return _global_config
+
+
+def get_credential(key: str, env_var: str) -> Optional[str]:
+    """讀取憑證：目前設定中的值優先（每次執行各自的金鑰），未設定時回退到環境變數。"""
+    return get_config().get(key) or os.getenv(env_var)
+
+
+@contextmanager
+def use_config(config: Mapping) -> Iterator[ConfigSnapshot]:
+    """在此區塊內（包含複製了上下文的執行緒）get_config 返回這份設定的快照。"""
+    snapshot = config if isinstance(config, ConfigSnapshot) else make_snapshot(config)
+    token = _run_config.set(snapshot)
+    try:
+        yield snapshot
+    finally:
+        _run_config.reset(token)
 
 
 # 使用預設設定進行初始化
-initialize_config()
\ No newline at end of file
+initialize_config()
@@ -1,6 +1,7 @@
 from typing import Annotated
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
+from .config import get_config
 from .googlenews_utils import getNewsData
 
 
@@ -26,7 +27,7 @@ def get_google_news(
     before = start_date - relativedelta(days=look_back_days)
     before = before.strftime("%Y-%m-%d")
 
-    news_results = getNewsData(query, before, curr_date)
+    news_results = getNewsData(query, before, curr_date, max_results=get_config().get("google_news_max_results"))
 
     news_str = ""
 
@@ -1,17 +1,47 @@
-import json
-import requests
-from bs4 import BeautifulSoup
+import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime
 import time
 import random
+from typing import Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from tenacity import (
     retry,
     stop_after_attempt,
     wait_exponential,
-    retry_if_exception_type,
     retry_if_result,
 )
 
+from tradingagents.utils.client_pool import client_registry
+
+from .config import get_config
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_SEARCH_URL = "https://www.google.com/search"
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/101.0.4951.54 Safari/537.36"
+    )
+}
+
+# 禮貌性限制：同時抓取的頁數、每次查詢最多抓取的頁數，以及每個請求前的小幅隨機延遲
+# 每分鐘請求數由共用限速器控制（設定中的 rate_limits["www.google.com"]）
+MAX_CONCURRENT_PAGES = 2
+MAX_PAGES = 5
+REQUEST_JITTER_SECONDS = (0.2, 0.8)
+
+# 已解析結果的快取：(查詢, 開始日期, 結束日期, 最多頁數, 最多新聞數) -> 新聞列表
+_CACHE_SIZE = 128
+_news_cache: "OrderedDict[Tuple[str, str, str, int, Optional[int]], List[Dict[str, str]]]" = OrderedDict()
+_news_cache_lock = threading.Lock()
+
 
 def is_rate_limited(response):
     """檢查回應是否表示速率限制 (狀態碼 429)"""
@@ -24,85 +54,129 @@ def is_rate_limited(response):
     stop=stop_after_attempt(5),
 )
 def make_request(url, headers):
-    """使用重試邏輯發出請求以處理速率限制"""
-    # 在每個請求前隨機延遲以避免被偵測
-    time.sleep(random.uniform(2, 6))
-    response = requests.get(url, headers=headers)
-    return response
+    """使用共用連線池與限速器發出請求，並以重試邏輯處理速率限制"""
+    client_registry.get_limiter(GOOGLE_SEARCH_URL, None, get_config().get("rate_limits")).acquire()
+    # 在每個請求前加入小幅隨機延遲，避免請求時間過於規律
+    time.sleep(random.uniform(*REQUEST_JITTER_SECONDS))
+    return client_registry.get_session(GOOGLE_SEARCH_URL).get(url, headers=headers)
 
 
-def getNewsData(query, start_date, end_date):
+def parse_news_page(html) -> Tuple[List[Dict[str, str]], bool]:
     """
-    抓取給定查詢和日期範圍的 Google 新聞搜索結果。
-    query: str - 搜索查詢
-    start_date: str - 開始日期，格式為 yyyy-mm-dd 或 mm/dd/yyyy
-    end_date: str - 結束日期，格式為 yyyy-mm-dd 或 mm/dd/yyyy
-    """
-    if "-" in start_date:
-        start_date = datetime.strptime(start_date, "%Y-%m-%d")
-        start_date = start_date.strftime("%m/%d/%Y")
-    if "-" in end_date:
-        end_date = datetime.strptime(end_date, "%Y-%m-%d")
-        end_date = end_date.strftime("%m/%d/%Y")
-
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/101.0.4951.54 Safari/537.36"
-        )
-    }
+    解析一頁 Google 新聞搜索結果。
 
-    news_results = []
-    page = 0
-    while True:
-        offset = page * 10
-        url = (
-            f"https://www.google.com/search?q={query}"
-            f"&tbs=cdr:1,cd_min:{start_date},cd_max:{end_date}"
-            f"&tbm=nws&start={offset}"
-        )
+    Args:
+        html: 頁面的 HTML（str 或 bytes）。
 
+    Returns:
+        Tuple[List[Dict[str, str]], bool]: (此頁的新聞列表, 是否有下一頁)。
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    news_results = []
+    for el in soup.select("div.SoaBEf"):
         try:
-            response = make_request(url, headers)
-            soup = BeautifulSoup(response.content, "html.parser")
-            results_on_page = soup.select("div.SoaBEf")
-
-            if not results_on_page:
-                break  # 找不到更多結果
-
-            for el in results_on_page:
-                try:
-                    link = el.find("a")["href"]
-                    title = el.select_one("div.MBeuO").get_text()
-                    snippet = el.select_one(".GI74Re").get_text()
-                    date = el.select_one(".LfVVr").get_text()
-                    source = el.select_one(".NUnG9d span").get_text()
-                    news_results.append(
-                        {
-                            "link": link,
-                            "title": title,
-                            "snippet": snippet,
-                            "date": date,
-                            "source": source,
-                        }
-                    )
-                except Exception as e:
-                    print(f"處理結果時出錯：{e}")
-                    # 如果找不到其中一個欄位，則跳過此結果
-                    continue
-
-            # 使用當前抓取的結果數量更新進度條
-
-            # 檢查「下一頁」連結 (分頁)
-            next_link = soup.find("a", id="pnnext")
-            if not next_link:
-                break
+            news_results.append(
+                {
+                    "link": el.find("a")["href"],
+                    "title": el.select_one("div.MBeuO").get_text(),
+                    "snippet": el.select_one(".GI74Re").get_text(),
+                    "date": el.select_one(".LfVVr").get_text(),
+                    "source": el.select_one(".NUnG9d span").get_text(),
+                }
+            )
+        except Exception as e:
+            # 如果找不到其中一個欄位，則跳過此結果
+            logger.debug("處理結果時出錯：%s", e)
+            continue
 
-            page += 1
+    # 檢查「下一頁」連結 (分頁)
+    has_next = soup.find("a", id="pnnext") is not None
+    return news_results, has_next
+
+
+def _to_query_date(date_str: str) -> str:
+    """將 yyyy-mm-dd 轉為 Google 搜索使用的 mm/dd/yyyy，其他格式原樣返回。"""
+    if "-" in date_str:
+        return datetime.strptime(date_str, "%Y-%m-%d").strftime("%m/%d/%Y")
+    return date_str
+
+
+def _page_url(query: str, start_date: str, end_date: str, page: int) -> str:
+    return (
+        f"{GOOGLE_SEARCH_URL}?q={query}"
+        f"&tbs=cdr:1,cd_min:{start_date},cd_max:{end_date}"
+        f"&tbm=nws&start={page * 10}"
+    )
+
+
+def _fetch_page(query: str, start_date: str, end_date: str, page: int) -> Optional[Tuple[List[Dict[str, str]], bool]]:
+    """抓取並解析一頁；多次重試後仍失敗或狀態碼不是 200 時返回 None。"""
+    try:
+        response = make_request(_page_url(query, start_date, end_date, page), HEADERS)
+    except Exception as e:
+        logger.warning("多次重試後失敗：%s", e)
+        return None
+    if response.status_code != 200:
+        logger.warning("Google 新聞第 %d 頁返回狀態碼 %d", page, response.status_code)
+        return None
+    return parse_news_page(response.content)
 
-        except Exception as e:
-            print(f"多次重試後失敗：{e}")
-            break
 
-    return news_results
\ No newline at end of file
+def getNewsData(query, start_date, end_date, max_results: Optional[int] = None, max_pages: int = MAX_PAGES):
+    """
+    抓取給定查詢和日期範圍的 Google 新聞搜索結果。
+    query: str - 搜索查詢
+    start_date: str - 開始日期，格式為 yyyy-mm-dd 或 mm/dd/yyyy
+    end_date: str - 結束日期，格式為 yyyy-mm-dd 或 mm/dd/yyyy
+    max_results: Optional[int] - 取得足夠的新聞後提前停止；None 表示抓取到最後一頁或 max_pages 為止
+    max_pages: int - 最多抓取的頁數
+
+    第一頁確認有結果後，其餘頁面以每批 MAX_CONCURRENT_PAGES 頁平行抓取；
+    解析後的結果依 (查詢, 日期範圍, 最多頁數, 最多新聞數) 快取在行程中。
+    """
+    start_date = _to_query_date(start_date)
+    end_date = _to_query_date(end_date)
+
+    cache_key = (query, start_date, end_date, max_pages, max_results)
+    with _news_cache_lock:
+        cached = _news_cache.get(cache_key)
+        if cached is not None:
+            _news_cache.move_to_end(cache_key)
+    if cached is not None:
+        return list(cached[:max_results] if max_results else cached)
+
+    first_page = _fetch_page(query, start_date, end_date, 0)
+    if first_page is None:
+        return []
+    news_results, has_next = first_page
+    # 中途失敗的結果不快取；第一頁沒有結果（可能是同意頁面或「異常流量」頁面）也不快取，之後的查詢會重新抓取
+    complete = bool(news_results)
+    page = 1
+    # 複製上下文：頁面抓取在本次執行的設定（限速）、剖析與日誌欄位下進行
+    with ContextThreadPoolExecutor(max_workers=MAX_CONCURRENT_PAGES) as executor:
+        while has_next and news_results and page < max_pages:
+            if max_results is not None and len(news_results) >= max_results:
+                break
+            batch = range(page, min(page + MAX_CONCURRENT_PAGES, max_pages))
+            pages = list(executor.map(lambda p: _fetch_page(query, start_date, end_date, p), batch))
+            # 依頁碼順序合併，遇到失敗、空白頁或最後一頁即停止
+            for fetched in pages:
+                if fetched is None:
+                    complete = has_next = False
+                    break
+                page_results, has_next = fetched
+                if not page_results:
+                    has_next = False
+                    break
+                news_results.extend(page_results)
+                if not has_next:
+                    break
+            page += len(batch)
+
+    if complete:
+        with _news_cache_lock:
+            _news_cache[cache_key] = news_results
+            _news_cache.move_to_end(cache_key)
+            while len(_news_cache) > _CACHE_SIZE:
+                _news_cache.popitem(last=False)
+    return list(news_results[:max_results] if max_results else news_results)
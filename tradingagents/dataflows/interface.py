@@ -1,24 +1,18 @@
+import importlib
+import logging
+import time
+from functools import lru_cache
 from typing import Annotated
 
-# 從特定供應商的模組匯入
-from .local import get_YFin_data, get_finnhub_news, get_finnhub_company_insider_sentiment, get_finnhub_company_insider_transactions, get_simfin_balance_sheet, get_simfin_cashflow, get_simfin_income_statements, get_reddit_global_news, get_reddit_company_news
-from .y_finance import get_YFin_data_online, get_stock_stats_indicators_window, get_balance_sheet as get_yfinance_balance_sheet, get_cashflow as get_yfinance_cashflow, get_income_statement as get_yfinance_income_statement, get_insider_transactions as get_yfinance_insider_transactions
-from .google import get_google_news
-from .openai import get_stock_news_openai, get_global_news_openai, get_fundamentals_openai
-from .alpha_vantage import (
-    get_stock as get_alpha_vantage_stock,
-    get_indicator as get_alpha_vantage_indicator,
-    get_fundamentals as get_alpha_vantage_fundamentals,
-    get_balance_sheet as get_alpha_vantage_balance_sheet,
-    get_cashflow as get_alpha_vantage_cashflow,
-    get_income_statement as get_alpha_vantage_income_statement,
-    get_insider_transactions as get_alpha_vantage_insider_transactions,
-    get_news as get_alpha_vantage_news
-)
+# 供應商模組在第一次使用時才匯入（yfinance、polars、stockstats、BeautifulSoup 等相依套件較重）
 from .alpha_vantage_common import AlphaVantageRateLimitError
 
 # 設定和路由邏輯
 from .config import get_config
+from tradingagents.utils.instrumentation import get_current_profile
+from tradingagents.utils.logging_utils import log_fields
+
+logger = logging.getLogger(__name__)
 
 # 按類別組織的工具
 TOOLS_CATEGORIES = {
@@ -58,64 +52,82 @@ VENDOR_LIST = [
     "local",
     "yfinance",
     "openai",
-    "google"
+    "google",
+    "asof",
 ]
 
-# 方法與其特定供應商實現的映射
+# 時間點（asof）供應商：只在明確設定時使用，不加入其他供應商的自動備援；
+# 設定為主要供應商時也不自動備援至即時供應商（即時資料會造成回測的未來資料洩漏）
+POINT_IN_TIME_VENDORS = {"asof"}
+
+# 方法與其特定供應商實現的映射（"模組:函式"，由 load_vendor_impl 在第一次使用時匯入）
 VENDOR_METHODS = {
     # 核心股票 API
     "get_stock_data": {
-        "alpha_vantage": get_alpha_vantage_stock,
-        "yfinance": get_YFin_data_online,
-        "local": get_YFin_data,
+        "alpha_vantage": ".alpha_vantage:get_stock",
+        "yfinance": ".y_finance:get_YFin_data_online",
+        "local": ".local:get_YFin_data",
+        "asof": ".asof_store:get_asof_stock_data",
     },
     # 技術指標
     "get_indicators": {
-        "alpha_vantage": get_alpha_vantage_indicator,
-        "yfinance": get_stock_stats_indicators_window,
-        "local": get_stock_stats_indicators_window
+        "alpha_vantage": ".alpha_vantage:get_indicator",
+        "yfinance": ".y_finance:get_stock_stats_indicators_window",
+        "local": ".y_finance:get_stock_stats_indicators_window",
+        "asof": ".asof_store:get_asof_indicators_window",
     },
     # 基本面數據
     "get_fundamentals": {
-        "alpha_vantage": get_alpha_vantage_fundamentals,
-        "openai": get_fundamentals_openai,
+        "alpha_vantage": ".alpha_vantage:get_fundamentals",
+        "openai": ".openai:get_fundamentals_openai",
     },
     "get_balance_sheet": {
-        "alpha_vantage": get_alpha_vantage_balance_sheet,
-        "yfinance": get_yfinance_balance_sheet,
-        "local": get_simfin_balance_sheet,
+        "alpha_vantage": ".alpha_vantage:get_balance_sheet",
+        "yfinance": ".y_finance:get_balance_sheet",
+        "local": ".local:get_simfin_balance_sheet",
+        "asof": ".asof_store:get_asof_balance_sheet",
     },
     "get_cashflow": {
-        "alpha_vantage": get_alpha_vantage_cashflow,
-        "yfinance": get_yfinance_cashflow,
-        "local": get_simfin_cashflow,
+        "alpha_vantage": ".alpha_vantage:get_cashflow",
+        "yfinance": ".y_finance:get_cashflow",
+        "local": ".local:get_simfin_cashflow",
+        "asof": ".asof_store:get_asof_cashflow",
     },
     "get_income_statement": {
-        "alpha_vantage": get_alpha_vantage_income_statement,
-        "yfinance": get_yfinance_income_statement,
-        "local": get_simfin_income_statements,
+        "alpha_vantage": ".alpha_vantage:get_income_statement",
+        "yfinance": ".y_finance:get_income_statement",
+        "local": ".local:get_simfin_income_statements",
+        "asof": ".asof_store:get_asof_income_statement",
     },
     # 新聞數據
     "get_news": {
-        "alpha_vantage": get_alpha_vantage_news,
-        "openai": get_stock_news_openai,
-        "google": get_google_news,
-        "local": [get_finnhub_news, get_reddit_company_news, get_google_news],
+        "alpha_vantage": ".alpha_vantage:get_news",
+        "openai": ".openai:get_stock_news_openai",
+        "google": ".google:get_google_news",
+        "local": [".local:get_finnhub_news", ".local:get_reddit_company_news", ".google:get_google_news"],
     },
     "get_global_news": {
-        "openai": get_global_news_openai,
-        "local": get_reddit_global_news
+        "openai": ".openai:get_global_news_openai",
+        "local": ".local:get_reddit_global_news"
     },
     "get_insider_sentiment": {
-        "local": get_finnhub_company_insider_sentiment
+        "local": ".local:get_finnhub_company_insider_sentiment"
     },
     "get_insider_transactions": {
-        "alpha_vantage": get_alpha_vantage_insider_transactions,
-        "yfinance": get_yfinance_insider_transactions,
-        "local": get_finnhub_company_insider_transactions,
+        "alpha_vantage": ".alpha_vantage:get_insider_transactions",
+        "yfinance": ".y_finance:get_insider_transactions",
+        "local": ".local:get_finnhub_company_insider_transactions",
+        "asof": ".asof_store:get_asof_insider_transactions",
     },
 }
 
+@lru_cache(maxsize=None)
+def load_vendor_impl(ref: str):
+    """匯入並返回 VENDOR_METHODS 中 "模組:函式" 參照的供應商實現。"""
+    module_name, attr = ref.split(":")
+    module = importlib.import_module(module_name, package=__package__)
+    return getattr(module, attr)
+
 def get_category_for_method(method: str) -> str:
     """獲取包含指定方法的類別。"""
     for category, info in TOOLS_CATEGORIES.items():
@@ -139,8 +151,19 @@ def get_vendor(category: str, method: str = None) -> str:
     # 回退到類別級別的設定
     return config.get("data_vendors", {}).get(category, "default")
 
+def _record_vendor_call(method: str, vendor: str, started: float, error: bool = False):
+    """將一次供應商呼叫的延遲回報給目前執行的剖析（若有）。"""
+    profile = get_current_profile()
+    if profile is not None:
+        profile.record_vendor(method, vendor, time.perf_counter() - started, error=error)
+
 def route_to_vendor(method: str, *args, **kwargs):
     """將方法調用路由到具有備援支援的適當供應商實現。"""
+    # 路由與供應商實作中的日誌都帶上 tool 欄位
+    with log_fields(tool=method):
+        return _route_to_vendor(method, *args, **kwargs)
+
+def _route_to_vendor(method: str, *args, **kwargs):
     category = get_category_for_method(method)
     vendor_config = get_vendor(category, method)
 
@@ -154,15 +177,15 @@ def route_to_vendor(method: str, *args, **kwargs):
     all_available_vendors = list(VENDOR_METHODS[method].keys())
     
     # 建立備援供應商列表：主要供應商優先，然後是其餘供應商作為備援
+    # 時間點供應商不作為備援；主要供應商包含時間點供應商時則完全不自動備援
     fallback_vendors = primary_vendors.copy()
-    for vendor in all_available_vendors:
-        if vendor not in fallback_vendors:
-            fallback_vendors.append(vendor)
+    if not POINT_IN_TIME_VENDORS.intersection(primary_vendors):
+        for vendor in all_available_vendors:
+            if vendor not in fallback_vendors and vendor not in POINT_IN_TIME_VENDORS:
+                fallback_vendors.append(vendor)
 
-    # 調試：打印備援順序
-    primary_str = " → ".join(primary_vendors)
-    fallback_str = " → ".join(fallback_vendors)
-    print(f"調試：{method} - 主要：[{primary_str}] | 完整備援順序：[{fallback_str}]")
+    # 路由的逐步訊息使用 DEBUG 等級與延遲格式化，預設等級下不產生任何輸出成本
+    logger.debug("主要：[%s] | 完整備援順序：[%s]", " → ".join(primary_vendors), " → ".join(fallback_vendors))
 
     # 追蹤結果和執行狀態
     results = []
@@ -173,7 +196,7 @@ def route_to_vendor(method: str, *args, **kwargs):
     for vendor in fallback_vendors:
         if vendor not in VENDOR_METHODS[method]:
             if vendor in primary_vendors:
-                print(f"資訊：方法 '{method}' 不支援供應商 '{vendor}'，將備援至下一個供應商")
+                logger.info("方法 '%s' 不支援供應商 '%s'，將備援至下一個供應商", method, vendor, extra={"vendor": vendor})
             continue
 
         vendor_impl = VENDOR_METHODS[method][vendor]
@@ -184,61 +207,75 @@ def route_to_vendor(method: str, *args, **kwargs):
         if is_primary_vendor:
             any_primary_vendor_attempted = True
 
-        # 調試：打印當前嘗試
-        vendor_type = "主要" if is_primary_vendor else "備援"
-        print(f"調試：正在為 {method} 嘗試 {vendor_type} 供應商 '{vendor}' (第 {vendor_attempt_count} 次嘗試)")
+        logger.debug(
+            "正在嘗試%s供應商 '%s' (第 %d 次嘗試)",
+            "主要" if is_primary_vendor else "備援", vendor, vendor_attempt_count,
+            extra={"vendor": vendor, "attempt": vendor_attempt_count},
+        )
 
         # 處理供應商的方法列表
-        if isinstance(vendor_impl, list):
-            vendor_methods = [(impl, vendor) for impl in vendor_impl]
-            print(f"調試：供應商 '{vendor}' 有多個實現：{len(vendor_methods)} 個函式")
-        else:
-            vendor_methods = [(vendor_impl, vendor)]
+        vendor_refs = vendor_impl if isinstance(vendor_impl, list) else [vendor_impl]
+        if len(vendor_refs) > 1:
+            logger.debug("供應商 '%s' 有多個實現：%d 個函式", vendor, len(vendor_refs), extra={"vendor": vendor})
+
+        # 第一次使用時匯入供應商模組；缺少相依套件時視為此供應商失敗並備援
+        vendor_methods = []
+        for ref in vendor_refs:
+            try:
+                vendor_methods.append((load_vendor_impl(ref), vendor))
+            except ImportError as e:
+                logger.warning("無法載入供應商 '%s' 的實現 %s：%s", vendor, ref, e, extra={"vendor": vendor})
 
         # 運行此供應商的方法
         vendor_results = []
         for impl_func, vendor_name in vendor_methods:
             try:
-                print(f"調試：正在從供應商 '{vendor_name}' 調用 {impl_func.__name__}...")
-                
+                logger.debug("正在從供應商 '%s' 調用 %s", vendor_name, impl_func.__name__, extra={"vendor": vendor_name})
+
                 # 執行函數（已由各供應商內部處理timeout）
-                result = impl_func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    result = impl_func(*args, **kwargs)
+                except Exception:
+                    _record_vendor_call(method, vendor_name, started, error=True)
+                    raise
+                _record_vendor_call(method, vendor_name, started)
                 vendor_results.append(result)
-                print(f"成功：來自供應商 '{vendor_name}' 的 {impl_func.__name__} 成功完成")
-                    
+                logger.debug("來自供應商 '%s' 的 %s 成功完成", vendor_name, impl_func.__name__, extra={"vendor": vendor_name})
+
             except AlphaVantageRateLimitError as e:
                 if vendor == "alpha_vantage":
-                    print(f"速率限制：超過 Alpha Vantage 速率限制，將備援至下一個可用供應商")
-                    print(f"調試：速率限制詳細資訊：{e}")
+                    logger.warning("超過 Alpha Vantage 速率限制，將備援至下一個可用供應商：%s", e, extra={"vendor": vendor})
                 # 繼續到下一個供應商進行備援
                 continue
             except Exception as e:
                 # 記錄詳細錯誤但繼續其他實現
-                error_type = type(e).__name__
-                print(f"失敗：來自供應商 '{vendor_name}' 的 {impl_func.__name__} 失敗 ({error_type}): {e}")
+                logger.warning(
+                    "來自供應商 '%s' 的 %s 失敗 (%s): %s", vendor_name, impl_func.__name__, type(e).__name__, e,
+                    extra={"vendor": vendor_name},
+                )
                 continue
 
         # 新增此供應商的結果
         if vendor_results:
             results.extend(vendor_results)
             successful_vendor = vendor
-            result_summary = f"獲得 {len(vendor_results)} 個結果"
-            print(f"成功：供應商 '{vendor}' 成功 - {result_summary}")
-            
+            logger.debug("供應商 '%s' 成功 - 獲得 %d 個結果", vendor, len(vendor_results), extra={"vendor": vendor})
+
             # 停止邏輯：對於單一供應商設定，在第一個成功的供應商後停止
             # 多供應商設定 (以逗號分隔) 可能希望從多個來源收集
             if len(primary_vendors) == 1:
-                print(f"調試：在成功的供應商 '{vendor}' 後停止 (單一供應商設定)")
+                logger.debug("在成功的供應商 '%s' 後停止 (單一供應商設定)", vendor, extra={"vendor": vendor})
                 break
         else:
-            print(f"失敗：供應商 '{vendor}' 未產生任何結果")
+            logger.warning("供應商 '%s' 未產生任何結果", vendor, extra={"vendor": vendor})
 
     # 最終結果摘要
     if not results:
-        print(f"失敗：方法 '{method}' 的所有 {vendor_attempt_count} 次供應商嘗試均失敗")
+        logger.error("方法 '%s' 的所有 %d 次供應商嘗試均失敗", method, vendor_attempt_count)
         raise RuntimeError(f"方法 '{method}' 的所有供應商實現均失敗")
     else:
-        print(f"最終：方法 '{method}' 在 {vendor_attempt_count} 次供應商嘗試後，以 {len(results)} 個結果完成")
+        logger.debug("方法 '%s' 在 %d 次供應商嘗試後，以 %d 個結果完成", method, vendor_attempt_count, len(results))
 
     # 如果只有一個結果，則返回單個結果，否則連接為字串
     if len(results) == 1:
@@ -1,12 +1,15 @@
 from typing import Annotated
 import polars as pl
 import os
-from .config import DATA_DIR
+from .config import get_config
+from .table_encoder import encode_table
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import json
+import logging
 from .reddit_utils import fetch_top_from_category
-from tqdm import tqdm
+
+logger = logging.getLogger(__name__)
 
 def get_YFin_data_window(
     symbol: Annotated[str, "公司的股票代碼"],
@@ -32,7 +35,7 @@ def get_YFin_data_window(
     # 讀取數據
     data = pl.read_csv(
         os.path.join(
-            DATA_DIR,
+            get_config()["data_dir"],
             f"market_data/price_data/{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
         )
     )
@@ -50,8 +53,8 @@ def get_YFin_data_window(
     # 刪除我們創建的臨時欄位
     filtered_data = filtered_data.drop("DateOnly")
 
-    # polars 的字串輸出
-    df_string = str(filtered_data)
+    # 編碼為精簡表格，取代 polars 的對齊字串輸出
+    df_string = encode_table(filtered_data, "get_YFin_data_window", time_series=True)
 
     return (
         f"## {symbol} 從 {start_date} 到 {curr_date} 的原始市場數據：\n\n"
@@ -72,12 +75,12 @@ def get_YFin_data(
         end_date (str): 結束日期，格式為 yyyy-mm-dd。
 
     Returns:
-        pd.DataFrame: 包含過濾後數據的 DataFrame。
+        str: 包含過濾後數據的精簡表格字串。
     """
     # 讀取數據
     data = pl.read_csv(
         os.path.join(
-            DATA_DIR,
+            get_config()["data_dir"],
             f"market_data/price_data/{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
         )
     )
@@ -100,10 +103,11 @@ def get_YFin_data(
     # 刪除我們創建的臨時欄位
     filtered_data = filtered_data.drop("DateOnly")
 
-    # 重置索引 (在 polars 中不需要，但保持一致性)
-    # filtered_data = filtered_data.with_row_count(name="index", offset=0)
-
-    return filtered_data
+    # 作為 get_stock_data 的 local 供應商，編碼為與其他供應商一致的精簡表格
+    return (
+        f"## {symbol} 從 {start_date} 到 {end_date} 的原始市場數據：\n\n"
+        + encode_table(filtered_data, "get_stock_data", time_series=True)
+    )
 
 def get_finnhub_news(
     query: Annotated[str, "搜索查詢或股票代碼"],
@@ -122,7 +126,7 @@ def get_finnhub_news(
 
     """
 
-    result = get_data_in_range(query, start_date, end_date, "news_data", DATA_DIR)
+    result = get_data_in_range(query, start_date, end_date, "news_data", get_config()["data_dir"])
 
     if len(result) == 0:
         return ""
@@ -174,7 +178,7 @@ def get_finnhub_company_insider_sentiment(
     before = date_obj - relativedelta(days=15)  # 預設回溯 15 天
     before = before.strftime("%Y-%m-%d")
 
-    data = get_data_in_range(ticker, before, curr_date, "insider_senti", DATA_DIR)
+    data = get_data_in_range(ticker, before, curr_date, "insider_senti", get_config()["data_dir"])
 
     if len(data) == 0:
         return ""
@@ -211,7 +215,7 @@ def get_finnhub_company_insider_transactions(
     before = date_obj - relativedelta(days=15)  # 預設回溯 15 天
     before = before.strftime("%Y-%m-%d")
 
-    data = get_data_in_range(ticker, before, curr_date, "insider_trans", DATA_DIR)
+    data = get_data_in_range(ticker, before, curr_date, "insider_trans", get_config()["data_dir"])
 
     if len(data) == 0:
         return ""
@@ -273,7 +277,7 @@ def get_simfin_balance_sheet(
     curr_date: Annotated[str, "您正在交易的當前日期，格式為 yyyy-mm-dd"],
 ):
     data_path = os.path.join(
-        DATA_DIR,
+        get_config()["data_dir"],
         "fundamental_data",
         "simfin_data_all",
         "balance_sheet",
@@ -300,7 +304,7 @@ def get_simfin_balance_sheet(
 
     # 檢查是否有可用的報告；如果沒有，則返回通知
     if filtered_df.is_empty():
-        print("在給定的當前日期之前沒有可用的資產負債表。")
+        logger.info("%s 在 %s 之前沒有可用的資產負債表", ticker, curr_date)
         return ""
 
     # 通過選擇具有最新發布日期的行來獲取最新的資產負債表
@@ -326,7 +330,7 @@ def get_simfin_cashflow(
     curr_date: Annotated[str, "您正在交易的當前日期，格式為 yyyy-mm-dd"],
 ):
     data_path = os.path.join(
-        DATA_DIR,
+        get_config()["data_dir"],
         "fundamental_data",
         "simfin_data_all",
         "cash_flow",
@@ -353,7 +357,7 @@ def get_simfin_cashflow(
 
     # 檢查是否有可用的報告；如果沒有，則返回通知
     if filtered_df.is_empty():
-        print("在給定的當前日期之前沒有可用的現金流量表。")
+        logger.info("%s 在 %s 之前沒有可用的現金流量表", ticker, curr_date)
         return ""
 
     # 通過選擇具有最新發布日期的行來獲取最新的現金流量表
@@ -379,7 +383,7 @@ def get_simfin_income_statements(
     curr_date: Annotated[str, "您正在交易的當前日期，格式為 yyyy-mm-dd"],
 ):
     data_path = os.path.join(
-        DATA_DIR,
+        get_config()["data_dir"],
         "fundamental_data",
         "simfin_data_all",
         "income_statements",
@@ -406,7 +410,7 @@ def get_simfin_income_statements(
 
     # 檢查是否有可用的報告；如果沒有，則返回通知
     if filtered_df.is_empty():
-        print("在給定的當前日期之前沒有可用的損益表。")
+        logger.info("%s 在 %s 之前沒有可用的損益表", ticker, curr_date)
         return ""
 
     # 通過選擇具有最新發布日期的行來獲取最新的損益表
@@ -439,15 +443,15 @@ def get_reddit_global_news(
     """
     
     # 檢查數據目錄是否存在
-    reddit_data_path = os.path.join(DATA_DIR, "reddit_data")
+    reddit_data_path = os.path.join(get_config()["data_dir"], "reddit_data")
     global_news_path = os.path.join(reddit_data_path, "global_news")
     
     if not os.path.exists(reddit_data_path):
-        print(f"警告：Reddit 數據目錄不存在: {reddit_data_path}。請確保數據目錄已正確設置。")
+        logger.warning("Reddit 數據目錄不存在: %s。請確保數據目錄已正確設置。", reddit_data_path)
         return ""
     
     if not os.path.exists(global_news_path):
-        print(f"警告：全球新聞數據目錄不存在: {global_news_path}。請確保已下載 Reddit 全球新聞數據。")
+        logger.warning("全球新聞數據目錄不存在: %s。請確保已下載 Reddit 全球新聞數據。", global_news_path)
         return ""
 
     curr_date_dt = datetime.strptime(curr_date, "%Y-%m-%d")
@@ -458,9 +462,7 @@ def get_reddit_global_news(
     # 從 before 到 curr_date 迭代
     curr_iter_date = datetime.strptime(before, "%Y-%m-%d")
 
-    total_iterations = (curr_date_dt - curr_iter_date).days + 1
-    pbar = tqdm(desc=f"正在獲取 {curr_date} 的全球新聞", total=total_iterations)
-
+    logger.debug("正在獲取 %s 到 %s 的全球新聞", before, curr_date)
     while curr_iter_date <= curr_date_dt:
         curr_date_str = curr_iter_date.strftime("%Y-%m-%d")
         try:
@@ -473,11 +475,8 @@ def get_reddit_global_news(
             posts.extend(fetch_result)
         except (FileNotFoundError, ValueError) as e:
             # 如果特定日期的數據不存在，繼續下一天
-            print(f"警告：無法獲取 {curr_date_str} 的數據: {e}")
+            logger.debug("無法獲取 %s 的數據: %s", curr_date_str, e)
         curr_iter_date += relativedelta(days=1)
-        pbar.update(1)
-
-    pbar.close()
 
     if len(posts) == 0:
         return ""
@@ -508,15 +507,15 @@ def get_reddit_company_news(
     """
     
     # 檢查數據目錄是否存在
-    reddit_data_path = os.path.join(DATA_DIR, "reddit_data")
+    reddit_data_path = os.path.join(get_config()["data_dir"], "reddit_data")
     company_news_path = os.path.join(reddit_data_path, "company_news")
     
     if not os.path.exists(reddit_data_path):
-        print(f"警告：Reddit 數據目錄不存在: {reddit_data_path}。請確保數據目錄已正確設置。")
+        logger.warning("Reddit 數據目錄不存在: %s。請確保數據目錄已正確設置。", reddit_data_path)
         return ""
     
     if not os.path.exists(company_news_path):
-        print(f"警告：公司新聞數據目錄不存在: {company_news_path}。請確保已下載 Reddit 公司新聞數據。")
+        logger.warning("公司新聞數據目錄不存在: %s。請確保已下載 Reddit 公司新聞數據。", company_news_path)
         return ""
 
     start_date_dt = datetime.strptime(start_date, "%Y-%m-%d")
@@ -526,11 +525,7 @@ def get_reddit_company_news(
     # 從 start_date 到 end_date 迭代
     curr_date = start_date_dt
 
-    total_iterations = (end_date_dt - curr_date).days + 1
-    pbar = tqdm(
-        desc=f"正在獲取 {query} 從 {start_date} 到 {end_date} 的公司新聞",
-        total=total_iterations,
-    )
+    logger.debug("正在獲取 %s 從 %s 到 %s 的公司新聞", query, start_date, end_date)
 
     # 限制每天的文章數量以避免 token 過多
     max_per_day = 5  # 從 10 降低到 5
@@ -548,13 +543,9 @@ def get_reddit_company_news(
             posts.extend(fetch_result)
         except (FileNotFoundError, ValueError) as e:
             # 如果特定日期的數據不存在，繼續下一天
-            print(f"警告：無法獲取 {curr_date_str} 的數據: {e}")
+            logger.debug("無法獲取 %s 的數據: %s", curr_date_str, e)
         curr_date += relativedelta(days=1)
 
-        pbar.update(1)
-
-    pbar.close()
-
     if len(posts) == 0:
         return ""
 
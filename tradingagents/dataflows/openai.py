@@ -1,6 +1,5 @@
-import os
-from openai import OpenAI
-from .config import get_config
+from .config import get_config, get_credential
+from tradingagents.utils.client_pool import client_registry
 
 
 def get_stock_news_openai(query, start_date, end_date):
@@ -16,9 +15,11 @@ def get_stock_news_openai(query, start_date, end_date):
         str: 模型的文字回應。
     """
     config = get_config()
-    # Get the OpenAI API key from environment variable
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    client = OpenAI(base_url=config["backend_url"], api_key=openai_api_key)
+    # 本次執行設定中的金鑰優先，否則使用環境變數 OPENAI_API_KEY
+    openai_api_key = get_credential("openai_api_key", "OPENAI_API_KEY")
+    client = client_registry.get_openai_client(config["backend_url"], openai_api_key)
+    limiter = client_registry.get_limiter(config["backend_url"], openai_api_key, config.get("rate_limits"))
+    limiter.acquire()
 
     response = client.responses.create(
         model=config["quick_think_llm"],
@@ -48,6 +49,7 @@ def get_stock_news_openai(query, start_date, end_date):
         store=True,
     )
 
+    limiter.record_usage(response.usage.total_tokens if response.usage else 0)
     return response.output[1].content[0].text
 
 
@@ -64,9 +66,11 @@ def get_global_news_openai(curr_date, look_back_days=7, limit=5):
         str: 模型的文字回應。
     """
     config = get_config()
-    # Get the OpenAI API key from environment variable
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    client = OpenAI(base_url=config["backend_url"], api_key=openai_api_key)
+    # 本次執行設定中的金鑰優先，否則使用環境變數 OPENAI_API_KEY
+    openai_api_key = get_credential("openai_api_key", "OPENAI_API_KEY")
+    client = client_registry.get_openai_client(config["backend_url"], openai_api_key)
+    limiter = client_registry.get_limiter(config["backend_url"], openai_api_key, config.get("rate_limits"))
+    limiter.acquire()
 
     response = client.responses.create(
         model=config["quick_think_llm"],
@@ -96,6 +100,7 @@ def get_global_news_openai(curr_date, look_back_days=7, limit=5):
         store=True,
     )
 
+    limiter.record_usage(response.usage.total_tokens if response.usage else 0)
     return response.output[1].content[0].text
 
 
@@ -111,9 +116,11 @@ def get_fundamentals_openai(ticker, curr_date):
         str: 模型的文字回應。
     """
     config = get_config()
-    # Get the OpenAI API key from environment variable
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    client = OpenAI(base_url=config["backend_url"], api_key=openai_api_key)
+    # 本次執行設定中的金鑰優先，否則使用環境變數 OPENAI_API_KEY
+    openai_api_key = get_credential("openai_api_key", "OPENAI_API_KEY")
+    client = client_registry.get_openai_client(config["backend_url"], openai_api_key)
+    limiter = client_registry.get_limiter(config["backend_url"], openai_api_key, config.get("rate_limits"))
+    limiter.acquire()
 
     response = client.responses.create(
         model=config["quick_think_llm"],
@@ -143,4 +150,5 @@ def get_fundamentals_openai(ticker, curr_date):
         store=True,
     )
 
+    limiter.record_usage(response.usage.total_tokens if response.usage else 0)
     return response.output[1].content[0].text
@@ -3,7 +3,7 @@ import yfinance as yf
 from stockstats import wrap
 from typing import Annotated
 import os
-from .config import get_config, DATA_DIR
+from .config import get_config
 
 
 class StockstatsUtils:
@@ -45,7 +45,7 @@ class StockstatsUtils:
             try:
                 data = pl.read_csv(
                     os.path.join(
-                        DATA_DIR,
+                        config["data_dir"],
                         f"{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
                     )
                 )
@@ -0,0 +1,242 @@
+"""
+表格型工具輸出的精簡編碼
+
+股價、財報與內部人士交易等工具原本以 CSV 或 DataFrame 字串返回，浮點數的位數、
+重複的欄位名稱與對齊空白都會增加提示 token。這裡把所有表格型輸出統一編碼為：
+
+- toon：TOON 表格陣列，欄位名稱只出現一次（預設）
+- columnar：每個欄位一行，適合逐欄閱讀的長時間序列
+- csv：一般 CSV
+
+並統一數值精度、省略全空的列，時間序列可均勻降採樣到指定列數。
+量測模式會同時產生原本的 CSV 輸出，並在 run_profile["tables"] 記錄每個工具的 token 節省。
+"""
+import csv
+import io
+import math
+import numbers
+import re
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from .config import get_config
+
+TABLE_FORMATS = ("toon", "columnar", "csv")
+
+# TOON 中不需加引號的欄位名稱
+_TOON_BARE_KEY = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]*$")
+# TOON 字串值中需要加引號的字元
+_TOON_SPECIAL = set(',:"\\[]{}\n\r\t')
+_NUMERIC_LIKE = re.compile(r"^-?\d+(\.\d+)?([eE][+-]?\d+)?$")
+
+
+def _is_missing(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return True
+    # pandas 的 NaT / NA
+    return type(value).__name__ in ("NaTType", "NAType")
+
+
+def _format_number(value: Any, precision: int) -> str:
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+    value = float(value)
+    if math.isinf(value):
+        return "inf" if value > 0 else "-inf"
+    # 整數值與百萬以上的金額（財報科目）不需要小數
+    if (value.is_integer() or abs(value) >= 1e6) and abs(value) < 1e15:
+        return str(round(value))
+    decimals = precision
+    if 0 < abs(value) < 1:
+        # 小於 1 的比率與每股數值保留 precision 位有效數字，避免 0.004 之類的值被捨入成 0
+        decimals = min(max(precision, precision - 1 - math.floor(math.log10(abs(value)))), 15)
+    text = f"{value:.{decimals}f}".rstrip("0").rstrip(".")
+    return "0" if text in ("", "-0") else text
+
+
+def _format_value(value: Any, precision: int) -> Optional[str]:
+    """將單一儲存格轉為字串；缺值返回 None。"""
+    if _is_missing(value):
+        return None
+    if isinstance(value, numbers.Number):
+        return _format_number(value, precision)
+    if isinstance(value, datetime):
+        if (value.hour, value.minute, value.second, value.microsecond) == (0, 0, 0, 0):
+            return value.strftime("%Y-%m-%d")
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value)
+    if text == "":
+        return None
+    # CSV 文字輸入的數值欄位以字串讀入，同樣套用精度
+    if _NUMERIC_LIKE.match(text):
+        return _format_number(float(text) if any(c in text for c in ".eE") else int(text), precision)
+    return text
+
+
+def _table_rows(data: Any, index_label: Optional[str]) -> Tuple[List[str], List[List[Any]]]:
+    """
+    把 pandas / polars DataFrame 或 CSV 字串轉為 (欄位名稱, 資料列)。
+    pandas 的有意義索引（非預設的 RangeIndex）會成為第一欄。
+    """
+    if isinstance(data, str):
+        reader = csv.reader(io.StringIO(data.strip()))
+        rows = [row for row in reader if row]
+        if not rows:
+            return [], []
+        columns = list(rows[0])
+        if index_label and columns and not columns[0]:
+            columns[0] = index_label
+        return columns, [list(row) for row in rows[1:]]
+
+    if hasattr(data, "iter_rows"):  # polars
+        return list(data.columns), [list(row) for row in data.iter_rows()]
+
+    # 財報的欄位是期末日（Timestamp），轉為日期字串
+    columns = [_format_value(column, 0) or "" for column in data.columns]
+    values = data.values.tolist()
+    if type(data.index).__name__ == "RangeIndex" and data.index.name is None:
+        return columns, values
+    label = index_label or data.index.name or "index"
+    return [str(label)] + columns, [[key] + row for key, row in zip(data.index.tolist(), values)]
+
+
+def _downsample(rows: List[Any], max_rows: int) -> List[Any]:
+    """均勻取 max_rows 列，保留第一列與最後一列（最新的資料）。"""
+    if max_rows < 2:
+        return rows[-max_rows:] if max_rows > 0 else []
+    step = (len(rows) - 1) / (max_rows - 1)
+    return [rows[round(i * step)] for i in range(max_rows)]
+
+
+def _toon_key(name: str) -> str:
+    return name if _TOON_BARE_KEY.match(name) else _toon_quote(name, force=True)
+
+
+def _toon_quote(text: str, force: bool = False) -> str:
+    needs_quotes = (
+        force
+        or text == ""
+        or text != text.strip()
+        or text in ("true", "false", "null")
+        or _NUMERIC_LIKE.match(text) is not None
+        or text.startswith("-")
+        or any(c in _TOON_SPECIAL for c in text)
+    )
+    if not needs_quotes:
+        return text
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t")
+    return f'"{escaped}"'
+
+
+def _csv_line(cells: Sequence[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow(cells)
+    return buffer.getvalue()
+
+
+def _render(fmt: str, columns: List[str], rows: List[List[Optional[str]]], numeric: List[List[bool]]) -> str:
+    if fmt == "csv":
+        lines = [_csv_line(columns)]
+        lines += [_csv_line(["" if cell is None else cell for cell in row]) for row in rows]
+        return "\n".join(lines) + "\n"
+
+    if fmt == "columnar":
+        lines = []
+        for position, name in enumerate(columns):
+            cells = ["" if row[position] is None else row[position] for row in rows]
+            lines.append(f"{name}[{len(rows)}]: {_csv_line(cells)}")
+        return "\n".join(lines) + "\n"
+
+    # toon：數值原樣輸出，字串依規則加引號，缺值為 null
+    header = f"[{len(rows)}]{{{','.join(_toon_key(name) for name in columns)}}}:"
+    lines = [header]
+    for row, flags in zip(rows, numeric):
+        cells = [
+            "null" if cell is None else (cell if is_number else _toon_quote(cell))
+            for cell, is_number in zip(row, flags)
+        ]
+        lines.append("  " + ",".join(cells))
+    return "\n".join(lines) + "\n"
+
+
+def _baseline_csv(data: Any) -> str:
+    """量測用的基準：原本直接輸出的 CSV。"""
+    if isinstance(data, str):
+        return data
+    if hasattr(data, "write_csv"):
+        return data.write_csv()
+    return data.to_csv()
+
+
+def encode_table(
+    data: Any,
+    tool: str,
+    index_label: Optional[str] = None,
+    time_series: bool = False,
+    fmt: Optional[str] = None,
+    precision: Optional[int] = None,
+    max_rows: Optional[int] = None,
+) -> str:
+    """
+    將表格型工具輸出編碼為精簡文字。
+
+    Args:
+        data: pandas DataFrame、polars DataFrame 或含標頭列的 CSV 字串。
+        tool (str): 工具方法名稱（例如 "get_stock_data"），用於量測記錄。
+        index_label (Optional[str]): pandas 索引（或 CSV 空白首欄）的欄位名稱。
+        time_series (bool): 是否為依時間排序的資料列；只有時間序列會套用降採樣。
+        fmt (Optional[str]): toon、columnar 或 csv；None 時使用設定 table_format。
+        precision (Optional[int]): 浮點數小數位數；None 時使用設定 table_precision。
+        max_rows (Optional[int]): 時間序列的最大列數；None 時使用設定 table_max_rows。
+
+    Returns:
+        str: 編碼後的表格；降採樣時會在開頭加上一行說明。
+    """
+    config = get_config()
+    fmt = fmt or config.get("table_format", "toon")
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"不支援的表格格式 '{fmt}'，請從以下選項中選擇：{', '.join(TABLE_FORMATS)}")
+    precision = config.get("table_precision", 2) if precision is None else precision
+    if max_rows is None:
+        max_rows = config.get("table_max_rows")
+
+    columns, raw_rows = _table_rows(data, index_label)
+    rows, numeric = [], []
+    for raw in raw_rows:
+        cells = [_format_value(value, precision) for value in raw]
+        # 除第一欄（索引或日期）以外全為缺值的列不帶任何資訊
+        if len(cells) > 1 and all(cell is None for cell in cells[1:]):
+            continue
+        rows.append(cells)
+        numeric.append([
+            isinstance(value, numbers.Number) or (isinstance(value, str) and _NUMERIC_LIKE.match(value) is not None)
+            for value in raw
+        ])
+
+    note = ""
+    if time_series and max_rows and len(rows) > max_rows:
+        note = f"# 已均勻降採樣：原始 {len(rows)} 列，顯示 {max_rows} 列（含第一列與最後一列）\n"
+        positions = _downsample(list(range(len(rows))), max_rows)
+        rows = [rows[i] for i in positions]
+        numeric = [numeric[i] for i in positions]
+
+    encoded = note + _render(fmt, columns, rows, numeric)
+
+    if config.get("table_measure"):
+        _record_savings(tool, _baseline_csv(data), encoded)
+    return encoded
+
+
+def _record_savings(tool: str, baseline: str, encoded: str) -> None:
+    from tradingagents.agents.utils.context_budget import estimate_tokens
+    from tradingagents.utils.instrumentation import get_current_profile
+
+    profile = get_current_profile()
+    if profile is not None:
+        profile.record_table(tool, estimate_tokens(baseline), estimate_tokens(encoded))
@@ -5,7 +5,9 @@ import yfinance as yf
 import os
 import time
 import logging
+from .asof_store import published_statement_columns, report_lag_days
 from .stockstats_utils import StockstatsUtils
+from .table_encoder import encode_table
 from .retry_utils import retry
 
 logger = logging.getLogger(__name__)
@@ -26,7 +28,7 @@ def get_YFin_data_online(
         end_date (str): 結束日期。
 
     Returns:
-        str: 包含股票數據的 CSV 格式字串。
+        str: 包含股票數據的精簡表格字串（格式見 table_encoder）。
     """
 
     datetime.strptime(start_date, "%Y-%m-%d")
@@ -51,21 +53,90 @@ def get_YFin_data_online(
     if data.index.tz is not None:
         data.index = data.index.tz_localize(None)
 
-    # 將數值四捨五入到小數點後兩位以便更清晰地顯示
-    numeric_columns = ["Open", "High", "Low", "Close", "Adj Close"]
-    for col in numeric_columns:
-        if col in data.columns:
-            data[col] = data[col].round(2)
-
-    # 將 DataFrame 轉換為 CSV 字串
-    csv_string = data.to_csv()
+    # 編碼為精簡表格（數值精度與降採樣依設定）
+    table_string = encode_table(data, "get_stock_data", index_label="Date", time_series=True)
 
     # 新增標頭資訊
     header = f"# {symbol.upper()} 從 {start_date} 到 {end_date} 的股票數據\n"
     header += f"# 總記錄數：{len(data)}\n"
     header += f"# 數據檢索時間：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
 
-    return header + csv_string
+    return header + table_string
+
+
+# 支援的技術指標及其說明（附在指標窗口輸出的最後）
+INDICATOR_DESCRIPTIONS = {
+    # 移動平均線
+    "close_50_sma": (
+        "50 SMA：一個中期趨勢指標。"
+        "用法：識別趨勢方向並作為動態支撐/阻力。"
+        "提示：它滯後於價格；與更快的指標結合以獲得及時信號。"
+    ),
+    "close_200_sma": (
+        "200 SMA：一個長期趨勢基準。"
+        "用法：確認整體市場趨勢並識別黃金/死亡交叉設置。"
+        "提示：它反應緩慢；最適合戰略趨勢確認，而非頻繁的交易入場。"
+    ),
+    "close_10_ema": (
+        "10 EMA：一個反應靈敏的短期平均線。"
+        "用法：捕捉動能的快速轉變和潛在的入場點。"
+        "提示：在震盪市場中容易產生噪音；與較長的平均線一起使用以過濾錯誤信號。"
+    ),
+    # MACD 相關
+    "macd": (
+        "MACD：通過 EMA 的差異計算動能。"
+        "用法：尋找交叉和背離作為趨勢變化的信號。"
+        "提示：在低波動性或橫盤市場中與其他指標確認。"
+    ),
+    "macds": (
+        "MACD 信號線：MACD 線的 EMA 平滑。"
+        "用法：使用與 MACD 線的交叉來觸發交易。"
+        "提示：應作為更廣泛策略的一部分以避免誤報。"
+    ),
+    "macdh": (
+        "MACD 柱狀圖：顯示 MACD 線與其信號線之間的差距。"
+        "用法：可視化動能強度並及早發現背離。"
+        "提示：可能不穩定；在快速變動的市場中輔以額外的過濾器。"
+    ),
+    # 動能指標
+    "rsi": (
+        "RSI：衡量動能以標記超買/超賣狀況。"
+        "用法：應用 70/30 閾值並觀察背離以發出反轉信號。"
+        "提示：在強勁趨勢中，RSI 可能保持極端；務必與趨勢分析交叉檢查。"
+    ),
+    # 波動性指標
+    "boll": (
+        "布林帶中軌：作為布林帶基礎的 20 SMA。"
+        "用法：作為價格變動的動態基準。"
+        "提示：與上下軌結合以有效發現突破或反轉。"
+    ),
+    "boll_ub": (
+        "布林帶上軌：通常比中軌高 2 個標準差。"
+        "用法：發出潛在超買狀況和突破區域的信號。"
+        "提示：與其他工具確認信號；在強勁趨勢中價格可能會沿著軌道運行。"
+    ),
+    "boll_lb": (
+        "布林帶下軌：通常比中軌低 2 個標準差。"
+        "用法：指示潛在的超賣狀況。"
+        "提示：使用額外分析以避免錯誤的反轉信號。"
+    ),
+    "atr": (
+        "ATR：平均真實波幅，用於衡量波動性。"
+        "用法：根據當前市場波動性設置止損水平和調整頭寸大小。"
+        "提示：這是一個反應性指標，因此請將其用作更廣泛風險管理策略的一部分。"
+    ),
+    # 成交量指標
+    "vwma": (
+        "VWMA：成交量加權移動平均線。"
+        "用法：通過將價格行為與成交量數據相結合來確認趨勢。"
+        "提示：注意成交量激增導致的結果偏差；與其他成交量分析結合使用。"
+    ),
+    "mfi": (
+        "MFI：資金流動指數是一種動能指標，使用價格和成交量來衡量買賣壓力。"
+        "用法：識別超買 (>80) 或超賣 (<20) 狀況，並確認趨勢或反轉的強度。"
+        "提示：與 RSI 或 MACD 一起使用以確認信號；價格與 MFI 之間的背離可能表示潛在的反轉。"
+    ),
+}
 
 
 def get_stock_stats_indicators_window(
@@ -89,82 +160,9 @@ def get_stock_stats_indicators_window(
         str: 包含指標值的格式化字串。
     """
 
-    best_ind_params = {
-        # 移動平均線
-        "close_50_sma": (
-            "50 SMA：一個中期趨勢指標。"
-            "用法：識別趨勢方向並作為動態支撐/阻力。"
-            "提示：它滯後於價格；與更快的指標結合以獲得及時信號。"
-        ),
-        "close_200_sma": (
-            "200 SMA：一個長期趨勢基準。"
-            "用法：確認整體市場趨勢並識別黃金/死亡交叉設置。"
-            "提示：它反應緩慢；最適合戰略趨勢確認，而非頻繁的交易入場。"
-        ),
-        "close_10_ema": (
-            "10 EMA：一個反應靈敏的短期平均線。"
-            "用法：捕捉動能的快速轉變和潛在的入場點。"
-            "提示：在震盪市場中容易產生噪音；與較長的平均線一起使用以過濾錯誤信號。"
-        ),
-        # MACD 相關
-        "macd": (
-            "MACD：通過 EMA 的差異計算動能。"
-            "用法：尋找交叉和背離作為趨勢變化的信號。"
-            "提示：在低波動性或橫盤市場中與其他指標確認。"
-        ),
-        "macds": (
-            "MACD 信號線：MACD 線的 EMA 平滑。"
-            "用法：使用與 MACD 線的交叉來觸發交易。"
-            "提示：應作為更廣泛策略的一部分以避免誤報。"
-        ),
-        "macdh": (
-            "MACD 柱狀圖：顯示 MACD 線與其信號線之間的差距。"
-            "用法：可視化動能強度並及早發現背離。"
-            "提示：可能不穩定；在快速變動的市場中輔以額外的過濾器。"
-        ),
-        # 動能指標
-        "rsi": (
-            "RSI：衡量動能以標記超買/超賣狀況。"
-            "用法：應用 70/30 閾值並觀察背離以發出反轉信號。"
-            "提示：在強勁趨勢中，RSI 可能保持極端；務必與趨勢分析交叉檢查。"
-        ),
-        # 波動性指標
-        "boll": (
-            "布林帶中軌：作為布林帶基礎的 20 SMA。"
-            "用法：作為價格變動的動態基準。"
-            "提示：與上下軌結合以有效發現突破或反轉。"
-        ),
-        "boll_ub": (
-            "布林帶上軌：通常比中軌高 2 個標準差。"
-            "用法：發出潛在超買狀況和突破區域的信號。"
-            "提示：與其他工具確認信號；在強勁趨勢中價格可能會沿著軌道運行。"
-        ),
-        "boll_lb": (
-            "布林帶下軌：通常比中軌低 2 個標準差。"
-            "用法：指示潛在的超賣狀況。"
-            "提示：使用額外分析以避免錯誤的反轉信號。"
-        ),
-        "atr": (
-            "ATR：平均真實波幅，用於衡量波動性。"
-            "用法：根據當前市場波動性設置止損水平和調整頭寸大小。"
-            "提示：這是一個反應性指標，因此請將其用作更廣泛風險管理策略的一部分。"
-        ),
-        # 成交量指標
-        "vwma": (
-            "VWMA：成交量加權移動平均線。"
-            "用法：通過將價格行為與成交量數據相結合來確認趨勢。"
-            "提示：注意成交量激增導致的結果偏差；與其他成交量分析結合使用。"
-        ),
-        "mfi": (
-            "MFI：資金流動指數是一種動能指標，使用價格和成交量來衡量買賣壓力。"
-            "用法：識別超買 (>80) 或超賣 (<20) 狀況，並確認趨勢或反轉的強度。"
-            "提示：與 RSI 或 MACD 一起使用以確認信號；價格與 MFI 之間的背離可能表示潛在的反轉。"
-        ),
-    }
-
-    if indicator not in best_ind_params:
+    if indicator not in INDICATOR_DESCRIPTIONS:
         raise ValueError(
-            f"不支持指標 {indicator}。請從以下選項中選擇：{list(best_ind_params.keys())}"
+            f"不支持指標 {indicator}。請從以下選項中選擇：{list(INDICATOR_DESCRIPTIONS.keys())}"
         )
 
     end_date = curr_date
@@ -197,7 +195,7 @@ def get_stock_stats_indicators_window(
             ind_string += f"{date_str}: {value}\n"
         
     except Exception as e:
-        print(f"獲取批量 stockstats 數據時出錯：{e}")
+        logger.warning("獲取批量 stockstats 數據時出錯：%s", e)
         # 如果批量方法失敗，則回退到原始實現
         ind_string = ""
         curr_date_dt = datetime.strptime(curr_date, "%Y-%m-%d")
@@ -212,7 +210,7 @@ def get_stock_stats_indicators_window(
         f"## 從 {before.strftime('%Y-%m-%d')} 到 {end_date} 的 {indicator} 值：\n\n"
         + ind_string
         + "\n\n"
-        + best_ind_params.get(indicator, "無可用描述。")
+        + INDICATOR_DESCRIPTIONS.get(indicator, "無可用描述。")
     )
 
     return result_str
@@ -368,9 +366,7 @@ def get_stockstats_indicator(
             curr_date,
         )
     except Exception as e:
-        print(
-            f"獲取指標 {indicator} 在 {curr_date} 的 stockstats 指標數據時出錯：{e}"
-        )
+        logger.warning("獲取指標 %s 在 %s 的 stockstats 指標數據時出錯：%s", indicator, curr_date, e)
         return ""
 
     return str(indicator_value)
@@ -379,7 +375,7 @@ def get_stockstats_indicator(
 def get_balance_sheet(
     ticker: Annotated[str, "公司的股票代碼"],
     freq: Annotated[str, "數據頻率：'annual' 或 'quarterly'"] = "quarterly",
-    curr_date: Annotated[str, "當前日期 (yfinance 未使用)"] = None
+    curr_date: Annotated[str, "當前日期，只返回當時已公開的期別"] = None
 ):
     """從 yfinance 獲取資產負債表數據。"""
     try:
@@ -390,17 +386,20 @@ def get_balance_sheet(
         else:
             data = ticker_obj.balance_sheet
             
+        if curr_date:
+            data = published_statement_columns(data, freq, curr_date, report_lag_days())
+
         if data.empty:
             return f"找不到 '{ticker}' 的資產負債表數據"
             
-        # 為與其他函式保持一致，轉換為 CSV 字串
-        csv_string = data.to_csv()
+        # 編碼為精簡表格，與其他表格型工具一致
+        table_string = encode_table(data, "get_balance_sheet", index_label="Item")
         
         # 新增標頭資訊
         header = f"# {ticker.upper()} 的資產負債表數據 ({freq})\n"
         header += f"# 數據檢索時間：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
         
-        return header + csv_string
+        return header + table_string
         
     except Exception as e:
         return f"檢索 {ticker} 的資產負債表時出錯：{str(e)}"
@@ -409,7 +408,7 @@ def get_balance_sheet(
 def get_cashflow(
     ticker: Annotated[str, "公司的股票代碼"],
     freq: Annotated[str, "數據頻率：'annual' 或 'quarterly'"] = "quarterly",
-    curr_date: Annotated[str, "當前日期 (yfinance 未使用)"] = None
+    curr_date: Annotated[str, "當前日期，只返回當時已公開的期別"] = None
 ):
     """從 yfinance 獲取現金流量數據。"""
     try:
@@ -420,17 +419,20 @@ def get_cashflow(
         else:
             data = ticker_obj.cashflow
             
+        if curr_date:
+            data = published_statement_columns(data, freq, curr_date, report_lag_days())
+
         if data.empty:
             return f"找不到 '{ticker}' 的現金流量數據"
             
-        # 為與其他函式保持一致，轉換為 CSV 字串
-        csv_string = data.to_csv()
+        # 編碼為精簡表格，與其他表格型工具一致
+        table_string = encode_table(data, "get_cashflow", index_label="Item")
         
         # 新增標頭資訊
         header = f"# {ticker.upper()} 的現金流量數據 ({freq})\n"
         header += f"# 數據檢索時間：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
         
-        return header + csv_string
+        return header + table_string
         
     except Exception as e:
         return f"檢索 {ticker} 的現金流量時出錯：{str(e)}"
@@ -439,7 +441,7 @@ def get_cashflow(
 def get_income_statement(
     ticker: Annotated[str, "公司的股票代碼"],
     freq: Annotated[str, "數據頻率：'annual' 或 'quarterly'"] = "quarterly",
-    curr_date: Annotated[str, "當前日期 (yfinance 未使用)"] = None
+    curr_date: Annotated[str, "當前日期，只返回當時已公開的期別"] = None
 ):
     """從 yfinance 獲取損益表數據。"""
     try:
@@ -450,41 +452,49 @@ def get_income_statement(
         else:
             data = ticker_obj.income_stmt
             
+        if curr_date:
+            data = published_statement_columns(data, freq, curr_date, report_lag_days())
+
         if data.empty:
             return f"找不到 '{ticker}' 的損益表數據"
             
-        # 為與其他函式保持一致，轉換為 CSV 字串
-        csv_string = data.to_csv()
+        # 編碼為精簡表格，與其他表格型工具一致
+        table_string = encode_table(data, "get_income_statement", index_label="Item")
         
         # 新增標頭資訊
         header = f"# {ticker.upper()} 的損益表數據 ({freq})\n"
         header += f"# 數據檢索時間：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
         
-        return header + csv_string
+        return header + table_string
         
     except Exception as e:
         return f"檢索 {ticker} 的損益表時出錯：{str(e)}"
 
 
 def get_insider_transactions(
-    ticker: Annotated[str, "公司的股票代碼"]
+    ticker: Annotated[str, "公司的股票代碼"],
+    curr_date: Annotated[str, "當前日期，只返回當時已申報的交易"] = None,
 ):
     """從 yfinance 獲取內部人士交易數據。"""
     try:
         ticker_obj = yf.Ticker(ticker.upper())
         data = ticker_obj.insider_transactions
+
+        if curr_date and data is not None and not data.empty:
+            cutoff = (datetime.strptime(curr_date, "%Y-%m-%d") - relativedelta(days=report_lag_days()["insider"])).strftime("%Y-%m-%d")
+            data = data[data["Start Date"].astype(str).str[:10] <= cutoff]
         
         if data is None or data.empty:
             return f"找不到 '{ticker}' 的內部人士交易數據"
             
-        # 為與其他函式保持一致，轉換為 CSV 字串
-        csv_string = data.to_csv()
+        # 編碼為精簡表格，與其他表格型工具一致
+        table_string = encode_table(data, "get_insider_transactions")
         
         # 新增標頭資訊
         header = f"# {ticker.upper()} 的內部人士交易數據\n"
         header += f"# 數據檢索時間：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
         
-        return header + csv_string
+        return header + table_string
         
     except Exception as e:
         return f"檢索 {ticker} 的內部人士交易時出錯：{str(e)}"
\ No newline at end of file
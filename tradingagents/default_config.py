@@ -13,17 +13,72 @@ DEFAULT_CONFIG = {
     "deep_think_llm": "gpt-5-mini-2025-08-07",
     "quick_think_llm": "gpt-5-mini-2025-08-07",
     "backend_url": "https://api.openai.com/v1",
+    # LLM 回應錄製/重播快取: record, replay, passthrough (預設不使用快取)
+    "llm_cache_mode": os.getenv("TRADINGAGENTS_LLM_CACHE_MODE", "passthrough"),
+    "llm_cache_dir": os.getenv("TRADINGAGENTS_LLM_CACHE_DIR", os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__), ".")),
+        "dataflows/llm_cache",
+    )),
+    # 供應商速率限制（以 API 主機為鍵，同一主機與金鑰的所有呼叫共用）：超出時在本地排隊而非等待 429
+    # 範例: "api.openai.com": {"requests_per_minute": 500, "tokens_per_minute": 200000}
+    # burst（可連續立即送出的請求數）預設為 ceil(requests_per_minute / 60)，請求平均分散在每一秒
+    "rate_limits": {
+        "www.alphavantage.co": {"requests_per_minute": 75},
+        "www.google.com": {"requests_per_minute": 20},
+    },
+    # Alpha Vantage 每日請求額度，依 API 金鑰分別在本地追蹤並在用盡時直接備援
+    # 預設 None（付費方案，不限制，與上方 75 次/分鐘的速率一致）；免費方案請設為 25
+    "alpha_vantage_daily_quota": None,
+    # Google 新聞每次查詢最多取得的新聞數，取得足夠後即停止抓取後續頁面；None 表示抓取到最後一頁（最多 5 頁）
+    "google_news_max_results": 30,
+    # 資料工具使用的憑證，隨每次執行的設定快照傳遞（並行的多位使用者各用各的金鑰）
+    # None 表示回退到環境變數 OPENAI_API_KEY / ALPHA_VANTAGE_API_KEY
+    "openai_api_key": None,
+    "alpha_vantage_api_key": None,
+    # 每個 API 主機的 HTTP 連線池大小
+    "http_pool_size": 20,
+    # 日誌：等級（DEBUG 會輸出供應商路由的每個步驟）與格式（json 或 text），寫到 stderr
+    "log_level": os.getenv("TRADINGAGENTS_LOG_LEVEL", "INFO"),
+    "log_format": os.getenv("TRADINGAGENTS_LOG_FORMAT", "json"),
     # 辯論與討論設定
     "max_debate_rounds": 1,
     "max_risk_discuss_rounds": 1,
     "max_recur_limit": 100,
+    # 辯論收斂門檻：完整回合中每段發言與先前發言的新穎度都低於此值時提前結束辯論
+    # 預設 None（停用，一律進行到最大回合數）；需要時可設為例如 0.1
+    "debate_novelty_threshold": None,
+    # 回合同步的投資辯論：每回合看漲與看跌研究員依上一回合狀態同時發言
+    "parallel_invest_debate": False,
+    # 回合同步的風險辯論：每回合激進、保守、中立三位分析師依上一回合狀態同時發言
+    "parallel_risk_debate": False,
+    # 資料預先抓取：propagate 開始時在背景平行抓取股價、核心指標、財報與新聞，預熱本次執行的工具快取
+    "prefetch_tool_data": False,
+    # 上下文預算設定：提示估計 token 數超過上限時，改用報告摘要並只保留最近的辯論歷史
+    # 預設 None 表示不限制（一律使用完整內容，提示與原本相同）；需要時可設為例如 12000 / 24000
+    "quick_think_context_tokens": None,
+    "deep_think_context_tokens": None,
+    "report_digest_chars": 600,
+    # 表格型工具輸出（股價、財報、內部人士交易）的編碼：toon（預設）、columnar、csv
+    "table_format": os.getenv("TRADINGAGENTS_TABLE_FORMAT", "toon"),
+    # 表格中浮點數的小數位數（絕對值小於 1 的比率與每股數值改為保留此位數的有效數字）
+    "table_precision": 2,
+    # 股價等時間序列表格的最大列數，超過時均勻降採樣並保留首尾兩列；None 表示不降採樣
+    "table_max_rows": None,
+    # 量測模式：同時產生原本的 CSV 輸出，並在 run_profile["tables"] 記錄每個工具節省的 token
+    "table_measure": False,
+    # 時間點（asof）資料供應商：每個資料來源只抓取一次快照並存在本地，依交易日返回當時已公開的資料，
+    # 適合回測（避免未來資料洩漏與重複抓取）；設為主要供應商時失敗不會備援至即時供應商，也不會作為其他供應商的備援。
+    # None 表示使用 data_cache_dir/asof
+    "asof_data_dir": None,
+    # 財報與內部人士交易的申報延遲（天）：期末日或交易日加上此天數後才視為已公開
+    "asof_report_lag_days": {"quarterly": 45, "annual": 90, "insider": 2},
     # 資料供應商設定
     # 類別層級設定 (該類別所有工具的預設值)
     "data_vendors": {
-        "core_stock_apis": "yfinance",       # 選項: yfinance, alpha_vantage, local
-        "technical_indicators": "yfinance",  # 選項: yfinance, alpha_vantage, local
-        "fundamental_data": "alpha_vantage", # 選項: openai, alpha_vantage, local
-        "news_data": "openai",               # 選項: openai, alpha_vantage, google, local
+        "core_stock_apis": "yfinance",       # 選項: yfinance, alpha_vantage, local, asof
+        "technical_indicators": "yfinance",  # 選項: yfinance, alpha_vantage, local, asof
+        "fundamental_data": "alpha_vantage", # 選項: openai, alpha_vantage, local, asof (asof 不提供 get_fundamentals)
+        "news_data": "openai",               # 選項: openai, alpha_vantage, google, local (get_insider_transactions 另支援 asof)
     },
     # 工具層級設定 (優先於類別層級設定)
     "tool_vendors": {
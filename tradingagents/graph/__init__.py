@@ -14,6 +14,8 @@
 - Propagator: 管理狀態在圖中節點之間傳播的類別。
 - Reflector: 處理對決策的反思和記憶更新的類別。
 - SignalProcessor: 處理最終信號並做出交易決策的類別。
+- StateLogger: 以僅附加的 JSONL 檔案記錄每次執行最終狀態的類別（以 get_state_logger 取得共用實例）。
+- ShardedRunner: 以多個工作行程平行執行大量 (股票代碼, 交易日期) 分析的類別。
 """
 
 # 從同層級的模組中匯入類別
@@ -23,6 +25,8 @@ from .setup import GraphSetup
 from .propagation import Propagator
 from .reflection import Reflector
 from .signal_processing import SignalProcessor
+from .state_log import StateLogger, get_state_logger
+from .sharded_runner import ShardedRunner
 
 # `__all__` 變數定義了當 `from tradingagents.graph import *` 被執行時，
 # 哪些名稱會被匯入。這是一種控制命名空間的良好實踐。
@@ -33,4 +37,7 @@ __all__ = [
     "Propagator",
     "Reflector",
     "SignalProcessor",
+    "StateLogger",
+    "get_state_logger",
+    "ShardedRunner",
 ]
\ No newline at end of file
@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 # TradingAgentsX/graph/conditional_logic.py
 
+from typing import List, Optional, Union
+
 from tradingagents.agents.utils.agent_states import AgentState
 
+from tradingagents.utils.instrumentation import get_current_profile
+
+from .convergence import ConvergenceDetector
+from .debate_rounds import DEBATE_ROUND_PARTICIPANTS, RISK_ROUND_PARTICIPANTS
+
 
 class ConditionalLogic:
     """
@@ -11,16 +18,40 @@ class ConditionalLogic:
     例如，決定下一個應該執行的代理或是否繼續一個循環。
     """
 
-    def __init__(self, max_debate_rounds=1, max_risk_discuss_rounds=1):
+    def __init__(
+        self,
+        max_debate_rounds=1,
+        max_risk_discuss_rounds=1,
+        convergence: Optional[ConvergenceDetector] = None,
+    ):
         """
         使用設定參數進行初始化。
 
         Args:
             max_debate_rounds (int): 投資辯論的最大回合數。
             max_risk_discuss_rounds (int): 風險討論的最大回合數。
+            convergence (Optional[ConvergenceDetector]): 辯論收斂偵測器；None 表示一律進行到最大回合數。
         """
         self.max_debate_rounds = max_debate_rounds
         self.max_risk_discuss_rounds = max_risk_discuss_rounds
+        self.convergence = convergence
+
+    def _debate_finished(self, debate: str, debate_state, participants: int, max_rounds: int) -> bool:
+        """
+        判斷辯論是否應該結束：達到最大回合數，或在完整回合結束時偵測到收斂。
+        結束時將實際發言數與節省的回合數記錄到執行剖析中。
+        """
+        count = debate_state["count"]
+        max_turns = participants * max_rounds
+        finished = count >= max_turns
+        if not finished and self.convergence is not None and count % participants == 0:
+            finished = self.convergence.has_converged(debate_state.get("history", ""), participants)
+
+        if finished:
+            profile = get_current_profile()
+            if profile is not None:
+                profile.record_debate(debate, count, max_turns, participants)
+        return finished
 
     def should_continue_market(self, state: AgentState):
         """
@@ -94,7 +125,7 @@ class ConditionalLogic:
     def should_continue_debate(self, state: AgentState) -> str:
         """
         判斷投資辯論是否應該繼續。
-        如果辯論回合數達到上限，則由研究經理做出最終決定。
+        如果辯論回合數達到上限或辯論已收斂，則由研究經理做出最終決定。
         否則，在看漲和看跌研究員之間輪流進行。
 
         Args:
@@ -104,8 +135,8 @@ class ConditionalLogic:
             str: 下一個節點的名稱。
         """
         # 2 個代理之間的來回辯論
-        if (
-            state["investment_debate_state"]["count"] >= 2 * self.max_debate_rounds
+        if self._debate_finished(
+            "investment", state["investment_debate_state"], 2, self.max_debate_rounds
         ):
             return "Research Manager"
         # 檢查中文前綴（因為研究員使用中文格式化響應）
@@ -116,7 +147,7 @@ class ConditionalLogic:
     def should_continue_risk_analysis(self, state: AgentState) -> str:
         """
         判斷風險分析是否應該繼續。
-        如果討論回合數達到上限，則由風險裁判做出最終決定。
+        如果討論回合數達到上限或討論已收斂，則由風險裁判做出最終決定。
         否則，在激進、保守和中立分析師之間輪流進行。
 
         Args:
@@ -126,12 +157,46 @@ class ConditionalLogic:
             str: 下一個節點的名稱。
         """
         # 3 個代理之間的來回討論
-        if (
-            state["risk_debate_state"]["count"] >= 3 * self.max_risk_discuss_rounds
+        if self._debate_finished(
+            "risk", state["risk_debate_state"], 3, self.max_risk_discuss_rounds
         ):
             return "Risk Judge"
         if state["risk_debate_state"]["latest_speaker"].startswith("Risky"):
             return "Safe Analyst"
         if state["risk_debate_state"]["latest_speaker"].startswith("Safe"):
             return "Neutral Analyst"
-        return "Risky Analyst"
\ No newline at end of file
+        return "Risky Analyst"
+
+    def should_continue_debate_round(self, state: AgentState) -> Union[str, List[str]]:
+        """
+        回合同步模式下判斷投資辯論是否應該繼續。
+        每個回合看漲與看跌研究員同時發言，回合數達到上限或辯論已收斂時由研究經理做出最終決定。
+
+        Args:
+            state (AgentState): 當前的代理狀態。
+
+        Returns:
+            Union[str, List[str]]: 研究經理，或下一回合要同時執行的兩位研究員。
+        """
+        if self._debate_finished(
+            "investment", state["investment_debate_state"], 2, self.max_debate_rounds
+        ):
+            return "Research Manager"
+        return [name for name, _ in DEBATE_ROUND_PARTICIPANTS]
+
+    def should_continue_risk_round(self, state: AgentState) -> Union[str, List[str]]:
+        """
+        回合同步模式下判斷風險分析是否應該繼續。
+        每個回合三位分析師同時發言，回合數達到上限或討論已收斂時由風險裁判做出最終決定。
+
+        Args:
+            state (AgentState): 當前的代理狀態。
+
+        Returns:
+            Union[str, List[str]]: 風險裁判，或下一回合要同時執行的三位分析師。
+        """
+        if self._debate_finished(
+            "risk", state["risk_debate_state"], 3, self.max_risk_discuss_rounds
+        ):
+            return "Risk Judge"
+        return [name for name, _, _ in RISK_ROUND_PARTICIPANTS]
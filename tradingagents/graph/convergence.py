@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# TradingAgentsX/graph/convergence.py
+
+import re
+import zlib
+from typing import List, Optional, Set
+
+# 辯論歷史中每個發言都以「XX分析師：」開頭，以此切分發言
+_TURN_SPLIT_PATTERN = re.compile(r"\n(?=(?:看漲|看跌|激進|安全|中立)分析師：)")
+_SPEAKER_PREFIX_PATTERN = re.compile(r"^(?:看漲|看跌|激進|安全|中立)分析師：")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# 以字元三字組作為比對單位：中文不需要斷詞，也足以區分改寫與重複
+_SHINGLE_SIZE = 3
+
+
+def split_turns(history: str) -> List[str]:
+    """將辯論歷史切分為逐次發言（去除說話者前綴）。"""
+    turns = []
+    for turn in _TURN_SPLIT_PATTERN.split(history or ""):
+        turn = _SPEAKER_PREFIX_PATTERN.sub("", turn.strip())
+        if turn:
+            turns.append(turn)
+    return turns
+
+
+def shingle_hashes(text: str, size: int = _SHINGLE_SIZE) -> Set[int]:
+    """
+    將文字轉為字元 n-gram 的雜湊集合（本地雜湊向量化，不需要 embedding 服務）。
+    使用 crc32 確保跨行程結果一致。
+    """
+    normalized = _WHITESPACE_PATTERN.sub(" ", text.lower())
+    return {
+        zlib.crc32(normalized[i:i + size].encode("utf-8"))
+        for i in range(len(normalized) - size + 1)
+    }
+
+
+def turn_novelty(turn: str, previous_turns: List[str]) -> float:
+    """
+    計算一段發言相對於先前發言的新穎度：發言中從未出現過的 n-gram 所佔比例。
+    與詞頻餘弦相似度相比，不會被各方共用的報告格式與結尾聲明稀釋。
+    """
+    shingles = shingle_hashes(turn)
+    if not shingles:
+        return 0.0
+    seen: Set[int] = set()
+    for previous in previous_turns:
+        seen |= shingle_hashes(previous)
+    return len(shingles - seen) / len(shingles)
+
+
+class ConvergenceDetector:
+    """
+    以詞彙新穎度判斷辯論是否已經收斂。
+
+    每個完整回合結束時，計算本回合每段發言相對於先前所有回合的新穎度，
+    本回合所有發言的新穎度都低於門檻時，視為各方已不再提出新論點。
+    """
+
+    def __init__(self, novelty_threshold: float = 0.1):
+        """
+        Args:
+            novelty_threshold (float): 新穎度門檻，介於 0 與 1 之間。
+        """
+        self.novelty_threshold = novelty_threshold
+
+    def round_novelty(self, history: str, participants: int) -> Optional[float]:
+        """
+        計算最近一個完整回合的新穎度。
+
+        Args:
+            history (str): 辯論歷史。
+            participants (int): 每回合的發言人數。
+
+        Returns:
+            Optional[float]: 本回合發言中最高的新穎度；不足兩個回合時返回 None。
+        """
+        turns = split_turns(history)
+        if len(turns) < 2 * participants:
+            return None
+
+        previous = turns[:-participants]
+        novelties = [turn_novelty(turn, previous) for turn in turns[-participants:]]
+        return max(novelties)
+
+    def has_converged(self, history: str, participants: int) -> bool:
+        """最近一個完整回合的新穎度是否低於門檻。"""
+        novelty = self.round_novelty(history, participants)
+        return novelty is not None and novelty < self.novelty_threshold
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# TradingAgentsX/graph/debate_rounds.py
+
+from typing import Callable, Dict
+
+# 平行投資辯論的參與者：(圖節點名稱, 狀態欄位前綴)，順序即合併時寫入歷史的順序
+DEBATE_ROUND_PARTICIPANTS = (
+    ("Bull Researcher", "bull"),
+    ("Bear Researcher", "bear"),
+)
+
+# 平行風險辯論的參與者：(圖節點名稱, latest_speaker 值, 狀態欄位前綴)，順序即合併時寫入歷史的順序
+RISK_ROUND_PARTICIPANTS = (
+    ("Risky Analyst", "Risky", "risky"),
+    ("Safe Analyst", "Safe", "safe"),
+    ("Neutral Analyst", "Neutral", "neutral"),
+)
+
+
+def create_debate_round_participant(researcher_node: Callable, role: str) -> Callable:
+    """
+    將看漲/看跌研究員節點包裝為回合同步模式的參與者。
+
+    研究員依上一回合的狀態產生論點，其中 current_response 會換成對手上一回合的論點，
+    論點寫入 debate_round_responses，讓看漲與看跌方可以同時執行。
+
+    Args:
+        researcher_node (Callable): create_bull_researcher / create_bear_researcher 建立的節點函式。
+        role (str): 狀態欄位前綴（"bull" 或 "bear"）。
+
+    Returns:
+        Callable: 可在 langgraph 中使用的節點函式。
+    """
+    opponent = "bear" if role == "bull" else "bull"
+
+    def round_participant_node(state) -> dict:
+        investment_debate_state = state["investment_debate_state"]
+        round_view = dict(state)
+        round_view["investment_debate_state"] = {
+            **investment_debate_state,
+            "current_response": investment_debate_state.get(f"current_{opponent}_response", ""),
+        }
+        result = researcher_node(round_view)
+        argument = result["investment_debate_state"]["current_response"]
+        return {"debate_round_responses": {role: argument}}
+
+    return round_participant_node
+
+
+def create_debate_round_merge() -> Callable:
+    """
+    建立合併節點：將同一回合看漲與看跌方的論點依固定順序寫回 InvestDebateState。
+
+    Returns:
+        Callable: 可在 langgraph 中使用的節點函式。
+    """
+
+    def debate_round_merge_node(state) -> dict:
+        investment_debate_state = state["investment_debate_state"]
+        responses: Dict[str, str] = state.get("debate_round_responses") or {}
+
+        new_investment_debate_state = dict(investment_debate_state)
+        history = investment_debate_state.get("history", "")
+        for _, role in DEBATE_ROUND_PARTICIPANTS:
+            argument = responses.get(role)
+            if argument is None:
+                continue
+            history += "\n" + argument
+            new_investment_debate_state[f"{role}_history"] = (
+                investment_debate_state.get(f"{role}_history", "") + "\n" + argument
+            )
+            new_investment_debate_state[f"current_{role}_response"] = argument
+            new_investment_debate_state["current_response"] = argument
+
+        new_investment_debate_state["history"] = history
+        new_investment_debate_state["count"] = investment_debate_state["count"] + len(responses)
+
+        # 傳入 None 清空回合暫存，供下一回合使用
+        return {"investment_debate_state": new_investment_debate_state, "debate_round_responses": None}
+
+    return debate_round_merge_node
+
+
+def create_risk_round_participant(debator_node: Callable, role: str) -> Callable:
+    """
+    將風險辯論員節點包裝為回合同步模式的參與者。
+
+    辯論員仍依回合開始時的狀態（上一回合的歷史與對手論點）產生論點，
+    但論點寫入 risk_round_responses，而不是直接覆寫 risk_debate_state，
+    讓同一回合的三位辯論員可以同時執行。
+
+    Args:
+        debator_node (Callable): create_*_debator 建立的節點函式。
+        role (str): 狀態欄位前綴（"risky"、"safe" 或 "neutral"）。
+
+    Returns:
+        Callable: 可在 langgraph 中使用的節點函式。
+    """
+
+    def round_participant_node(state) -> dict:
+        result = debator_node(state)
+        argument = result["risk_debate_state"][f"current_{role}_response"]
+        return {"risk_round_responses": {role: argument}}
+
+    return round_participant_node
+
+
+def create_risk_round_merge() -> Callable:
+    """
+    建立合併節點：將同一回合三位辯論員的論點依固定順序寫回 RiskDebateState。
+
+    Returns:
+        Callable: 可在 langgraph 中使用的節點函式。
+    """
+
+    def risk_round_merge_node(state) -> dict:
+        risk_debate_state = state["risk_debate_state"]
+        responses: Dict[str, str] = state.get("risk_round_responses") or {}
+
+        new_risk_debate_state = dict(risk_debate_state)
+        history = risk_debate_state.get("history", "")
+        for _, speaker, role in RISK_ROUND_PARTICIPANTS:
+            argument = responses.get(role)
+            if argument is None:
+                continue
+            history += "\n" + argument
+            new_risk_debate_state[f"{role}_history"] = (
+                risk_debate_state.get(f"{role}_history", "") + "\n" + argument
+            )
+            new_risk_debate_state[f"current_{role}_response"] = argument
+            new_risk_debate_state["latest_speaker"] = speaker
+
+        new_risk_debate_state["history"] = history
+        new_risk_debate_state["count"] = risk_debate_state["count"] + len(responses)
+
+        # 傳入 None 清空回合暫存，供下一回合使用
+        return {"risk_debate_state": new_risk_debate_state, "risk_round_responses": None}
+
+    return risk_round_merge_node
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# TradingAgentsX/graph/prefetch.py
+
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langchain_core.tools import BaseTool
+
+from tradingagents.agents.utils.agent_utils import (
+    get_balance_sheet,
+    get_cashflow,
+    get_fundamentals,
+    get_global_news,
+    get_income_statement,
+    get_indicators,
+    get_news,
+    get_stock_data,
+)
+from .tool_cache import tool_cache_key, use_prefetch
+
+# 市場分析師提示中建議的核心指標
+CORE_INDICATORS = ("close_50_sma", "close_200_sma", "macd", "rsi")
+
+# 預先抓取的股價與新聞回溯天數
+STOCK_LOOKBACK_DAYS = 365
+NEWS_LOOKBACK_DAYS = 7
+
+
+def plan_prefetch(
+    selected_analysts: Sequence[str], ticker: str, trade_date: str
+) -> List[Tuple[BaseTool, Dict[str, Any]]]:
+    """
+    列出只依賴股票代碼與日期、可在分析師呼叫前預先執行的工具呼叫。
+
+    參數與分析師常用的呼叫一致；分析師選用不同參數時不會命中工具快取，
+    但供應商層的快取（股價歷史、Alpha Vantage 當日回應）仍已預熱。
+    get_fundamentals 一律包含，因為建立初始狀態時需要公司名稱。
+    """
+    trade_dt = datetime.strptime(trade_date, "%Y-%m-%d")
+    stock_start = (trade_dt - timedelta(days=STOCK_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+    news_start = (trade_dt - timedelta(days=NEWS_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+
+    calls: List[Tuple[BaseTool, Dict[str, Any]]] = [
+        (get_fundamentals, {"ticker": ticker, "curr_date": trade_date}),
+    ]
+    if "market" in selected_analysts:
+        calls.append((get_stock_data, {"symbol": ticker, "start_date": stock_start, "end_date": trade_date}))
+        calls.extend(
+            (get_indicators, {"symbol": ticker, "indicator": indicator, "curr_date": trade_date})
+            for indicator in CORE_INDICATORS
+        )
+    if "social" in selected_analysts or "news" in selected_analysts:
+        calls.append((get_news, {"ticker": ticker, "start_date": news_start, "end_date": trade_date}))
+    if "news" in selected_analysts:
+        calls.append((get_global_news, {"curr_date": trade_date}))
+    if "fundamentals" in selected_analysts:
+        calls.extend(
+            (statement_tool, {"ticker": ticker, "curr_date": trade_date})
+            for statement_tool in (get_balance_sheet, get_cashflow, get_income_statement)
+        )
+    return calls
+
+
+class PrefetchBatch:
+    """一次執行中進行中的預先抓取，以工具快取鍵索引各呼叫的 Future。"""
+
+    def __init__(self, futures: Dict[str, Future], executor: ContextThreadPoolExecutor):
+        self.futures = futures
+        self._executor = executor
+
+    def get(self, key: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        等待並返回預先抓取的結果。
+
+        Returns:
+            Optional[str]: 結果；沒有預先抓取此呼叫、抓取失敗或逾時時返回 None，由呼叫端自行執行。
+        """
+        future = self.futures.get(key)
+        if future is None:
+            return None
+        try:
+            result = future.result(timeout=timeout)
+        except Exception:
+            return None
+        return result if isinstance(result, str) else None
+
+    def shutdown(self) -> None:
+        """取消尚未開始的呼叫，不等待進行中的呼叫。"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class DataPrefetcher:
+    """
+    在 propagate 開始時，平行執行可預測的資料工具呼叫。
+
+    抓取在背景進行，不阻塞圖的執行：分析師的第一次 LLM 往返與資料 I/O 重疊，
+    工具節點遇到仍在抓取中的相同呼叫時直接等待其結果，而不是重新送出。
+    """
+
+    def __init__(self, selected_analysts: Sequence[str], max_workers: int = 8):
+        """
+        Args:
+            selected_analysts (Sequence[str]): 本次執行的分析師類型，只預先抓取會用到的資料。
+            max_workers (int): 同時進行的抓取數量上限。
+        """
+        self.selected_analysts = list(selected_analysts)
+        self.max_workers = max_workers
+
+    def start(self, ticker: str, trade_date: str) -> PrefetchBatch:
+        """送出所有預先抓取的呼叫並立即返回。"""
+        calls = plan_prefetch(self.selected_analysts, ticker, str(trade_date))
+        executor = ContextThreadPoolExecutor(max_workers=min(self.max_workers, len(calls)))
+        futures = {
+            tool_cache_key(tool, args): executor.submit(tool.invoke, args)
+            for tool, args in calls
+        }
+        return PrefetchBatch(futures, executor)
+
+    @contextmanager
+    def run(self, ticker: str, trade_date: str) -> Iterator[PrefetchBatch]:
+        """在此區塊內啟用預先抓取，工具節點與初始狀態建立時可透過 get_current_prefetch 取得結果。"""
+        batch = self.start(ticker, trade_date)
+        try:
+            with use_prefetch(batch):
+                yield batch
+        finally:
+            batch.shutdown()
@@ -1,15 +1,19 @@
 # -*- coding: utf-8 -*-
 # TradingAgentsX/graph/propagation.py
 
-from typing import Dict, Any
+import logging
+from typing import Dict, Any, List, Optional
 import json
 from tradingagents.agents.utils.agent_states import (
     AgentState,
     InvestDebateState,
     RiskDebateState,
 )
+from tradingagents.agents.utils.agent_utils import get_fundamentals
 from tradingagents.dataflows.interface import route_to_vendor
+from .tool_cache import get_current_prefetch, is_failed_result, tool_cache_key
 
+logger = logging.getLogger(__name__)
 
 
 class Propagator:
@@ -44,20 +48,30 @@ class Propagator:
         # 獲取真實公司名稱（從Alpha Vantage獲取公司概況）
         ticker = company_name  # company_name實際上是ticker
         actual_company_name = ticker  # 預設值為ticker
-        
+        tool_cache = {}
+
+        fundamentals_key = tool_cache_key(
+            get_fundamentals, {"ticker": ticker, "curr_date": str(trade_date)}
+        )
         try:
-            # 嘗試從fundamentals數據中獲取公司全名
-            fundamentals_data = route_to_vendor("get_fundamentals", ticker, trade_date)
+            # 嘗試從fundamentals數據中獲取公司全名（有進行中的預先抓取時直接使用其結果）
+            prefetch = get_current_prefetch()
+            fundamentals_data = prefetch.get(fundamentals_key) if prefetch is not None else None
+            if fundamentals_data is None:
+                fundamentals_data = route_to_vendor("get_fundamentals", ticker, str(trade_date))
             if fundamentals_data:
+                # 放入工具快取，基本面分析師以相同參數呼叫時不必重新獲取
+                if isinstance(fundamentals_data, str) and not is_failed_result(fundamentals_data):
+                    tool_cache[fundamentals_key] = fundamentals_data
                 # 解析JSON數據
                 data = json.loads(fundamentals_data) if isinstance(fundamentals_data, str) else fundamentals_data
                 if isinstance(data, dict) and "Name" in data:
                     actual_company_name = data["Name"]
-                    print(f"成功獲取公司名稱：{ticker} -> {actual_company_name}")
+                    logger.debug("成功獲取公司名稱：%s -> %s", ticker, actual_company_name)
                 else:
-                    print(f"警告：無法從fundamentals數據中提取公司名稱，使用ticker: {ticker}")
+                    logger.info("無法從fundamentals數據中提取公司名稱，使用ticker: %s", ticker)
         except Exception as e:
-            print(f"警告：獲取公司名稱時發生錯誤：{e}，使用ticker: {ticker}")
+            logger.warning("獲取公司名稱時發生錯誤：%s，使用ticker: %s", e, ticker)
         
         return {
             "messages": [("human", ticker)],  # 初始訊息，觸發第一個代理
@@ -80,18 +94,25 @@ class Propagator:
             "fundamentals_report": "",  # 基本面報告的初始值
             "sentiment_report": "",  # 情緒報告的初始值
             "news_report": "",  # 新聞報告的初始值
+            "tool_cache": tool_cache,  # 本次執行的工具結果快取
         }
 
 
-    def get_graph_args(self) -> Dict[str, Any]:
+    def get_graph_args(self, callbacks: Optional[List[Any]] = None) -> Dict[str, Any]:
         """
         獲取圖呼叫的參數。
         這些參數控制著圖的執行方式，例如串流模式和遞迴限制。
 
+        Args:
+            callbacks (Optional[List[Any]]): 要附加到圖執行的回呼處理器，例如 ProfilingCallbackHandler。
+
         Returns:
             Dict[str, Any]: 用於圖呼叫的參數字典。
         """
+        config = {"recursion_limit": self.max_recur_limit}  # 設定遞迴限制
+        if callbacks:
+            config["callbacks"] = callbacks
         return {
             "stream_mode": "values",  # 設定串流模式為 "values"，以獲取每個節點的輸出
-            "config": {"recursion_limit": self.max_recur_limit},  # 設定遞迴限制
+            "config": config,
         }
\ No newline at end of file
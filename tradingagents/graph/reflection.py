@@ -2,7 +2,7 @@
 # TradingAgentsX/graph/reflection.py
 
 from typing import Dict, Any
-from langchain_openai import ChatOpenAI
+from langchain_core.language_models.chat_models import BaseChatModel
 
 
 class Reflector:
@@ -11,12 +11,12 @@ class Reflector:
     這個類別的目的是評估過去的交易決策，從中學習，並將學到的知識儲存起來以供未來使用。
     """
 
-    def __init__(self, quick_thinking_llm: ChatOpenAI):
+    def __init__(self, quick_thinking_llm: BaseChatModel):
         """
         使用一個 LLM 初始化反思器。
 
         Args:
-            quick_thinking_llm (ChatOpenAI): 用於生成反思內容的語言模型。
+            quick_thinking_llm (BaseChatModel): 用於生成反思內容的語言模型。
         """
         self.quick_thinking_llm = quick_thinking_llm
         self.reflection_system_prompt = self._get_reflection_prompt()
@@ -1,15 +1,22 @@
 # -*- coding: utf-8 -*-
 # TradingAgentsX/graph/setup.py
 
-from typing import Dict, Any
-from langchain_openai import ChatOpenAI
+from typing import Any, Callable, Dict, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
 from langgraph.graph import END, StateGraph, START
-from langgraph.prebuilt import ToolNode
 
 from tradingagents.agents import *
 from tradingagents.agents.utils.agent_states import AgentState
 
 from .conditional_logic import ConditionalLogic
+from .debate_rounds import (
+    DEBATE_ROUND_PARTICIPANTS,
+    RISK_ROUND_PARTICIPANTS,
+    create_debate_round_merge,
+    create_debate_round_participant,
+    create_risk_round_merge,
+    create_risk_round_participant,
+)
 
 
 class GraphSetup:
@@ -20,29 +27,37 @@ class GraphSetup:
 
     def __init__(
         self,
-        quick_thinking_llm: ChatOpenAI,
-        deep_thinking_llm: ChatOpenAI,
-        tool_nodes: Dict[str, ToolNode],
+        quick_thinking_llm: BaseChatModel,
+        deep_thinking_llm: BaseChatModel,
+        tool_nodes: Dict[str, Callable],
         bull_memory,
         bear_memory,
         trader_memory,
         invest_judge_memory,
         risk_manager_memory,
         conditional_logic: ConditionalLogic,
+        quick_context_budget: Optional[ContextBudget] = None,
+        deep_context_budget: Optional[ContextBudget] = None,
+        parallel_invest_debate: bool = False,
+        parallel_risk_debate: bool = False,
     ):
         """
         使用必要的組件進行初始化。
 
         Args:
-            quick_thinking_llm (ChatOpenAI): 用於快速任務的 LLM。
-            deep_thinking_llm (ChatOpenAI): 用於深度分析的 LLM。
-            tool_nodes (Dict[str, ToolNode]): 包含工具節點的字典。
+            quick_thinking_llm (BaseChatModel): 用於快速任務的 LLM。
+            deep_thinking_llm (BaseChatModel): 用於深度分析的 LLM。
+            tool_nodes (Dict[str, Callable]): 包含工具節點的字典。
             bull_memory: 看漲研究員的記憶體。
             bear_memory: 看跌研究員的記憶體。
             trader_memory: 交易員的記憶體。
             invest_judge_memory: 投資裁判的記憶體。
             risk_manager_memory: 風險管理者的記憶體。
             conditional_logic (ConditionalLogic): 處理圖中條件分支的邏輯。
+            quick_context_budget (Optional[ContextBudget]): 快速思考模型節點的上下文預算。
+            deep_context_budget (Optional[ContextBudget]): 深度思考模型節點的上下文預算。
+            parallel_invest_debate (bool): 是否以回合同步模式讓看漲與看跌研究員同時發言。
+            parallel_risk_debate (bool): 是否以回合同步模式讓三位風險分析師同時發言。
         """
         self.quick_thinking_llm = quick_thinking_llm
         self.deep_thinking_llm = deep_thinking_llm
@@ -53,6 +68,10 @@ class GraphSetup:
         self.invest_judge_memory = invest_judge_memory
         self.risk_manager_memory = risk_manager_memory
         self.conditional_logic = conditional_logic
+        self.quick_context_budget = quick_context_budget or ContextBudget()
+        self.deep_context_budget = deep_context_budget or ContextBudget()
+        self.parallel_invest_debate = parallel_invest_debate
+        self.parallel_risk_debate = parallel_risk_debate
 
     def setup_graph(
         self, selected_analysts=["market", "social", "news", "fundamentals"]
@@ -106,24 +125,35 @@ class GraphSetup:
             delete_nodes["fundamentals"] = create_msg_delete()
             tool_nodes["fundamentals"] = self.tool_nodes["fundamentals"]
 
+        # 建立上下文預算節點（分析師階段結束後為報告建立一次摘要）
+        context_budgeter_node = create_context_budgeter(
+            self.quick_context_budget.max_digest_chars
+        )
+
         # 建立研究員和管理者節點
         bull_researcher_node = create_bull_researcher(
-            self.quick_thinking_llm, self.bull_memory
+            self.quick_thinking_llm, self.bull_memory, self.quick_context_budget
         )
         bear_researcher_node = create_bear_researcher(
-            self.quick_thinking_llm, self.bear_memory
+            self.quick_thinking_llm, self.bear_memory, self.quick_context_budget
         )
         research_manager_node = create_research_manager(
-            self.deep_thinking_llm, self.invest_judge_memory
+            self.deep_thinking_llm, self.invest_judge_memory, self.deep_context_budget
         )
         trader_node = create_trader(self.quick_thinking_llm, self.trader_memory)
 
         # 建立風險分析節點
-        risky_analyst = create_risky_debator(self.quick_thinking_llm)
-        neutral_analyst = create_neutral_debator(self.quick_thinking_llm)
-        safe_analyst = create_safe_debator(self.quick_thinking_llm)
+        risky_analyst = create_risky_debator(
+            self.quick_thinking_llm, self.quick_context_budget
+        )
+        neutral_analyst = create_neutral_debator(
+            self.quick_thinking_llm, self.quick_context_budget
+        )
+        safe_analyst = create_safe_debator(
+            self.quick_thinking_llm, self.quick_context_budget
+        )
         risk_manager_node = create_risk_manager(
-            self.deep_thinking_llm, self.risk_manager_memory
+            self.deep_thinking_llm, self.risk_manager_memory, self.deep_context_budget
         )
 
         # 建立工作流程
@@ -138,10 +168,22 @@ class GraphSetup:
             workflow.add_node(f"tools_{analyst_type}", tool_nodes[analyst_type])
 
         # 新增其他節點
+        workflow.add_node("Context Budgeter", context_budgeter_node)
+        if self.parallel_invest_debate:
+            # 回合同步模式：論點先寫入回合暫存，由合併節點寫回辯論狀態
+            bull_researcher_node = create_debate_round_participant(bull_researcher_node, "bull")
+            bear_researcher_node = create_debate_round_participant(bear_researcher_node, "bear")
+            workflow.add_node("Debate Round Merge", create_debate_round_merge())
         workflow.add_node("Bull Researcher", bull_researcher_node)
         workflow.add_node("Bear Researcher", bear_researcher_node)
         workflow.add_node("Research Manager", research_manager_node)
         workflow.add_node("Trader", trader_node)
+        if self.parallel_risk_debate:
+            # 回合同步模式：論點先寫入回合暫存，由合併節點寫回辯論狀態
+            risky_analyst = create_risk_round_participant(risky_analyst, "risky")
+            safe_analyst = create_risk_round_participant(safe_analyst, "safe")
+            neutral_analyst = create_risk_round_participant(neutral_analyst, "neutral")
+            workflow.add_node("Risk Round Merge", create_risk_round_merge())
         workflow.add_node("Risky Analyst", risky_analyst)
         workflow.add_node("Neutral Analyst", neutral_analyst)
         workflow.add_node("Safe Analyst", safe_analyst)
@@ -166,56 +208,83 @@ class GraphSetup:
             )
             workflow.add_edge(current_tools, current_analyst)
 
-            # 連接到下一個分析師，如果是最後一個分析師，則連接到看漲研究員
+            # 連接到下一個分析師，如果是最後一個分析師，則經由上下文預算節點連接到看漲研究員
             if i < len(selected_analysts) - 1:
                 next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
                 workflow.add_edge(current_clear, next_analyst)
             else:
-                workflow.add_edge(current_clear, "Bull Researcher")
+                workflow.add_edge(current_clear, "Context Budgeter")
+
 
         # 新增剩餘的邊
-        workflow.add_conditional_edges(
-            "Bull Researcher",
-            self.conditional_logic.should_continue_debate,
-            {
-                "Bear Researcher": "Bear Researcher",
-                "Research Manager": "Research Manager",
-            },
-        )
-        workflow.add_conditional_edges(
-            "Bear Researcher",
-            self.conditional_logic.should_continue_debate,
-            {
-                "Bull Researcher": "Bull Researcher",
-                "Research Manager": "Research Manager",
-            },
-        )
+        if self.parallel_invest_debate:
+            # 看漲與看跌研究員同時依上一回合的狀態發言，兩者完成後才合併並進入下一回合
+            researchers = [name for name, _ in DEBATE_ROUND_PARTICIPANTS]
+            for name in researchers:
+                workflow.add_edge("Context Budgeter", name)
+            workflow.add_edge(researchers, "Debate Round Merge")
+            workflow.add_conditional_edges(
+                "Debate Round Merge",
+                self.conditional_logic.should_continue_debate_round,
+                researchers + ["Research Manager"],
+            )
+        else:
+            workflow.add_edge("Context Budgeter", "Bull Researcher")
+            workflow.add_conditional_edges(
+                "Bull Researcher",
+                self.conditional_logic.should_continue_debate,
+                {
+                    "Bear Researcher": "Bear Researcher",
+                    "Research Manager": "Research Manager",
+                },
+            )
+            workflow.add_conditional_edges(
+                "Bear Researcher",
+                self.conditional_logic.should_continue_debate,
+                {
+                    "Bull Researcher": "Bull Researcher",
+                    "Research Manager": "Research Manager",
+                },
+            )
+
         workflow.add_edge("Research Manager", "Trader")
-        workflow.add_edge("Trader", "Risky Analyst")
-        workflow.add_conditional_edges(
-            "Risky Analyst",
-            self.conditional_logic.should_continue_risk_analysis,
-            {
-                "Safe Analyst": "Safe Analyst",
-                "Risk Judge": "Risk Judge",
-            },
-        )
-        workflow.add_conditional_edges(
-            "Safe Analyst",
-            self.conditional_logic.should_continue_risk_analysis,
-            {
-                "Neutral Analyst": "Neutral Analyst",
-                "Risk Judge": "Risk Judge",
-            },
-        )
-        workflow.add_conditional_edges(
-            "Neutral Analyst",
-            self.conditional_logic.should_continue_risk_analysis,
-            {
-                "Risky Analyst": "Risky Analyst",
-                "Risk Judge": "Risk Judge",
-            },
-        )
+        if self.parallel_risk_debate:
+            # 三位分析師同時依上一回合的狀態發言，全部完成後才合併並進入下一回合
+            risk_debators = [name for name, _, _ in RISK_ROUND_PARTICIPANTS]
+            for name in risk_debators:
+                workflow.add_edge("Trader", name)
+            workflow.add_edge(risk_debators, "Risk Round Merge")
+            workflow.add_conditional_edges(
+                "Risk Round Merge",
+                self.conditional_logic.should_continue_risk_round,
+                risk_debators + ["Risk Judge"],
+            )
+        else:
+            workflow.add_edge("Trader", "Risky Analyst")
+            workflow.add_conditional_edges(
+                "Risky Analyst",
+                self.conditional_logic.should_continue_risk_analysis,
+                {
+                    "Safe Analyst": "Safe Analyst",
+                    "Risk Judge": "Risk Judge",
+                },
+            )
+            workflow.add_conditional_edges(
+                "Safe Analyst",
+                self.conditional_logic.should_continue_risk_analysis,
+                {
+                    "Neutral Analyst": "Neutral Analyst",
+                    "Risk Judge": "Risk Judge",
+                },
+            )
+            workflow.add_conditional_edges(
+                "Neutral Analyst",
+                self.conditional_logic.should_continue_risk_analysis,
+                {
+                    "Risky Analyst": "Risky Analyst",
+                    "Risk Judge": "Risk Judge",
+                },
+            )
 
         workflow.add_edge("Risk Judge", END)
 
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+# TradingAgentsX/graph/sharded_runner.py
+
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from multiprocessing.connection import Connection, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+WorkItem = Tuple[str, str]  # (股票代碼, 交易日期)
+
+# 同一個工作項目使工作行程崩潰達到此次數後，記為錯誤並跳過
+MAX_ITEM_CRASHES = 2
+
+
+def build_trading_graph(selected_analysts: Sequence[str], config: Dict[str, Any]):
+    """預設的圖工廠：在工作行程中建立 TradingAgentsXGraph。"""
+    from .trading_graph import TradingAgentsXGraph
+
+    return TradingAgentsXGraph(list(selected_analysts), config=config)
+
+
+def plan_shards(items: Iterable[WorkItem], num_shards: int) -> List[List[WorkItem]]:
+    """
+    將工作項目分配到分片。
+
+    同一股票代碼的所有日期一定放在同一分片並依日期排序，讓工作行程內的股價、指標與
+    asof 快照快取可以重用，每個股票的狀態記錄檔也只有一個寫入者（多個行程附加同一檔案時，
+    記錄的位元組位移會互相失效）。因此分片數不會超過股票代碼數。各股票以最長處理時間優先
+    的方式分配給目前負載最小的分片。
+
+    Args:
+        items (Iterable[WorkItem]): (股票代碼, 交易日期) 工作項目。
+        num_shards (int): 分片數量上限（工作行程數）。
+
+    Returns:
+        List[List[WorkItem]]: 每個分片的工作項目，空的分片會被省略。
+    """
+    by_ticker: Dict[str, List[str]] = {}
+    for ticker, trade_date in items:
+        by_ticker.setdefault(ticker, []).append(trade_date)
+
+    groups = [
+        [(ticker, trade_date) for trade_date in sorted(set(dates))]
+        for ticker, dates in sorted(by_ticker.items())
+    ]
+
+    shards: List[List[WorkItem]] = [[] for _ in range(max(min(num_shards, len(groups)), 1))]
+    for group in sorted(groups, key=len, reverse=True):
+        min(shards, key=len).extend(group)
+    return [shard for shard in shards if shard]
+
+
+def split_rate_limits(config: Dict[str, Any], num_shards: int) -> Dict[str, Any]:
+    """
+    返回每個工作行程使用的設定：rate_limits 中的每分鐘速率平均分給各行程。
+
+    限速器是行程內的狀態，不跨行程共用；平分後各行程速率的總和不超過原設定。
+    """
+    if num_shards <= 1 or not config.get("rate_limits"):
+        return config
+    rate_limits = {
+        host: {
+            name: value / num_shards if value and name.endswith("_per_minute") else value
+            for name, value in limits.items()
+        }
+        for host, limits in config["rate_limits"].items()
+    }
+    return {**config, "rate_limits": rate_limits}
+
+
+def _shard_worker(
+    shard_id: int,
+    items: List[WorkItem],
+    selected_analysts: List[str],
+    config: Dict[str, Any],
+    graph_factory: Callable,
+    results: Connection,
+) -> None:
+    """
+    工作行程：建立一次圖，依序執行分片中的項目，並將每個結果送回協調者。
+
+    結果以管道同步送出，行程在下一個項目崩潰時已送出的結果不會遺失。
+    """
+    from tradingagents.utils.logging_utils import configure_logging
+
+    # 工作行程是獨立的進入點，依設定各自設定一次日誌
+    configure_logging(config.get("log_level"), config.get("log_format"))
+    try:
+        graph = graph_factory(selected_analysts, config)
+    except Exception as e:
+        results.send({"type": "fatal", "shard": shard_id, "error": f"{type(e).__name__}: {e}"})
+        return
+
+    for ticker, trade_date in items:
+        results.send({"type": "start", "shard": shard_id, "ticker": ticker, "trade_date": trade_date})
+        started = time.perf_counter()
+        record = {"type": "result", "shard": shard_id, "ticker": ticker, "trade_date": trade_date}
+        try:
+            final_state, decision = graph.propagate(ticker, trade_date)
+            profile = final_state.get("run_profile") or {}
+            record.update({
+                "status": "ok",
+                "decision": decision,
+                "final_trade_decision": final_state.get("final_trade_decision"),
+                "investment_plan": final_state.get("investment_plan"),
+                "profile_totals": profile.get("totals"),
+            })
+        except Exception as e:
+            record.update({
+                "status": "error",
+                "error": f"{type(e).__name__}: {e}",
+                "traceback": traceback.format_exc(limit=5),
+            })
+        record["seconds"] = round(time.perf_counter() - started, 3)
+        results.send(record)
+
+    # 確保背景的狀態記錄在行程結束前寫入
+    state_logger = getattr(graph, "state_logger", None)
+    if state_logger is not None:
+        state_logger.flush()
+
+
+class ShardedRunner:
+    """
+    以多個工作行程平行執行大量 (股票代碼, 交易日期) 分析，例如觀察清單或回測。
+
+    - 工作依股票代碼分片，每個工作行程只建立一次圖並依日期順序執行
+    - 工作行程共用磁碟上的資料快取（data_cache_dir、asof 快照、Alpha Vantage 回應）；
+      記憶庫在每個行程中唯讀使用，不會呼叫 reflect_and_remember
+    - Alpha Vantage 每日額度的計數檔以檔案鎖更新，各行程共用同一份計數；
+      每分鐘速率（rate_limits）則平均分給各工作行程，總和不超過設定值。
+      尚未涵蓋：平分是靜態的，先完成的分片空出的速率不會轉給其他分片；
+      同時在本執行器之外使用相同金鑰的行程（例如後端）的速率也不會一併協調
+    - 結果經由管道即時送回協調者，由協調者以每行一筆 JSON 附加到單一結果檔並立即寫出
+    - 中斷後以相同的結果檔重新執行時，只會執行尚未成功的項目（崩潰續跑）
+    - 工作行程崩潰時以剩餘項目重新啟動該分片；反覆導致崩潰的項目記為錯誤
+    """
+
+    def __init__(
+        self,
+        results_path: str,
+        selected_analysts: Sequence[str] = ("market", "social", "news", "fundamentals"),
+        config: Optional[Dict[str, Any]] = None,
+        num_workers: Optional[int] = None,
+        graph_factory: Callable = build_trading_graph,
+        on_progress: Optional[Callable[[Dict[str, Any], Dict[int, Dict[str, Any]]], None]] = None,
+    ):
+        """
+        Args:
+            results_path (str): JSONL 結果檔路徑，也是續跑時判斷已完成項目的依據。
+            selected_analysts (Sequence[str]): 要包含的分析師類型。
+            config (Optional[Dict[str, Any]]): 傳給每個工作行程的設定（需可序列化）；None 時使用預設設定。
+            num_workers (Optional[int]): 工作行程數上限，預設為 CPU 核心數；實際不超過股票代碼數。
+            graph_factory (Callable): 在工作行程中以 (selected_analysts, config) 建立圖的模組層級函式。
+            on_progress (Optional[Callable]): 每寫入一筆結果時以 (結果, 各分片進度) 呼叫。
+        """
+        from tradingagents.default_config import DEFAULT_CONFIG
+
+        self.results_path = Path(results_path)
+        self.selected_analysts = list(selected_analysts)
+        self.config = dict(config or DEFAULT_CONFIG)
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.graph_factory = graph_factory
+        self.on_progress = on_progress
+        # 各分片進度：{分片: {"total", "done", "errors", "restarts", "current"}}
+        self.progress: Dict[int, Dict[str, Any]] = {}
+
+    def completed_items(self) -> Set[WorkItem]:
+        """從結果檔讀取已成功完成的項目；忽略中斷時寫到一半的行。"""
+        completed: Set[WorkItem] = set()
+        if not self.results_path.exists():
+            return completed
+        with open(self.results_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("status") == "ok":
+                    completed.add((record["ticker"], record["trade_date"]))
+        return completed
+
+    def _open_results(self):
+        self.results_path.parent.mkdir(parents=True, exist_ok=True)
+        # 上次中斷時若停在半行，先補上換行，讓新記錄從新的一行開始
+        if self.results_path.exists() and self.results_path.stat().st_size:
+            with open(self.results_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+            if needs_newline:
+                with open(self.results_path, "ab") as f:
+                    f.write(b"\n")
+        return open(self.results_path, "a", encoding="utf-8")
+
+    def run(self, items: Iterable[WorkItem]) -> Dict[int, Dict[str, Any]]:
+        """
+        執行所有尚未完成的項目，直到全部寫入結果檔。
+
+        Args:
+            items (Iterable[WorkItem]): (股票代碼, 交易日期) 工作項目。
+
+        Returns:
+            Dict[int, Dict[str, Any]]: 各分片的最終進度。
+        """
+        completed = self.completed_items()
+        pending = [(ticker, str(trade_date)) for ticker, trade_date in items if (ticker, str(trade_date)) not in completed]
+        shards = plan_shards(pending, self.num_workers)
+        self.progress = {
+            shard_id: {"total": len(shard), "done": 0, "errors": 0, "restarts": 0, "current": None}
+            for shard_id, shard in enumerate(shards)
+        }
+        if not shards:
+            return self.progress
+
+        # spawn：工作行程不繼承協調者的執行緒與連線池
+        context = multiprocessing.get_context("spawn")
+        remaining = {shard_id: list(shard) for shard_id, shard in enumerate(shards)}
+        worker_config = split_rate_limits(self.config, len(shards))
+        crashes: Dict[WorkItem, int] = {}
+        processes: Dict[int, multiprocessing.Process] = {}
+        connections: Dict[int, Connection] = {}
+
+        def start(shard_id: int) -> None:
+            reader, writer = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_shard_worker,
+                args=(shard_id, remaining[shard_id], self.selected_analysts, worker_config, self.graph_factory, writer),
+                name=f"tradingagents-shard-{shard_id}",
+                daemon=True,
+            )
+            process.start()
+            # 關閉協調者端的寫入端，工作行程結束時讀取端才會收到 EOF
+            writer.close()
+            processes[shard_id] = process
+            connections[shard_id] = reader
+
+        with self._open_results() as out:
+
+            def write(record: Dict[str, Any]) -> None:
+                record.pop("type", None)
+                out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                out.flush()
+                stats = self.progress[record["shard"]]
+                stats["done"] += 1
+                stats["errors"] += int(record["status"] != "ok")
+                stats["current"] = None
+                if self.on_progress is not None:
+                    self.on_progress(record, self.progress)
+
+            def handle(message: Dict[str, Any]) -> None:
+                shard_id = message["shard"]
+                if message["type"] == "start":
+                    self.progress[shard_id]["current"] = (message["ticker"], message["trade_date"])
+                elif message["type"] == "result":
+                    key = (message["ticker"], message["trade_date"])
+                    if key in remaining[shard_id]:
+                        remaining[shard_id].remove(key)
+                        write(message)
+                elif message["type"] == "fatal":
+                    # 無法建立圖時整個分片都無法執行，全部記為錯誤
+                    for ticker, trade_date in remaining[shard_id]:
+                        write({"shard": shard_id, "ticker": ticker, "trade_date": trade_date,
+                               "status": "error", "error": message["error"]})
+                    remaining[shard_id] = []
+
+            def finished(shard_id: int) -> None:
+                connections.pop(shard_id).close()
+                process = processes[shard_id]
+                process.join()
+                if not remaining[shard_id]:
+                    return
+                # 工作行程在完成前結束：視為崩潰，以剩餘項目重新啟動
+                current = self.progress[shard_id]["current"] or remaining[shard_id][0]
+                crashes[current] = crashes.get(current, 0) + 1
+                if crashes[current] >= MAX_ITEM_CRASHES and current in remaining[shard_id]:
+                    remaining[shard_id].remove(current)
+                    write({"shard": shard_id, "ticker": current[0], "trade_date": current[1],
+                           "status": "error",
+                           "error": f"工作行程在此項目崩潰 {crashes[current]} 次（結束代碼 {process.exitcode}）"})
+                if remaining[shard_id]:
+                    self.progress[shard_id]["restarts"] += 1
+                    self.progress[shard_id]["current"] = None
+                    start(shard_id)
+
+            for shard_id in remaining:
+                start(shard_id)
+            try:
+                while connections:
+                    for reader in wait(list(connections.values())):
+                        shard_id = next(key for key, conn in connections.items() if conn is reader)
+                        try:
+                            handle(reader.recv())
+                        except EOFError:
+                            finished(shard_id)
+            finally:
+                for process in processes.values():
+                    if process.is_alive():
+                        process.terminate()
+                    process.join(timeout=5)
+
+        return self.progress
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 # TradingAgentsX/graph/signal_processing.py
 
-from langchain_openai import ChatOpenAI
+from langchain_core.language_models.chat_models import BaseChatModel
 
 
 class SignalProcessor:
@@ -11,12 +11,12 @@ class SignalProcessor:
     轉換為標準化的、機器可讀的決策（例如 "BUY", "SELL", "HOLD"）。
     """
 
-    def __init__(self, quick_thinking_llm: ChatOpenAI):
+    def __init__(self, quick_thinking_llm: BaseChatModel):
         """
         使用一個 LLM 進行初始化以進行處理。
 
         Args:
-            quick_thinking_llm (ChatOpenAI): 用於提取決策的語言模型。
+            quick_thinking_llm (BaseChatModel): 用於提取決策的語言模型。
         """
         self.quick_thinking_llm = quick_thinking_llm
 
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# TradingAgentsX/graph/state_log.py
+
+import atexit
+import json
+import logging
+import os
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 所有記錄器共用一個背景寫入執行緒（首次寫入時建立）；單一工作執行緒確保寫入順序與呼叫順序一致
+_executor: Optional[ThreadPoolExecutor] = None
+_registry_lock = threading.Lock()
+# 每個記錄目錄一個共用的記錄器，同一檔案只有一份日期索引
+_loggers: Dict[str, "StateLogger"] = {}
+_instances: "weakref.WeakSet[StateLogger]" = weakref.WeakSet()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _registry_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-log")
+        return _executor
+
+
+def get_state_logger(log_dir: str = "eval_results") -> "StateLogger":
+    """
+    返回記錄目錄共用的狀態記錄器。
+
+    每次建立圖（例如後端每個請求）都重用同一個記錄器，不會累積執行緒與 atexit 註冊，
+    同一檔案的日期索引也只有一份。
+    """
+    key = os.path.abspath(log_dir)
+    with _registry_lock:
+        state_logger = _loggers.get(key)
+        if state_logger is None:
+            state_logger = _loggers[key] = StateLogger(log_dir)
+        return state_logger
+
+
+def _log_write_error(future: Future) -> None:
+    """背景寫入失敗時記錄錯誤，避免例外只留在無人檢查的 Future 中。"""
+    error = future.exception()
+    if error is not None:
+        logger.error("寫入狀態記錄失敗：%s", error, exc_info=error)
+
+
+def _parse_line(line) -> Optional[Dict[str, Any]]:
+    """解析一行記錄；空行或損壞的行（例如中斷時留下的半行）返回 None。"""
+    if not line.strip():
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or "trade_date" not in record:
+        return None
+    return record
+
+
+@atexit.register
+def _flush_all() -> None:
+    """行程結束前寫入所有記錄器尚未完成的記錄。"""
+    for state_logger in list(_instances):
+        state_logger.flush()
+
+
+class StateLogger:
+    """
+    以僅附加（append-only）的 JSONL 檔案記錄每次執行的最終狀態。
+    每個股票代碼一個檔案，每次 `propagate` 只寫入一行記錄，
+    寫入在共用的背景執行緒中進行，不會阻塞圖的執行。
+    檔案內的位元組偏移量會依交易日期建立索引，方便之後反思時按日期讀取。
+    一般應以 get_state_logger 取得記錄目錄共用的實例。
+    """
+
+    def __init__(self, log_dir: str = "eval_results"):
+        """
+        初始化狀態記錄器。
+
+        Args:
+            log_dir (str): 記錄檔的根目錄，每個股票代碼位於其下的子目錄中。
+        """
+        self.log_dir = log_dir
+        self._pending: List[Future] = []
+        self._lock = threading.Lock()
+        # 檔案路徑 -> {交易日期: 位元組偏移量}，同一日期以最後一筆為準
+        self._index: Dict[Path, Dict[str, int]] = {}
+        _instances.add(self)
+
+    def log_path(self, ticker: str) -> Path:
+        """返回指定股票代碼的 JSONL 記錄檔路徑。"""
+        return Path(self.log_dir) / ticker / "TradingAgentsXStrategy_logs" / "full_states_log.jsonl"
+
+    def append(self, ticker: str, trade_date: str, record: Dict[str, Any]) -> Future:
+        """
+        將一筆記錄排入背景執行緒寫入。
+
+        Args:
+            ticker (str): 股票代碼。
+            trade_date (str): 交易日期，作為索引鍵。
+            record (Dict[str, Any]): 要寫入的狀態記錄。
+
+        Returns:
+            Future: 寫入完成時結束的 Future。
+        """
+        line = json.dumps({"trade_date": str(trade_date), "state": record}, ensure_ascii=False)
+        future = _get_executor().submit(self._write, self.log_path(ticker), str(trade_date), line)
+        future.add_done_callback(_log_write_error)
+        with self._lock:
+            self._pending = [f for f in self._pending if not f.done()]
+            self._pending.append(future)
+        return future
+
+    def flush(self) -> None:
+        """等待所有尚未完成的寫入（失敗的寫入已由完成回呼記錄，不在此重新拋出）。"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        wait(pending)
+
+    def read(self, ticker: str, trade_date: str) -> Optional[Dict[str, Any]]:
+        """
+        按交易日期讀取一筆記錄。
+
+        Args:
+            ticker (str): 股票代碼。
+            trade_date (str): 交易日期。
+
+        Returns:
+            Optional[Dict[str, Any]]: 狀態記錄，若不存在則為 None。
+        """
+        self.flush()
+        path = self.log_path(ticker)
+        offset = self._get_index(path).get(str(trade_date))
+        if offset is None:
+            return None
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())["state"]
+
+    def iter_records(self, ticker: str) -> Iterator[Dict[str, Any]]:
+        """依寫入順序逐筆產生 {"trade_date", "state"} 記錄。"""
+        self.flush()
+        path = self.log_path(ticker)
+        if not path.exists():
+            return
+        with open(path, "rb") as f:
+            for line in f:
+                record = _parse_line(line)
+                if record is not None:
+                    yield record
+
+    def trade_dates(self, ticker: str) -> List[str]:
+        """返回已記錄的所有交易日期。"""
+        self.flush()
+        return list(self._get_index(self.log_path(ticker)))
+
+    def _get_index(self, path: Path) -> Dict[str, int]:
+        """返回檔案的日期索引，首次使用時掃描整個檔案建立。"""
+        with self._lock:
+            index = self._index.get(path)
+            if index is not None:
+                return index
+            index = {}
+            if path.exists():
+                with open(path, "rb") as f:
+                    offset = 0
+                    for line in f:
+                        record = _parse_line(line)
+                        if record is not None:
+                            index[record["trade_date"]] = offset
+                        elif line.strip():
+                            logger.warning("略過 %s 中位移 %d 的損壞記錄", path, offset)
+                        offset += len(line)
+            self._index[path] = index
+            return index
+
+    def _write(self, path: Path, trade_date: str, line: str) -> None:
+        """在背景執行緒中將一行附加到檔案並更新索引。"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        index = self._get_index(path)
+        with open(path, "ab+") as f:
+            offset = f.seek(0, os.SEEK_END)
+            # 上次中斷時若停在半行，先補上換行，讓新記錄從新的一行開始
+            if offset:
+                f.seek(offset - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+                    offset += 1
+            f.write(line.encode("utf-8") + b"\n")
+        with self._lock:
+            index[trade_date] = offset
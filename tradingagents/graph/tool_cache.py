@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# TradingAgentsX/graph/tool_cache.py
+
+import json
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import get_executor_for_config
+from langchain_core.tools import BaseTool
+
+from tradingagents.utils.instrumentation import get_current_profile
+
+# 進行中的預先抓取（prefetch.PrefetchBatch），由 DataPrefetcher.run 設定
+_current_prefetch: ContextVar[Optional[Any]] = ContextVar("current_prefetch", default=None)
+
+
+def get_current_prefetch():
+    """返回目前上下文中進行中的預先抓取，沒有時返回 None。"""
+    return _current_prefetch.get()
+
+
+@contextmanager
+def use_prefetch(batch) -> Iterator[None]:
+    """在此區塊內讓工具節點與初始狀態建立可以取用預先抓取的結果。"""
+    token = _current_prefetch.set(batch)
+    try:
+        yield
+    finally:
+        _current_prefetch.reset(token)
+
+
+# 供應商以一般字串回傳的失敗或無資料結果，例如 "檢索 NVDA 的資產負債表時出錯：…"、
+# "找不到 'NVDA' 的內部人士交易數據"、"錯誤：RSI 沒有返回數據"；這些結果不寫入快取，之後的呼叫會重新嘗試
+_FAILED_RESULT = re.compile(r"^\s*(?:錯誤：|檢索 .*?時出錯：|找不到 )")
+
+
+def is_failed_result(content: Any) -> bool:
+    """工具結果是否為供應商回傳的錯誤或無資料訊息。"""
+    return isinstance(content, str) and _FAILED_RESULT.match(content) is not None
+
+
+def tool_cache_key(tool: BaseTool, args: Dict[str, Any]) -> str:
+    """
+    以工具名稱與參數建立快取鍵，例如 get_news({"end_date": ..., "start_date": ..., "ticker": "NVDA"})。
+    省略的參數會補上工具的預設值，讓省略與明確傳入預設值的呼叫共用同一個結果。
+    """
+    normalized = {
+        name: schema["default"]
+        for name, schema in tool.args.items()
+        if "default" in schema
+    }
+    normalized.update(args or {})
+    return f"{tool.name}({json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)})"
+
+
+def create_cached_tool_node(tools: Sequence[BaseTool]) -> Callable:
+    """
+    建立會先查詢本次執行工具快取的工具節點，取代 langgraph 的 ToolNode。
+
+    快取存放在狀態的 tool_cache 中（鍵為工具名稱與參數），所有分析師的工具節點共用，
+    因此同一次 propagate 中相同的工具呼叫只會真正執行一次，執行後也可從最終狀態檢視內容。
+    快取未命中時會先查詢進行中的預先抓取，等待其結果而不是重新送出。
+    工具失敗時與 ToolNode 相同，回傳錯誤訊息給模型，但不寫入快取；供應商以字串回傳的錯誤或無資料結果同樣不快取。
+
+    Args:
+        tools (Sequence[BaseTool]): 此節點可使用的工具。
+
+    Returns:
+        Callable: 可在 langgraph 中使用的節點函式。
+    """
+    tools_by_name = {tool.name: tool for tool in tools}
+
+    def run_tool_call(call: Dict[str, Any], config: RunnableConfig) -> ToolMessage:
+        tool = tools_by_name.get(call["name"])
+        if tool is None:
+            return ToolMessage(
+                content=f"Error: {call['name']} is not a valid tool, try one of [{', '.join(tools_by_name)}].",
+                name=call["name"],
+                tool_call_id=call["id"],
+                status="error",
+            )
+        try:
+            return tool.invoke(call, config)
+        except Exception as e:
+            return ToolMessage(
+                content=f"Error: {e!r}\n Please fix your mistakes.",
+                name=call["name"],
+                tool_call_id=call["id"],
+                status="error",
+            )
+
+    def cached_tool_node(state, config: RunnableConfig) -> dict:
+        cache = state.get("tool_cache") or {}
+        tool_calls = state["messages"][-1].tool_calls
+        profile = get_current_profile()
+        prefetch = get_current_prefetch()
+
+        messages: List[Optional[ToolMessage]] = [None] * len(tool_calls)
+        keys: List[Optional[str]] = [None] * len(tool_calls)
+        pending = []
+        prefetched = []
+        for index, call in enumerate(tool_calls):
+            tool = tools_by_name.get(call["name"])
+            if tool is not None:
+                keys[index] = tool_cache_key(tool, call["args"])
+            content = cache.get(keys[index]) if keys[index] is not None else None
+            if content is None and prefetch is not None and keys[index] is not None:
+                content = prefetch.get(keys[index])
+                # 預先抓取失敗的結果（錯誤或無資料訊息）視為未命中，改為即時重新呼叫
+                if is_failed_result(content):
+                    content = None
+                if content is not None:
+                    prefetched.append(index)
+            if profile is not None and tool is not None:
+                profile.record_cache("tool", content is not None)
+            if content is not None:
+                messages[index] = ToolMessage(
+                    content=content, name=call["name"], tool_call_id=call["id"]
+                )
+            else:
+                pending.append(index)
+
+        # 未命中的呼叫與 ToolNode 相同，平行執行（執行緒保留剖析等 contextvars）
+        if len(pending) == 1:
+            messages[pending[0]] = run_tool_call(tool_calls[pending[0]], config)
+        elif pending:
+            with get_executor_for_config(config) as executor:
+                results = executor.map(
+                    lambda index: run_tool_call(tool_calls[index], config), pending
+                )
+                for index, message in zip(pending, results):
+                    messages[index] = message
+
+        new_entries = {keys[index]: messages[index].content for index in prefetched}
+        for index in pending:
+            message = messages[index]
+            if keys[index] is not None and message.status != "error" and not is_failed_result(message.content):
+                new_entries[keys[index]] = message.content
+        return {"messages": messages, "tool_cache": new_entries}
+
+    return cached_tool_node
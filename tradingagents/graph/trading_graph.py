@@ -1,19 +1,13 @@
 # -*- coding: utf-8 -*-
 # TradingAgentsX/graph/trading_graph.py
 
+import logging
 import os
+from contextlib import nullcontext
 from pathlib import Path
 import json
 from datetime import date
-from typing import Dict, Any, Tuple, List, Optional
-
-# 匯入各種 LLM 的聊天模型
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_google_genai import ChatGoogleGenerativeAI
-
-# 從 langgraph 匯入 ToolNode，用於將工具轉換為圖中的節點
-from langgraph.prebuilt import ToolNode
+from typing import Callable, Dict, Any, Tuple, List, Optional
 
 # 匯入專案內部的代理、設定和狀態管理模組
 from tradingagents.agents import *
@@ -24,7 +18,10 @@ from tradingagents.agents.utils.agent_states import (
     InvestDebateState,
     RiskDebateState,
 )
-from tradingagents.dataflows.config import set_config
+from tradingagents.dataflows.config import make_snapshot, set_config, use_config
+from tradingagents.utils.llm_cache import CachedChatModel, ResponseCache
+from tradingagents.utils.client_pool import client_registry
+from tradingagents.utils.instrumentation import ProfilingCallbackHandler, profile_run
 
 # 從 agent_utils 匯入新的抽象工具方法
 from tradingagents.agents.utils.agent_utils import (
@@ -42,10 +39,16 @@ from tradingagents.agents.utils.agent_utils import (
 
 # 匯入圖的其他組件
 from .conditional_logic import ConditionalLogic
+from .convergence import ConvergenceDetector
 from .setup import GraphSetup
+from .tool_cache import create_cached_tool_node
+from .prefetch import DataPrefetcher
 from .propagation import Propagator
 from .reflection import Reflector
 from .signal_processing import SignalProcessor
+from .state_log import get_state_logger
+
+logger = logging.getLogger(__name__)
 
 
 class TradingAgentsXGraph:
@@ -72,8 +75,12 @@ class TradingAgentsXGraph:
         self.debug = debug
         self.config = config or DEFAULT_CONFIG
 
-        # 更新介面的設定
-        set_config(self.config)
+        # 本圖每次執行使用的不可變設定快照；並行的圖各自看到自己的設定
+        self.config_snapshot = make_snapshot(self.config)
+
+        # 更新行程層級的預設設定（供執行之外直接呼叫資料工具時使用）
+        # API 金鑰只留在本圖的快照中，不寫入行程共用的設定，避免被同一行程內的其他使用者取用
+        set_config({key: value for key, value in self.config.items() if not key.endswith("_api_key")})
 
         # 建立必要的目錄
         os.makedirs(
@@ -93,42 +100,47 @@ class TradingAgentsXGraph:
         deep_api_key = self.config.get("deep_think_api_key", os.getenv("OPENAI_API_KEY"))
         quick_api_key = self.config.get("quick_think_api_key", os.getenv("OPENAI_API_KEY"))
         
-        # Helper to initialize LLM based on URL/Provider
-        def _create_llm(model: str, base_url: str, api_key: str):
-            # Determine provider based on Base URL
-            if "anthropic.com" in base_url:
-                # Claude 4.5 API restriction: cannot use both temperature and top_p
-                # Only use temperature, set top_p to None explicitly
-                return ChatAnthropic(
-                    model=model, 
-                    base_url=base_url, 
-                    api_key=api_key,
-                    max_tokens=16000,  # Prevent report truncation
-                    temperature=0.7,   # Use temperature for randomness control
-                    top_p=None         # Explicitly set to None to avoid conflict
-                )
-            else:
-                # Default to ChatOpenAI for OpenAI, Grok, DeepSeek, Qwen, and other OpenAI-compatible APIs
-                return ChatOpenAI(
-                    model=model,
-                    base_url=base_url,
-                    openai_api_key=api_key,
-                    max_tokens=16000  # Prevent report truncation
-                )
+        # 聊天模型由行程層級的登錄表共用：同一供應商、金鑰與限速設定共用連線池與速率限制
+        # 只更新連線池大小（影響之後新建立的連線池），不重設其他執行中分析的限速器
+        client_registry.configure(pool_size=self.config.get("http_pool_size"))
+        rate_limits = self.config.get("rate_limits")
+
+        # LLM 回應錄製/重播快取（passthrough 時不包裝）
+        llm_cache = ResponseCache(
+            self.config.get("llm_cache_dir", DEFAULT_CONFIG["llm_cache_dir"]),
+            self.config.get("llm_cache_mode", "passthrough"),
+        )
+
+        def _create_cached_llm(model: str, base_url: str, api_key: str, label: str):
+            # replay 模式完全由快取回應，不建立真實的客戶端
+            inner = None
+            if llm_cache.mode != "replay":
+                logger.debug("Initializing %s LLM: Model=%s, BaseURL=%s", label, model, base_url)
+                inner = client_registry.get_chat_model(model, base_url, api_key, rate_limits)
+            if llm_cache.mode == "passthrough":
+                return inner
+            logger.debug("%s LLM cache mode=%s, dir=%s", label, llm_cache.mode, llm_cache.cache_dir)
+            return CachedChatModel(
+                model_name=model,
+                response_cache=llm_cache,
+                inner=inner,
+                params={"max_tokens": 16000},
+                provider="anthropic" if "anthropic.com" in base_url else "openai",
+            )
 
         # Initialize LLMs independently
-        print(f"DEBUG: Initializing Deep Thinking LLM: Model={self.config['deep_think_llm']}, BaseURL={deep_base_url}, Key={deep_api_key[:10]}...")
-        self.deep_thinking_llm = _create_llm(
+        self.deep_thinking_llm = _create_cached_llm(
             self.config["deep_think_llm"],
             deep_base_url,
-            deep_api_key
+            deep_api_key,
+            "Deep Thinking",
         )
         
-        print(f"DEBUG: Initializing Quick Thinking LLM: Model={self.config['quick_think_llm']}, BaseURL={quick_base_url}, Key={quick_api_key[:10]}...")
-        self.quick_thinking_llm = _create_llm(
+        self.quick_thinking_llm = _create_cached_llm(
             self.config["quick_think_llm"],
             quick_base_url,
-            quick_api_key
+            quick_api_key,
+            "Quick Thinking",
         )
 
         # 初始化記憶體
@@ -142,7 +154,15 @@ class TradingAgentsXGraph:
         self.tool_nodes = self._create_tool_nodes()
 
         # 初始化組件
-        self.conditional_logic = ConditionalLogic()
+        novelty_threshold = self.config.get("debate_novelty_threshold")
+        # 辯論回合數依設定（後端與 CLI 的 research_depth）：每增加一回合，投資辯論多 2 次、風險討論多 3 次 LLM 呼叫
+        self.conditional_logic = ConditionalLogic(
+            max_debate_rounds=self.config.get("max_debate_rounds", 1),
+            max_risk_discuss_rounds=self.config.get("max_risk_discuss_rounds", 1),
+            convergence=(
+                ConvergenceDetector(novelty_threshold) if novelty_threshold is not None else None
+            ),
+        )
         self.graph_setup = GraphSetup(
             self.quick_thinking_llm,
             self.deep_thinking_llm,
@@ -153,24 +173,43 @@ class TradingAgentsXGraph:
             self.invest_judge_memory,
             self.risk_manager_memory,
             self.conditional_logic,
+            quick_context_budget=ContextBudget(
+                self.config.get("quick_think_context_tokens"),
+                self.config.get("report_digest_chars", 600),
+            ),
+            deep_context_budget=ContextBudget(
+                self.config.get("deep_think_context_tokens"),
+                self.config.get("report_digest_chars", 600),
+            ),
+            parallel_invest_debate=self.config.get("parallel_invest_debate", False),
+            parallel_risk_debate=self.config.get("parallel_risk_debate", False),
         )
 
         self.propagator = Propagator()
+        # 啟用時，propagate 開始就在背景平行抓取可預測的資料，預熱本次執行的工具快取
+        self.prefetcher = (
+            DataPrefetcher(selected_analysts)
+            if self.config.get("prefetch_tool_data", False)
+            else None
+        )
         self.reflector = Reflector(self.quick_thinking_llm)
         self.signal_processor = SignalProcessor(self.quick_thinking_llm)
 
         # 狀態追蹤
         self.curr_state = None
         self.ticker = None
-        self.log_states_dict = {}  # 日期到完整狀態字典的映射
+        self.state_logger = get_state_logger()  # 僅附加的狀態記錄，可按日期讀取；同一目錄的圖共用
 
         # 設定圖
         self.graph = self.graph_setup.setup_graph(selected_analysts)
 
-    def _create_tool_nodes(self) -> Dict[str, ToolNode]:
-        """使用抽象方法為不同的資料來源建立工具節點。"""
+    def _create_tool_nodes(self) -> Dict[str, Callable]:
+        """
+        使用抽象方法為不同的資料來源建立工具節點。
+        所有工具節點共用狀態中的 tool_cache，同一次執行中相同的工具呼叫只會執行一次。
+        """
         return {
-            "market": ToolNode(
+            "market": create_cached_tool_node(
                 [
                     # 核心股票數據工具
                     get_stock_data,
@@ -178,13 +217,13 @@ class TradingAgentsXGraph:
                     get_indicators,
                 ]
             ),
-            "social": ToolNode(
+            "social": create_cached_tool_node(
                 [
                     # 用於社群媒體分析的新聞工具
                     get_news,
                 ]
             ),
-            "news": ToolNode(
+            "news": create_cached_tool_node(
                 [
                     # 新聞和內部資訊
                     get_news,
@@ -193,7 +232,7 @@ class TradingAgentsXGraph:
                     get_insider_transactions,
                 ]
             ),
-            "fundamentals": ToolNode(
+            "fundamentals": create_cached_tool_node(
                 [
                     # 基本面分析工具
                     get_fundamentals,
@@ -204,6 +243,19 @@ class TradingAgentsXGraph:
             ),
         }
 
+    def prefetch_run(self, company_name, trade_date):
+        """
+        返回本次執行的預先抓取區塊；未啟用 prefetch_tool_data 時為空的上下文。
+        需在 create_initial_state 與圖執行之前進入，讓兩者都能取用預先抓取的結果。
+        """
+        if self.prefetcher is None:
+            return nullcontext()
+        return self.prefetcher.run(company_name, str(trade_date))
+
+    def config_scope(self):
+        """返回本圖的設定區塊；區塊內資料工具的 get_config 讀取本圖的設定快照。"""
+        return use_config(self.config_snapshot)
+
     def propagate(self, company_name, trade_date):
         """
         在特定日期為某家公司執行交易代理圖。
@@ -218,26 +270,33 @@ class TradingAgentsXGraph:
 
         self.ticker = company_name
 
-        # 初始化狀態
-        init_agent_state = self.propagator.create_initial_state(
-            company_name, trade_date
-        )
-        args = self.propagator.get_graph_args()
-
-        if self.debug:
-            # 帶有追蹤的除錯模式
-            trace = []
-            for chunk in self.graph.stream(init_agent_state, **args):
-                if len(chunk["messages"]) == 0:
-                    pass
-                else:
-                    chunk["messages"][-1].pretty_print()
-                    trace.append(chunk)
-
-            final_state = trace[-1]
-        else:
-            # 不帶追蹤的標準模式
-            final_state = self.graph.invoke(init_agent_state, **args)
+        # 在本圖的設定與剖析上下文中執行，記錄節點耗時、token 用量、工具與供應商延遲
+        with self.config_scope(), profile_run() as profile, self.prefetch_run(company_name, trade_date):
+            # 初始化狀態
+            init_agent_state = self.propagator.create_initial_state(
+                company_name, trade_date
+            )
+            args = self.propagator.get_graph_args(
+                callbacks=[ProfilingCallbackHandler(profile)]
+            )
+
+            if self.debug:
+                # 帶有追蹤的除錯模式
+                trace = []
+                for chunk in self.graph.stream(init_agent_state, **args):
+                    if len(chunk["messages"]) == 0:
+                        pass
+                    else:
+                        chunk["messages"][-1].pretty_print()
+                        trace.append(chunk)
+
+                final_state = trace[-1]
+            else:
+                # 不帶追蹤的標準模式
+                final_state = self.graph.invoke(init_agent_state, **args)
+
+        # 附加結構化的執行剖析
+        final_state["run_profile"] = profile.to_dict()
 
         # 儲存當前狀態以供反思
         self.curr_state = final_state
@@ -249,8 +308,8 @@ class TradingAgentsXGraph:
         return final_state, self.process_signal(final_state["final_trade_decision"])
 
     def _log_state(self, trade_date, final_state):
-        """將最終狀態記錄到 JSON 檔案中。"""
-        self.log_states_dict[str(trade_date)] = {
+        """將最終狀態以一行記錄附加到該股票的 JSONL 檔案中（背景寫入）。"""
+        record = {
             "company_of_interest": final_state["company_of_interest"],
             "trade_date": final_state["trade_date"],
             "market_report": final_state["market_report"],
@@ -278,17 +337,12 @@ class TradingAgentsXGraph:
             },
             "investment_plan": final_state["investment_plan"],
             "final_trade_decision": final_state["final_trade_decision"],
+            # 只記錄工具快取的鍵，方便事後檢查本次執行呼叫過哪些工具
+            "tool_calls": sorted(final_state.get("tool_cache") or {}),
         }
 
-        # 儲存到檔案
-        directory = Path(f"eval_results/{self.ticker}/TradingAgentsXStrategy_logs/")
-        directory.mkdir(parents=True, exist_ok=True)
-
-        with open(
-            f"eval_results/{self.ticker}/TradingAgentsXStrategy_logs/full_states_log_{trade_date}.json",
-            "w",
-        ) as f:
-            json.dump(self.log_states_dict, f, indent=4)
+        # 附加到檔案，不重寫先前日期的記錄
+        self.state_logger.append(self.ticker, trade_date, record)
 
     def reflect_and_remember(self, returns_losses):
         """
@@ -0,0 +1,348 @@
+"""
+共用客戶端與供應商速率限制
+
+同一個行程中的多個分析（例如後端同時處理多個請求）共用：
+- 每個 base URL 一組連線池（httpx.Client 給 OpenAI 相容 SDK、requests.Session 給資料供應商）
+- 每個 (供應商主機, API 金鑰, 限速設定) 一個權杖桶限速器，同時限制每分鐘請求數與每分鐘 token 數
+- 以 (模型, base URL, API 金鑰) 為鍵快取的聊天模型實例
+
+超出限制的呼叫會在本地排隊等待，而不是送出後收到 429 再盲目重試。
+"""
+import asyncio
+import hashlib
+import math
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.rate_limiters import BaseRateLimiter
+from requests.adapters import HTTPAdapter
+
+from tradingagents.default_config import DEFAULT_CONFIG
+from tradingagents.utils.instrumentation import _usage_from_result
+
+# 連線池預設大小（每個 base URL）
+DEFAULT_POOL_SIZE = 20
+
+# 單一主機的限速設定，例如 (("requests_per_minute", 500), ("tokens_per_minute", 200000))
+LimitsKey = Tuple[Tuple[str, float], ...]
+
+
+def _host_of(base_url: Optional[str]) -> str:
+    """取出 base URL 的主機名稱，作為限速設定與連線池的鍵。"""
+    return urlparse(base_url or "").netloc.lower() or (base_url or "")
+
+
+def key_fingerprint(api_key: Optional[str]) -> str:
+    """以雜湊識別 API 金鑰，避免在登錄表中保存可讀的金鑰字串。"""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+class TokenBucket:
+    """
+    執行緒安全的權杖桶：以每分鐘額度的固定速率持續補充，容量為可瞬間放行的突發量（burst）。
+    ProviderRateLimiter 的請求桶容量預設為 ceil(每分鐘請求數 / 60)，請求平均分散在每一秒；
+    token 桶未指定 burst，容量等於每分鐘額度。
+
+    acquire 會阻塞直到額度足夠；等待中的呼叫者依序排隊。
+    debit 允許在事後扣除實際用量（例如回應中的 token 數），水位可以暫時為負，
+    之後的呼叫會等到水位回正才放行。
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        """
+        Args:
+            per_minute (float): 每分鐘可用的額度。
+            burst (Optional[float]): 桶的容量，即閒置後可瞬間放行的數量；None 時等於每分鐘額度
+                （請求桶由 ProviderRateLimiter 傳入 ceil(每分鐘請求數 / 60)）。
+        """
+        self.capacity = float(burst or per_minute)
+        self.refill_per_second = float(per_minute) / 60.0
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        # 等待中的呼叫者依序取得這把鎖，確保排隊順序
+        self._queue = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """
+        嘗試取得額度，不阻塞。
+
+        Returns:
+            float: 0 表示已取得；否則為還需等待的秒數。
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._level >= amount:
+                self._level -= amount
+                return 0.0
+            return (amount - self._level) / self.refill_per_second
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """
+        阻塞直到取得額度。
+
+        Returns:
+            float: 實際等待的秒數。
+        """
+        started = time.monotonic()
+        with self._queue:
+            while True:
+                wait = self.try_acquire(amount)
+                if wait <= 0:
+                    return time.monotonic() - started
+                time.sleep(wait)
+
+    def debit(self, amount: float) -> None:
+        """事後扣除額度（允許水位為負）。"""
+        with self._lock:
+            self._refill()
+            self._level -= amount
+
+
+class ProviderRateLimiter(BaseRateLimiter):
+    """
+    單一 (供應商, API 金鑰) 的速率限制器，可直接作為 LangChain 聊天模型的 rate_limiter。
+
+    - 每分鐘請求數：每次呼叫前取得一個權杖
+    - 每分鐘 token 數：呼叫前等待 token 水位不為負，回應後依實際用量扣除
+      （請求送出前無法準確得知用量，因此採用事後扣除）
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        burst: Optional[float] = None,
+    ):
+        """
+        Args:
+            requests_per_minute (Optional[float]): 每分鐘請求上限；None 表示不限制。
+            tokens_per_minute (Optional[float]): 每分鐘 token 上限；None 表示不限制。
+            burst (Optional[float]): 可連續立即送出的請求數；None 時為 ceil(每分鐘請求數 / 60)，
+                也就是平均每秒的量，避免一分鐘的額度在一瞬間全部送出而觸發伺服器端的突發限制。
+        """
+        if requests_per_minute and not burst:
+            burst = math.ceil(requests_per_minute / 60)
+        self.requests = TokenBucket(requests_per_minute, burst) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def _try_acquire(self) -> float:
+        if self.tokens is not None:
+            wait = self.tokens.try_acquire(0.0)
+            if wait > 0:
+                return wait
+        if self.requests is not None:
+            return self.requests.try_acquire(1.0)
+        return 0.0
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        if not blocking:
+            return self._try_acquire() <= 0
+        if self.tokens is not None:
+            self.tokens.acquire(0.0)
+        if self.requests is not None:
+            self.requests.acquire(1.0)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                return True
+            if not blocking:
+                return False
+            await asyncio.sleep(wait)
+
+    def record_usage(self, tokens: int) -> None:
+        """回應後扣除實際使用的 token 數。"""
+        if self.tokens is not None and tokens:
+            self.tokens.debit(tokens)
+
+
+class RateLimitUsageHandler(BaseCallbackHandler):
+    """在 LLM 回應後，把實際 token 用量回報給對應的限速器。"""
+
+    def __init__(self, limiter: ProviderRateLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response: LLMResult, **kwargs) -> None:
+        usage = _usage_from_result(response)
+        self.limiter.record_usage(usage["prompt_tokens"] + usage["completion_tokens"])
+
+
+class ClientRegistry:
+    """
+    行程層級的客戶端登錄表。
+
+    限速設定以供應商主機為鍵（例如 "api.openai.com"），可透過設定中的 rate_limits 覆寫：
+        {"api.openai.com": {"requests_per_minute": 500, "tokens_per_minute": 200000, "burst": 10}}
+    burst 為可連續立即送出的請求數，省略時為 ceil(requests_per_minute / 60)。
+    沒有設定的主機不限速，但仍共用連線池。
+    """
+
+    def __init__(self, rate_limits: Optional[Dict[str, Dict[str, float]]] = None, pool_size: int = DEFAULT_POOL_SIZE):
+        self.rate_limits: Dict[str, Dict[str, float]] = dict(rate_limits or {})
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._limiters: Dict[Tuple[str, str, LimitsKey], ProviderRateLimiter] = {}
+        self._http_clients: Dict[str, httpx.Client] = {}
+        self._sessions: Dict[str, requests.Session] = {}
+        self._openai_clients: Dict[Tuple[str, str], Any] = {}
+        self._chat_models: Dict[Tuple[str, str, str, LimitsKey], Any] = {}
+
+    def configure(self, rate_limits: Optional[Dict[str, Dict[str, float]]] = None, pool_size: Optional[int] = None) -> None:
+        """
+        更新預設的限速設定與連線池大小，只影響之後未明確指定限速設定的呼叫與新建立的連線池。
+        已建立的限速器與聊天模型不會被清除，執行中的分析維持原本的共用節流。
+        """
+        with self._lock:
+            if rate_limits is not None:
+                self.rate_limits = dict(rate_limits)
+            if pool_size:
+                self.pool_size = pool_size
+
+    def _limits_for(self, host: str, rate_limits: Optional[Mapping]) -> LimitsKey:
+        """取得主機的限速設定（明確傳入的設定優先，否則使用預設），轉為可作為鍵的 tuple。"""
+        limits = (self.rate_limits if rate_limits is None else rate_limits).get(host) or {}
+        return tuple(sorted(limits.items()))
+
+    def get_limiter(
+        self,
+        base_url: Optional[str],
+        api_key: Optional[str],
+        rate_limits: Optional[Mapping] = None,
+    ) -> ProviderRateLimiter:
+        """
+        取得 (供應商主機, API 金鑰, 限速設定) 共用的限速器。
+
+        Args:
+            base_url (Optional[str]): 供應商的 base URL。
+            api_key (Optional[str]): API 金鑰。
+            rate_limits (Optional[Mapping]): 呼叫端設定中的 rate_limits；None 時使用登錄表的預設設定。
+                限速設定不同的分析各用各的限速器，不會重設彼此的節流狀態。
+        """
+        host = _host_of(base_url)
+        limits = self._limits_for(host, rate_limits)
+        key = (host, key_fingerprint(api_key), limits)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                values = dict(limits)
+                limiter = ProviderRateLimiter(
+                    values.get("requests_per_minute"),
+                    values.get("tokens_per_minute"),
+                    values.get("burst"),
+                )
+                self._limiters[key] = limiter
+            return limiter
+
+    def get_http_client(self, base_url: Optional[str]) -> httpx.Client:
+        """取得 base URL 共用的 httpx 連線池（供 OpenAI 相容 SDK 使用）。"""
+        host = _host_of(base_url)
+        with self._lock:
+            client = self._http_clients.get(host)
+            if client is None:
+                client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=self.pool_size,
+                        max_keepalive_connections=self.pool_size,
+                    ),
+                    timeout=httpx.Timeout(600.0, connect=10.0),
+                )
+                self._http_clients[host] = client
+            return client
+
+    def get_session(self, base_url: Optional[str]) -> requests.Session:
+        """取得 base URL 共用的 requests.Session（供資料供應商使用）。"""
+        host = _host_of(base_url)
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def get_openai_client(self, base_url: Optional[str], api_key: Optional[str]):
+        """取得共用連線池的 OpenAI SDK 客戶端。"""
+        from openai import OpenAI
+
+        key = (base_url or "", key_fingerprint(api_key))
+        http_client = self.get_http_client(base_url)
+        with self._lock:
+            client = self._openai_clients.get(key)
+            if client is None:
+                client = OpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
+                self._openai_clients[key] = client
+            return client
+
+    def get_chat_model(
+        self,
+        model: str,
+        base_url: str,
+        api_key: Optional[str],
+        rate_limits: Optional[Mapping] = None,
+    ):
+        """
+        取得共用的聊天模型實例（依 base URL 選擇 Anthropic 或 OpenAI 相容客戶端），
+        並掛上該供應商、金鑰與限速設定的限速器。
+        """
+        key = (model, base_url or "", key_fingerprint(api_key), self._limits_for(_host_of(base_url), rate_limits))
+        with self._lock:
+            chat_model = self._chat_models.get(key)
+        if chat_model is not None:
+            return chat_model
+
+        limiter = self.get_limiter(base_url, api_key, rate_limits)
+        callbacks = [RateLimitUsageHandler(limiter)]
+        if "anthropic.com" in (base_url or ""):
+            from langchain_anthropic import ChatAnthropic
+
+            # Claude 4.5 API 限制：不能同時使用 temperature 與 top_p，因此明確將 top_p 設為 None
+            chat_model = ChatAnthropic(
+                model=model,
+                base_url=base_url,
+                api_key=api_key,
+                max_tokens=16000,
+                temperature=0.7,
+                top_p=None,
+                rate_limiter=limiter,
+                callbacks=callbacks,
+            )
+        else:
+            from langchain_openai import ChatOpenAI
+
+            # OpenAI、Grok、DeepSeek、Qwen 等 OpenAI 相容 API
+            chat_model = ChatOpenAI(
+                model=model,
+                base_url=base_url,
+                openai_api_key=api_key,
+                max_tokens=16000,
+                http_client=self.get_http_client(base_url),
+                rate_limiter=limiter,
+                callbacks=callbacks,
+            )
+
+        with self._lock:
+            return self._chat_models.setdefault(key, chat_model)
+
+
+# 行程層級的共用登錄表
+client_registry = ClientRegistry(
+    DEFAULT_CONFIG.get("rate_limits"),
+    DEFAULT_CONFIG.get("http_pool_size", DEFAULT_POOL_SIZE),
+)
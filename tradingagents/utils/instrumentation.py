@@ -0,0 +1,283 @@
+"""
+執行效能剖析工具
+
+記錄單次 propagate 執行中每個節點的耗時、LLM token 用量、工具呼叫次數、
+資料供應商延遲、快取命中與表格編碼節省的 token，並整理成可附加到 final_state 的結構化剖析結果。
+
+使用方式：
+    with profile_run() as profile:
+        args = propagator.get_graph_args(callbacks=[ProfilingCallbackHandler(profile)])
+        final_state = graph.invoke(init_state, **args)
+    final_state["run_profile"] = profile.to_dict()
+"""
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# 目前執行中的剖析物件；供應商路由等非 callback 的程式碼透過它回報數據
+_current_profile: ContextVar[Optional["RunProfile"]] = ContextVar("tradingagents_run_profile", default=None)
+
+
+class RunProfile:
+    """單次執行的剖析數據累加器（執行緒安全）。"""
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self._start = time.perf_counter()
+        self._end: Optional[float] = None
+        self._lock = threading.Lock()
+        self.nodes: Dict[str, Dict[str, float]] = {}
+        self.tools: Dict[str, Dict[str, float]] = {}
+        self.vendors: Dict[str, Dict[str, Any]] = {}
+        self.cache: Dict[str, Dict[str, int]] = {}
+        self.debates: Dict[str, Dict[str, Any]] = {}
+        self.tables: Dict[str, Dict[str, int]] = {}
+
+    def _node(self, node: str) -> Dict[str, float]:
+        return self.nodes.setdefault(node, {
+            "calls": 0,
+            "seconds": 0.0,
+            "llm_calls": 0,
+            "llm_seconds": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+        })
+
+    def record_node(self, node: str, seconds: float) -> None:
+        """記錄一次節點執行的耗時。"""
+        with self._lock:
+            stats = self._node(node)
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+
+    def record_llm(
+        self,
+        node: str,
+        seconds: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_tokens: int = 0,
+    ) -> None:
+        """記錄一次 LLM 呼叫的耗時與 token 用量。"""
+        with self._lock:
+            stats = self._node(node)
+            stats["llm_calls"] += 1
+            stats["llm_seconds"] += seconds
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["cached_tokens"] += cached_tokens
+
+    def record_tool(self, tool: str, seconds: float, error: bool = False) -> None:
+        """記錄一次工具呼叫。"""
+        with self._lock:
+            stats = self.tools.setdefault(tool, {"calls": 0, "seconds": 0.0, "errors": 0})
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["errors"] += int(error)
+
+    def record_vendor(self, method: str, vendor: str, seconds: float, error: bool = False) -> None:
+        """記錄一次資料供應商實作的呼叫延遲。"""
+        with self._lock:
+            stats = self.vendors.setdefault(f"{method}:{vendor}", {
+                "method": method,
+                "vendor": vendor,
+                "calls": 0,
+                "seconds": 0.0,
+                "errors": 0,
+            })
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["errors"] += int(error)
+
+    def record_cache(self, kind: str, hit: bool) -> None:
+        """記錄一次快取查詢結果（kind 例如 "llm"、"embedding"）。"""
+        with self._lock:
+            stats = self.cache.setdefault(kind, {"hits": 0, "misses": 0})
+            stats["hits" if hit else "misses"] += 1
+
+    def record_debate(self, debate: str, turns: int, max_turns: int, participants: int) -> None:
+        """記錄一場辯論的實際發言數，以及因收斂而節省的回合數。"""
+        with self._lock:
+            self.debates[debate] = {
+                "turns": turns,
+                "max_turns": max_turns,
+                "rounds_saved": max(max_turns - turns, 0) // participants,
+            }
+
+    def record_table(self, tool: str, baseline_tokens: int, encoded_tokens: int) -> None:
+        """記錄一次表格型工具輸出編碼前（CSV）與編碼後的估計 token 數。"""
+        with self._lock:
+            stats = self.tables.setdefault(tool, {"calls": 0, "baseline_tokens": 0, "encoded_tokens": 0})
+            stats["calls"] += 1
+            stats["baseline_tokens"] += baseline_tokens
+            stats["encoded_tokens"] += encoded_tokens
+
+    def finish(self) -> None:
+        """標記執行結束時間。"""
+        if self._end is None:
+            self._end = time.perf_counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """返回可 JSON 序列化的剖析結果。"""
+        end = self._end if self._end is not None else time.perf_counter()
+        with self._lock:
+            nodes = {name: dict(stats) for name, stats in self.nodes.items()}
+            return {
+                "run_id": self.run_id,
+                "started_at": self.started_at,
+                "wall_seconds": round(end - self._start, 3),
+                "nodes": nodes,
+                "tools": {name: dict(stats) for name, stats in self.tools.items()},
+                "vendors": {key: dict(stats) for key, stats in self.vendors.items()},
+                "cache": {kind: dict(stats) for kind, stats in self.cache.items()},
+                "debates": {name: dict(stats) for name, stats in self.debates.items()},
+                "tables": {tool: dict(stats) for tool, stats in self.tables.items()},
+                "totals": {
+                    "llm_calls": sum(s["llm_calls"] for s in nodes.values()),
+                    "prompt_tokens": sum(s["prompt_tokens"] for s in nodes.values()),
+                    "completion_tokens": sum(s["completion_tokens"] for s in nodes.values()),
+                    "cached_tokens": sum(s["cached_tokens"] for s in nodes.values()),
+                    "tool_calls": sum(s["calls"] for s in self.tools.values()),
+                    "vendor_calls": sum(s["calls"] for s in self.vendors.values()),
+                },
+            }
+
+
+def get_current_profile() -> Optional[RunProfile]:
+    """返回目前上下文中的剖析物件，沒有時返回 None。"""
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_run(run_id: Optional[str] = None) -> Iterator[RunProfile]:
+    """在此區塊內啟用剖析，區塊結束時記錄總耗時。"""
+    profile = RunProfile(run_id)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        profile.finish()
+        _current_profile.reset(token)
+
+
+def _usage_from_result(response: LLMResult) -> Dict[str, int]:
+    """從 LLM 結果擷取 token 用量，相容 usage_metadata 與舊版 llm_output。"""
+    usage = {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+    found = False
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if not metadata:
+                continue
+            found = True
+            usage["prompt_tokens"] += metadata.get("input_tokens", 0) or 0
+            usage["completion_tokens"] += metadata.get("output_tokens", 0) or 0
+            details = metadata.get("input_token_details") or {}
+            usage["cached_tokens"] += details.get("cache_read", 0) or 0
+
+    if not found and response.llm_output:
+        token_usage = response.llm_output.get("token_usage") or response.llm_output.get("usage") or {}
+        usage["prompt_tokens"] = token_usage.get("prompt_tokens", token_usage.get("input_tokens", 0)) or 0
+        usage["completion_tokens"] = token_usage.get("completion_tokens", token_usage.get("output_tokens", 0)) or 0
+    return usage
+
+
+class ProfilingCallbackHandler(BaseCallbackHandler):
+    """
+    將 langgraph 節點、LLM 與工具的回呼事件寫入 RunProfile。
+    節點以 metadata 中的 langgraph_node 辨識，只計算節點本身那一層的執行。
+    """
+
+    def __init__(self, profile: RunProfile):
+        self.profile = profile
+        self._starts: Dict[UUID, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, label: str) -> None:
+        with self._lock:
+            self._starts[run_id] = (label, time.perf_counter())
+
+    def _stop(self, run_id: UUID) -> Optional[tuple]:
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+        if started is None:
+            return None
+        label, start = started
+        return label, time.perf_counter() - start
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self._start(run_id, node)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs) -> None:
+        stopped = self._stop(run_id)
+        if stopped:
+            self.profile.record_node(*stopped)
+
+    def on_chain_error(self, error, *, run_id, **kwargs) -> None:
+        stopped = self._stop(run_id)
+        if stopped:
+            self.profile.record_node(*stopped)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs) -> None:
+        self._start(run_id, (metadata or {}).get("langgraph_node", "(outside graph)"))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs) -> None:
+        self._start(run_id, (metadata or {}).get("langgraph_node", "(outside graph)"))
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs) -> None:
+        stopped = self._stop(run_id)
+        if stopped:
+            node, seconds = stopped
+            self.profile.record_llm(node, seconds, **_usage_from_result(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        stopped = self._stop(run_id)
+        if stopped:
+            node, seconds = stopped
+            self.profile.record_llm(node, seconds)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name", "unknown_tool")
+        self._start(run_id, name)
+
+    def on_tool_end(self, output, *, run_id, **kwargs) -> None:
+        stopped = self._stop(run_id)
+        if stopped:
+            self.profile.record_tool(*stopped)
+
+    def on_tool_error(self, error, *, run_id, **kwargs) -> None:
+        stopped = self._stop(run_id)
+        if stopped:
+            self.profile.record_tool(*stopped, error=True)
+
+
+def format_profile_rows(profile: Dict[str, Any]) -> List[List[str]]:
+    """
+    將剖析結果整理為表格列（節點、呼叫次數、耗時、LLM 呼叫、輸入/輸出/快取 token）。
+    依耗時由高到低排序，供 CLI 等介面顯示。
+    """
+    rows = []
+    nodes = sorted(profile.get("nodes", {}).items(), key=lambda item: item[1]["seconds"], reverse=True)
+    for name, stats in nodes:
+        rows.append([
+            name,
+            str(int(stats["calls"])),
+            f"{stats['seconds']:.2f}",
+            str(int(stats["llm_calls"])),
+            str(int(stats["prompt_tokens"])),
+            str(int(stats["completion_tokens"])),
+            str(int(stats["cached_tokens"])),
+        ])
+    return rows
@@ -0,0 +1,185 @@
+"""
+LLM 回應錄製/重播快取
+
+將 LLM（及 embedding）的回應以請求內容為鍵儲存在磁碟上，
+讓同一個 ticker/日期的整個圖可以離線、確定性地重新執行。
+
+模式：
+- record：呼叫真實模型並寫入快取
+- replay：只從快取讀取，缺少時拋出 LLMCacheMissError（不需要網路或 API 金鑰）
+- passthrough：直接呼叫真實模型，不讀寫快取
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+from tradingagents.utils.instrumentation import get_current_profile
+
+LLM_CACHE_MODES = ("record", "replay", "passthrough")
+
+
+class LLMCacheMissError(KeyError):
+    """replay 模式下找不到對應的快取回應。"""
+
+
+class ResponseCache:
+    """
+    以內容雜湊為鍵的磁碟 JSON 快取。
+    每個鍵一個檔案，寫入時先寫暫存檔再原子替換，可安全地被多個執行緒共用。
+    """
+
+    def __init__(self, cache_dir: str, mode: str = "record", kind: str = "llm"):
+        """
+        Args:
+            cache_dir: 快取根目錄。
+            mode: LLM_CACHE_MODES 其中之一。
+            kind: 快取類別名稱，用於剖析中的命中統計。
+        """
+        if mode not in LLM_CACHE_MODES:
+            raise ValueError(f"不支援的 LLM 快取模式：{mode}，可選：{LLM_CACHE_MODES}")
+        self.cache_dir = Path(cache_dir)
+        self.mode = mode
+        self.kind = kind
+
+    @staticmethod
+    def make_key(payload: Any) -> str:
+        """將可 JSON 序列化的請求內容轉為穩定的雜湊鍵。"""
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """讀取快取值，不存在時返回 None。"""
+        path = self._path(key)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, key: str, value: Any) -> None:
+        """原子性地寫入快取值。"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def fetch(self, payload: Any, compute: Callable[[], Any]) -> Any:
+        """
+        依模式取得結果。
+
+        Args:
+            payload: 決定快取鍵的請求內容。
+            compute: 實際呼叫模型的函式，返回可 JSON 序列化的結果。
+
+        Returns:
+            快取或實際計算的結果。
+        """
+        if self.mode == "passthrough":
+            return compute()
+
+        key = self.make_key(payload)
+        profile = get_current_profile()
+        if self.mode == "replay":
+            value = self.get(key)
+            if profile is not None:
+                profile.record_cache(self.kind, hit=value is not None)
+            if value is None:
+                raise LLMCacheMissError(f"LLM 快取缺少回應（key={key}），請先以 record 模式執行一次")
+            return value
+
+        if profile is not None:
+            profile.record_cache(self.kind, hit=False)
+        value = compute()
+        self.put(key, value)
+        return value
+
+
+def _message_fingerprint(message: BaseMessage) -> Dict[str, Any]:
+    """
+    擷取訊息中決定模型輸出的部分。
+    刻意忽略訊息與工具呼叫的隨機 id，讓重新執行時的鍵保持一致。
+    """
+    fingerprint = {"type": message.type, "content": message.content}
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        fingerprint["tool_calls"] = [
+            {"name": call["name"], "args": call["args"]} for call in tool_calls
+        ]
+    name = getattr(message, "name", None)
+    if name:
+        fingerprint["name"] = name
+    return fingerprint
+
+
+class CachedChatModel(BaseChatModel):
+    """
+    包裝 ChatOpenAI / ChatAnthropic 等聊天模型的錄製/重播快取。
+    鍵由（模型名稱、渲染後的訊息、綁定的工具、參數）組成。
+    replay 模式不需要 inner 模型，因此可在沒有網路與 API 金鑰時作為本地替身使用。
+    """
+
+    model_name: str
+    response_cache: ResponseCache
+    inner: Optional[BaseChatModel] = None
+    params: Dict[str, Any] = Field(default_factory=dict)
+    # 底層供應商（如 "anthropic"），供提示版面決定是否加入 cache_control；不納入快取鍵
+    provider: Optional[str] = None
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @property
+    def _llm_type(self) -> str:
+        return "cached-chat-model"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "mode": self.response_cache.mode, **self.params}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        """以 OpenAI 工具格式綁定工具；實際呼叫時再交給 inner 模型的 bind_tools。"""
+        formatted_tools = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted_tools, tool_kwargs=kwargs)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_kwargs: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        payload = {
+            "model": self.model_name,
+            "params": self.params,
+            "messages": [_message_fingerprint(m) for m in messages],
+            "tools": tools or [],
+            "tool_kwargs": tool_kwargs or {},
+            "stop": stop,
+            "kwargs": kwargs,
+        }
+
+        def compute() -> Dict[str, Any]:
+            if self.inner is None:
+                raise RuntimeError("CachedChatModel 沒有可呼叫的 inner 模型")
+            runnable = self.inner.bind_tools(tools, **(tool_kwargs or {})) if tools else self.inner
+            # 回呼由外層的 CachedChatModel 觸發，這裡不再傳入以免重複計數
+            message = runnable.invoke(messages, stop=stop, **kwargs)
+            return message_to_dict(message)
+
+        message = messages_from_dict([self.response_cache.fetch(payload, compute)])[0]
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,160 @@
+"""
+結構化日誌
+
+tradingagents 套件內的模組一律以 logging.getLogger(__name__) 取得日誌器，不直接 print。
+configure_logging 在 "tradingagents" 日誌器上安裝一個佇列處理器：
+- 呼叫端只把記錄放入佇列，實際格式化與寫出由背景執行緒完成，並行執行時不會爭用 stdout
+- 每筆記錄自動帶上 run_id（目前的剖析物件）、node（LangGraph 節點）與 tool（供應商路由中的工具方法），
+  可與 run_profile 對照
+- 預設等級為 INFO，路由的逐步除錯訊息只在 DEBUG 等級輸出
+
+使用方式：
+    configure_logging(level="DEBUG", fmt="json")
+    with log_fields(tool="get_stock_data"):
+        logger.debug("正在嘗試供應商", extra={"vendor": "yfinance"})
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+from langchain_core.runnables.config import var_child_runnable_config
+
+from tradingagents.utils.instrumentation import get_current_profile
+
+ROOT_LOGGER = "tradingagents"
+LOG_FORMATS = ("json", "text")
+
+# 由 log_fields 設定、附加到此上下文中每筆記錄的欄位
+_log_fields: ContextVar[Dict[str, Any]] = ContextVar("tradingagents_log_fields", default={})
+
+# LogRecord 本身的屬性；其餘屬性視為 extra 欄位輸出
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_lock = threading.Lock()
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@contextmanager
+def log_fields(**fields: Any) -> Iterator[None]:
+    """在此區塊內記錄的每筆日誌都附加這些欄位（例如 tool）。"""
+    token = _log_fields.set({**_log_fields.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_fields.reset(token)
+
+
+def _current_node() -> Optional[str]:
+    config = var_child_runnable_config.get()
+    if not config:
+        return None
+    return (config.get("metadata") or {}).get("langgraph_node")
+
+
+class ContextFieldsFilter(logging.Filter):
+    """
+    在記錄產生的執行緒中補上 run_id、node 與 tool 欄位。
+    必須掛在佇列處理器上（而非背景寫出端），上下文變數才讀得到。
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        profile = get_current_profile()
+        fields = {"run_id": profile.run_id if profile else None, "node": _current_node(), "tool": None}
+        fields.update(_log_fields.get())
+        for key, value in fields.items():
+            if getattr(record, key, None) is None:
+                setattr(record, key, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """每筆記錄輸出為一行 JSON，包含上下文欄位與 extra 欄位。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                payload[key] = value
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """單行文字格式，上下文欄位以 key=value 附在訊息後。"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(
+            f"{key}={value}" for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES and value is not None
+        )
+        return f"{line} [{fields}]" if fields else line
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    fmt: Optional[str] = None,
+    stream: Optional[TextIO] = None,
+) -> logging.Logger:
+    """
+    設定 "tradingagents" 日誌器；可重複呼叫，之後的呼叫只更新等級與格式。
+
+    Args:
+        level (Optional[str]): 日誌等級，例如 "DEBUG"、"INFO"；None 時為 INFO。
+        fmt (Optional[str]): "json" 或 "text"；None 時為 json。
+        stream (Optional[TextIO]): 輸出目標，預設為 stderr（僅第一次設定時生效）。
+
+    Returns:
+        logging.Logger: "tradingagents" 日誌器。
+    """
+    global _queue_handler, _listener
+
+    fmt = fmt or "json"
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"不支援的日誌格式 '{fmt}'，請從以下選項中選擇：{', '.join(LOG_FORMATS)}")
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel((level or "INFO").upper())
+    with _lock:
+        if _listener is None:
+            output = logging.StreamHandler(stream or sys.stderr)
+            # QueueHandler 會先把訊息與例外合併成字串，extra 欄位則保留在記錄上
+            _queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+            _queue_handler.addFilter(ContextFieldsFilter())
+            _listener = logging.handlers.QueueListener(_queue_handler.queue, output, respect_handler_level=True)
+            _listener.start()
+            atexit.register(shutdown_logging)
+            logger.addHandler(_queue_handler)
+            # 已由佇列處理器寫出，不再交給根日誌器（例如後端的 basicConfig）重複輸出
+            logger.propagate = False
+        for handler in _listener.handlers:
+            handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    return logger
+
+
+def shutdown_logging() -> None:
+    """寫出佇列中剩餘的記錄並停止背景執行緒。"""
+    global _queue_handler, _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        logging.getLogger(ROOT_LOGGER).removeHandler(_queue_handler)
+        logging.getLogger(ROOT_LOGGER).propagate = True
+        _queue_handler = _listener = None
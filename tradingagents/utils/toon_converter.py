@@ -3,10 +3,13 @@ Toon格式轉換工具
 
 將JSON數據轉換為toon格式以減少token消耗
 """
+import logging
 from toon_format import encode, decode, estimate_savings, compare_formats
 import json
 from typing import Union, Dict, List
 
+logger = logging.getLogger(__name__)
+
 
 def convert_json_to_toon(json_data: Union[str, dict, list]) -> str:
     """
@@ -30,7 +33,7 @@ def convert_json_to_toon(json_data: Union[str, dict, list]) -> str:
     try:
         return encode(data)
     except Exception as e:
-        print(f"警告：toon轉換失敗：{e}，返回原始數據")
+        logger.warning("toon轉換失敗：%s，返回原始數據", e)
         return json.dumps(data, ensure_ascii=False) if not isinstance(json_data, str) else json_data
 
 
@@ -47,7 +50,7 @@ def convert_toon_to_json(toon_data: str) -> dict:
     try:
         return decode(toon_data)
     except Exception as e:
-        print(f"警告：toon解碼失敗：{e}")
+        logger.warning("toon解碼失敗：%s", e)
         # 嘗試作為JSON解析
         try:
             return json.loads(toon_data)